@@ -20,9 +20,12 @@ Moving any of these folders or files will prevent the game from working properly
 Author: Walker M. White (wmw2)
 Date:   November 1, 2017 (Python 3 Version)
 """
+import consts
+import sys
+consts.readArguments(sys.argv)
 from consts import *
 from app import *
 
 # Application code
 if __name__ == '__main__':
-    Invaders(width=GAME_WIDTH,height=GAME_HEIGHT).run()
+    Invaders(width=GAME_WIDTH,height=GAME_HEIGHT,trace=TRACE_FILE).run()
@@ -12,6 +12,8 @@ December 4, 2018
 from consts import *
 from game2d import *
 from wave import *
+from sim import *
+from replay import *
 
 # PRIMARY RULE: Invaders can only access attributes in wave.py via getters/setters
 # Invaders is NOT allowed to access anything in models.py
@@ -47,16 +49,16 @@ class Invaders(GameApp):
                 [instance of GView; it is inherited from GameApp]
         input:  the user input, used to control the ship and change state
                 [instance of GInput; it is inherited from GameApp]
-        _state: the current state of the game represented as a value from consts.py
-                [one of STATE_INACTIVE, STATE_NEWWAVE, STATE_ACTIVE, STATE_PAUSED, STATE_CONTINUE, STATE_COMPLETE]
+        _game:  the headless game, which holds the current state of the game as a
+                value from consts.py [GameSim]
         _wave:  the subcontroller for a single wave, which manages the ships and aliens
                 [Wave, or None if there is no wave currently active]
         _text:  the currently active message
                 [GLabel, or None if there is no message to display]
 
     STATE SPECIFIC INVARIANTS:
-        Attribute _wave is only None if _state is STATE_INACTIVE.
-        Attribute _text is only None if _state is STATE_ACTIVE.
+        Attribute _wave is only None if the state of _game is STATE_INACTIVE.
+        Attribute _text is only None if the state of _game is STATE_ACTIVE.
 
     For a complete description of how the states work, see the specification for the
     method update.
@@ -67,11 +69,12 @@ class Invaders(GameApp):
 
     LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
 
-        keydown:   is of bool type, is True if 'x' key is pressed, is False otherwise
-        _speed:  the speed of the next alien wave
-                [float >= ALIEN_SPEED]
-        _timeCount:  the speed of the next alien wave
-                [float >= 0, <SCREEN_TIME]
+        _recorder:  records the keys read by _game, so the game can be replayed
+                [InputRecorder]
+        _waveCount:  the number of waves of _game that have a Wave
+                [int >= 0]
+        _message:  the text of the active message
+                [str, or None if _text is None]
 
     """
 
@@ -91,12 +94,20 @@ class Invaders(GameApp):
         (in attribute _text) saying that the user should press to play a game.
         """
         # IMPLEMENT ME
-        self._state = STATE_INACTIVE
-        self._keyCount = 0
-        self._text = GLabel(text="Press 'X' to play", font_name = 'arcade.ttf',
-        font_size = 50, x=400, y=350)
-        self.speed = ALIEN_SPEED
-        self._timeCount = 0
+        if TRACE_FILE is not None:
+            profile = WaveTrace
+        elif WAVE_PROFILE:
+            profile = WaveProfile
+        else:
+            profile = None
+        self._game = GameSim(RANDOM_SEED, profile=profile)
+        self._recorder = InputRecorder(self.input, self._game.getSeed())
+        self._wave = None
+        self._waveCount = 0
+        self._text = None
+        self._message = None
+        self.setMessage("Press 'X' to play", 50)
+        self.overlay = FRAME_OVERLAY
 
 
     def update(self,dt):
@@ -125,8 +136,8 @@ class Invaders(GameApp):
         frame before switching to STATE_ACTIVE.
 
         STATE_ACTIVE: This is a session of normal gameplay.  The player can move the
-        ship and fire laser bolts.  All of this should be handled inside of class Wave
-        (NOT in this class).  Hence the Wave class should have an update() method, just
+        ship and fire laser bolts.  All of this is handled by the WaveSim of _game (NOT
+        in this class).  The Wave subcontroller draws it and plays its sounds, just
         like the subcontroller example in lecture.
 
         STATE_PAUSED: Like STATE_INACTIVE, this is a paused state. However, the game is
@@ -137,27 +148,44 @@ class Invaders(GameApp):
         You are allowed to add more states if you wish. Should you do so, you should
         describe them here.
 
+        The states themselves are simulated by the GameSim _game, in fixed ticks of
+        SIM_TICK seconds, and every key the game reads is recorded by _recorder.  This
+        method then creates a Wave for every new wave of _game, and updates the view
+        for the current state.  If WAVE_PROFILE is True, it prints the profile of
+        every wave that ends.  If TRACE_FILE is set, every tick and every state
+        handler is a span of the timeline of the game (see GTracer).
+
         Parameter dt: The time in seconds since last update
         Precondition: dt is a number (int or float)
         """
         # IMPLEMENT ME
-        if self.input.is_key_down('x') and self._keyCount<1:
-            self.keydown = True
-            self._keyCount +=1
-            self._state = STATE_NEWWAVE
-            self.draw()
-        elif not self.input.is_key_down('x'):
-            self.keydown = False
-
-        if self._state == STATE_NEWWAVE:
-            self._wave = Wave(self.view, self.input, self.speed)
-            self._state = STATE_ACTIVE
-        elif self._state == STATE_ACTIVE:
-            self.toActive(dt)
-        elif self._state == STATE_PAUSED:
-            self.toPause()
-        elif self._state == STATE_COMPLETE:
-            self.toComplete(dt)
+        for tick in range(self._game.schedule(dt)):
+            with GTracer.span('GameSim.tick', 'sim'):
+                self._game.tick(self._recorder)
+            if REPLAY_HASHES:
+                self._recorder.nextFrame(self._game.getHash())
+            else:
+                self._recorder.nextFrame()
+
+        if self._game.getWaveCount() != self._waveCount:
+            self._wave = Wave(self.view, self.input, self._game.getWave())
+            self._waveCount = self._game.getWaveCount()
+        if self._wave is not None:
+            self._wave.playSounds(self._game.popEvents())
+        for profile in self._game.popProfiles():
+            if WAVE_PROFILE:
+                print(profile)
+
+        state = self._game.getState()
+        if state == STATE_ACTIVE:
+            with GTracer.span('Invaders.toActive'):
+                self.toActive()
+        elif state == STATE_PAUSED:
+            with GTracer.span('Invaders.toPause'):
+                self.toPause()
+        elif state == STATE_COMPLETE:
+            with GTracer.span('Invaders.toComplete'):
+                self.toComplete()
 
 
     def draw(self):
@@ -172,66 +200,100 @@ class Invaders(GameApp):
         or you need to add a draw method to class Wave.  We suggest the latter.  See
         the example subcontroller.py from class.
         """
-        if self.keydown == True:
-            self._text = GLabel(text="")
+        if self._wave is not None and self._game.getState() in [STATE_ACTIVE,
+                                                                STATE_PAUSED]:
+            with GTracer.span('Wave.draw'):
+                self._wave.draw(self.view)
+        if self._text is not None:
+            self._text.draw(self.view)
 
-        self._text.draw(self.view)
 
+    def on_stop(self):
+        """
+        Saves the recording of this game to REPLAY_FILE, if it is set.
 
-    # HELPER METHODS FOR THE STATES GO HERE
-    def toActive(self, dt):
+        This is called by Kivy when the window is closed.
         """
-        Performs all actions to change the state of the game to STATE_ACTIVE
+        if REPLAY_FILE is not None:
+            self._recorder.getReplay().save(REPLAY_FILE)
+
 
+    # SNAPSHOTS
+    def getSnapshot(self):
         """
-        self.keydown = True
-        self._wave.draw(self.view)
-        k=0
-        for x in range(0, len(self._wave._alien)-1):
-            if self._wave._alien[x] == []:
-                k+=1
-        if k == len(self._wave._alien)-1:
-            self._state = STATE_COMPLETE
-        else:
-            Wave.update(self._wave, dt)
-        if self._wave._ship == None:
-            self._wave._lives -=1
-            self._wave._ship = Ship()
-            self._state = STATE_PAUSED
-        if self._wave._lives == 0:
-            self._state = STATE_COMPLETE
+        Returns the state of the game as bytes (see GameSim.getSnapshot).
+        """
+        return self._game.getSnapshot()
 
-        if self.input.is_key_down('p'):
-            self._state = STATE_PAUSED
+    def restore(self, data):
+        """
+        Restores the game to a snapshot made by getSnapshot.
 
+        Only the game is restored right away.  The recording is cut back to the frame
+        of the snapshot, and the Wave and its sprites are rebuilt the next time they
+        are needed.
 
-    def toComplete(self, dt):
+        Parameter data: The snapshot
+        Precondition: data is a bytes-like object made by getSnapshot in this game
         """
-        Performs all actions to change the state of the game to STATE_COMPLETE
+        self._game.setSnapshot(data)
+        self._game.popEvents()
+        self._recorder.rewind(self._game.getFrame())
+        self._wave = None
+        self._waveCount = 0
+        self._message = None
+        self._text = None
+        if self._game.getState() == STATE_INACTIVE:
+            self.setMessage("Press 'X' to play", 50)
 
+
+    # HELPER METHODS FOR THE STATES GO HERE
+    def toActive(self):
         """
-        if self._wave._lives == 0:
-            self._text = GLabel(text="Game over!", font_name = 'arcade.ttf',
-            font_size = 60, x=400, y=350)
+        Performs all actions for the view while the game is in STATE_ACTIVE
+
+        """
+        self._wave.mute()
+        self.setMessage(None)
+
+
+    def toComplete(self):
+        """
+        Performs all actions for the view while the game is in STATE_COMPLETE
+
+        """
+        if self._wave.getLives() == 0:
+            self.setMessage("Game over!", 60)
         else:
-            if self._timeCount < SCREEN_TIME:
-                self._text=GLabel(text="Wave complete! Prepare for next wave...", font_name = 'arcade.ttf',font_size = 35, x=400, y=350)
-                self._timeCount += dt
-            else:
-                self.draw()
-                self.speed = (self.speed)/(ALIEN_SPEED_UP)
-                self._state = STATE_NEWWAVE
-                self._timeCount = 0
+            self.setMessage("Wave complete! Prepare for next wave...", 35)
 
 
     def toPause(self):
         """
-        Performs all actions to change the state of the game to STATE_PAUSED
+        Performs all actions for the view while the game is in STATE_PAUSED
 
         """
-        self._text = GLabel(text= str(self._wave._lives) + " lives remaining. Press 'R' to resume", font_name = 'arcade.ttf',font_size = 40, x=400, y=350)
-        self.keydown = False
-        if self.input.is_key_down('r'):
-            self.keydown = True
-            self._state = STATE_ACTIVE
-        self.draw()
+        self.setMessage(str(self._wave.getLives()) +
+                        " lives remaining. Press 'R' to resume", 40)
+
+
+    def setMessage(self, message, size=50):
+        """
+        Shows the given message, or no message if it is None.
+
+        The label is only rebuilt when the message changes.
+
+        Parameter message: The message to show
+        Precondition: message is a str or None
+
+        Parameter size: The font size of the message
+        Precondition: size is an int > 0
+        """
+        if message == self._message:
+            return
+        self._message = message
+        if message is None:
+            self._text = None
+        else:
+            self._text = GLabel(text=message, font_name = 'arcade.ttf',
+            font_size = size, x=400, y=350)
@@ -0,0 +1,213 @@
+"""
+Replay archive module for Alien Invaders
+
+A replay (see replay.py) only stores the keys of each tick, so the only way to see
+tick 200,000 of a long game is to simulate the 200,000 ticks before it.  An archive
+is a replay with keyframes: a snapshot of the whole game (see GameSim.getSnapshot)
+every ARCHIVE_INTERVAL ticks, and an index of where each keyframe is in the file.
+To seek to a tick, an archive restores the last keyframe at or before it and only
+simulates forward from there, so a seek never costs more than one interval of ticks.
+
+To archive a replay file, and then seek to a tick of the archive:
+
+    python archive.py write game.replay game.archive
+    python archive.py seek game.archive 200000
+
+The archive file is memory-mapped when it is opened.  The header, the replay and the
+index are read right away, but a keyframe is only read when a seek needs it.
+
+The file format is little-endian binary:
+
+    magic       4 bytes, b'INVA'
+    version     1 byte
+    interval    4 bytes, unsigned (the ticks between keyframes)
+    keyframes   4 bytes, unsigned (the number of keyframes)
+    replay      8 bytes offset and 8 bytes length of the replay, unsigned
+    index       8 bytes offset of the index, unsigned
+
+followed by the replay (in the replay file format), the keyframes, and the index.
+The index has an entry for each keyframe, in order: the tick of the keyframe (8
+bytes), its offset (8 bytes) and its length (4 bytes), all unsigned.
+"""
+from consts import *
+from sim import *
+from replay import *
+import struct
+import bisect
+import mmap
+
+# PRIMARY RULE: This module may only access consts.py, sim.py and replay.py.  Like
+# those modules, it must never import game2d.
+
+# The magic number at the start of every archive file
+ARCHIVE_MAGIC = b'INVA'
+# The version of the archive file format
+ARCHIVE_VERSION = 1
+# The layout of the archive header
+_HEADER = struct.Struct('<4sBIIQQQ')
+# The layout of a single index entry
+_ENTRY = struct.Struct('<QQI')
+
+
+def write(path, replay, interval=ARCHIVE_INTERVAL):
+    """
+    Writes an archive of a recording, simulating it once to make the keyframes.
+
+    The keyframes are written to the file as they are made, so the whole archive is
+    never held in memory.
+
+    Parameter path: The file to write
+    Precondition: path is a str
+
+    Parameter replay: The recording to archive
+    Precondition: replay is a Replay
+
+    Parameter interval: The number of ticks between two keyframes
+    Precondition: interval is an int > 0
+    """
+    game = GameSim(replay.seed, replay.speed, replay.rows, replay.cols,
+                   replay.boltRate)
+    input = ReplayInput(replay)
+    data = replay.encode()
+    index = []
+    with open(path, 'wb') as file:
+        file.write(bytes(_HEADER.size))
+        file.write(data)
+        offset = _HEADER.size+len(data)
+        for frame in range(replay.frames+1):
+            if frame % interval == 0:
+                keyframe = game.getSnapshot()
+                file.write(keyframe)
+                index.append((frame, offset, len(keyframe)))
+                offset += len(keyframe)
+            if frame < replay.frames:
+                game.tick(input)
+                input.nextFrame()
+        for entry in index:
+            file.write(_ENTRY.pack(*entry))
+        file.seek(0)
+        file.write(_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, interval, len(index),
+                                _HEADER.size, len(data), offset))
+
+
+class ReplayArchive(object):
+    """
+    A class representing an open archive file.
+
+    Close the archive when you are done with it, or use it in a with statement.
+
+    INSTANCE ATTRIBUTES:
+        _file:     the open archive file [file object]
+        _map:      the memory map of the whole file [mmap.mmap]
+        _replay:   the recording in the archive [Replay]
+        _interval: the number of ticks between two keyframes [int > 0]
+        _frames:   the tick of each keyframe, in order [list of int]
+        _spans:    the (offset, length) of each keyframe in the file
+                   [list of (int, int) tuples]
+    """
+
+    # GETTERS AND SETTERS
+    def getReplay(self):
+        """
+        Returns the recording in this archive.
+        """
+        return self._replay
+
+    def getInterval(self):
+        """
+        Returns the number of ticks between two keyframes.
+        """
+        return self._interval
+
+    def getKeyframeCount(self):
+        """
+        Returns the number of keyframes in this archive.
+        """
+        return len(self._frames)
+
+    # INITIALIZER
+    def __init__(self, path):
+        """
+        Opens an archive file and reads its index.
+
+        Parameter path: The file to open
+        Precondition: path is a str naming an archive file
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self._interval, count, start, length,
+         offset) = _HEADER.unpack_from(self._map, 0)
+        if magic != ARCHIVE_MAGIC:
+            self.close()
+            raise ValueError('not an archive file')
+        if version != ARCHIVE_VERSION:
+            self.close()
+            raise ValueError('unsupported archive version %d' % version)
+
+        self._replay = decode(self._map[start:start+length])
+        self._frames = []
+        self._spans = []
+        for (frame, place, size) in _ENTRY.iter_unpack(
+                self._map[offset:offset+count*_ENTRY.size]):
+            self._frames.append(frame)
+            self._spans.append((place, size))
+
+    def __enter__(self):
+        """
+        Returns this archive, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        """
+        Closes this archive at the end of a with statement.
+        """
+        self.close()
+
+    def close(self):
+        """
+        Closes the memory map and the file of this archive.
+        """
+        self._map.close()
+        self._file.close()
+
+    # SEEKING
+    def seek(self, frame):
+        """
+        Returns the tuple (game, input) for the given tick of the recording.
+
+        The game is the GameSim after that many ticks.  The input is a ReplayInput at
+        the same tick, so the caller can keep playing from there.
+
+        Parameter frame: The number of ticks to play from the start
+        Precondition: frame is an int >= 0 and <= getReplay().frames
+        """
+        pos = bisect.bisect_right(self._frames, frame)-1
+        (offset, length) = self._spans[pos]
+        replay = self._replay
+        game = GameSim(replay.seed, replay.speed, replay.rows, replay.cols,
+                       replay.boltRate)
+        with memoryview(self._map) as view:
+            game.setSnapshot(view[offset:offset+length])
+        input = ReplayInput(replay)
+        input.seek(self._frames[pos])
+        for tick in range(frame-self._frames[pos]):
+            game.tick(input)
+            input.nextFrame()
+        return (game, input)
+
+
+# Application code
+if __name__ == '__main__':
+    import sys
+    import time
+    if sys.argv[1] == 'write':
+        write(sys.argv[3], load(sys.argv[2]))
+    elif sys.argv[1] == 'seek':
+        with ReplayArchive(sys.argv[2]) as archive:
+            start = time.perf_counter()
+            (game, input) = archive.seek(int(sys.argv[3]))
+            elapsed = time.perf_counter()-start
+            print('seek to tick %d in %.3f seconds' % (game.getFrame(), elapsed))
+            print('waves cleared: %d, aliens killed: %d, game over: %s' %
+                  (game.getWavesCleared(), game.getKills(), game.isOver()))
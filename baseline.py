@@ -0,0 +1,350 @@
+"""
+Benchmark baselines for Alien Invaders
+
+This module keeps named baselines of the benchmarks in a JSON file next to it
+(BASELINE_FILE), and checks new runs against them.  There are two suites:
+
+    wave:   the scaling benchmarks of bench.py; for each formation, the time of a
+            tick and the p50 time of each helper of WaveSim.step
+    game2d: the micro-benchmarks of game2d/gbench.py; the p50 time of each one
+
+Every metric is a time in microseconds, so lower is better.  Benchmarks are noisy, so
+each suite is run several times.  A baseline keeps the mean of every metric over the
+runs, and a 95% confidence interval for that mean.  A check runs the suites again
+with the same settings, and a metric has regressed when its mean is more than the
+threshold slower than the baseline AND the two confidence intervals do not overlap.
+A metric that only got slower within the noise is not a regression.
+
+The times depend on the machine, so the baselines are not committed: a fresh
+checkout has none, and a check only makes sense against a baseline saved on the same
+machine.  So save a baseline of the wave suite before changing the code, and check
+the changed code against it later:
+
+    python baseline.py save main --suite wave
+    python baseline.py check main --threshold 0.10
+
+The check prints a table of the metrics that changed, and exits with status 1 if any
+metric regressed, so it can gate a commit.  To list the saved baselines:
+
+    python baseline.py list
+"""
+from consts import *
+import bench
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+# PRIMARY RULE: This module may only access consts.py and bench.py.  It imports the
+# game2d benchmarks only to run the game2d suite, so the wave suite runs headless.
+
+# The file that holds the baselines, in the same folder as this module
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+# The number of times each suite is run, unless told otherwise
+BASELINE_REPEAT = 5
+# The fraction by which a metric may get slower before it is a regression
+BASELINE_THRESHOLD = 0.10
+# The number of ticks each formation plays in the wave suite, unless told otherwise
+BASELINE_FRAMES = 600
+# The number of calls of each game2d benchmark, unless told otherwise
+BASELINE_NUMBER = 500
+
+# The 97.5th percentile of the t distribution, by degrees of freedom (1 to 30)
+_T_975 = (12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+          2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+          2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042)
+
+
+def waveMetrics(settings):
+    """
+    Returns the metrics of one run of the wave suite, as a dictionary.
+
+    Parameter settings: The settings of the suite (frames, seed, speed and stress)
+    Precondition: settings is a dictionary with those keys
+    """
+    script = bench.wander(settings['frames'], settings['seed'])
+    metrics = {}
+    for (rows, cols) in bench.formations(settings['stress']):
+        result = bench.measure(script, rows, cols, settings['speed'], settings['seed'])
+        prefix = 'wave %dx%d ' % (rows, cols)
+        metrics[prefix+'tick'] = 1e6*result['seconds']/result['ticks']
+        for name in bench.BENCH_HELPERS:
+            if result['helpers'][name]['calls'] > 0:
+                metrics[prefix+name] = result['helpers'][name]['p50']
+    return metrics
+
+
+def game2dMetrics(settings):
+    """
+    Returns the metrics of one run of the game2d suite, as a dictionary.
+
+    Parameter settings: The settings of the suite (number)
+    Precondition: settings is a dictionary with that key
+    """
+    # Kivy must not read the command line of this script when game2d imports it
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    from game2d import gbench
+    gbench.setpaths(os.path.dirname(os.path.abspath(__file__)))
+    results = gbench.run(settings['number'])
+    return dict(('game2d '+name, result['p50']) for (name, result) in results.items())
+
+
+# The suites, by name
+SUITES = {'wave': waveMetrics, 'game2d': game2dMetrics}
+
+
+def collect(suites, settings, repeat):
+    """
+    Returns the statistics of every metric of the suites, over several runs.
+
+    The result is a dictionary with the statistics of each metric (see summarize).
+
+    Parameter suites: The names of the suites to run
+    Precondition: suites is a list of keys of SUITES
+
+    Parameter settings: The settings of the suites
+    Precondition: settings is a dictionary with the keys every suite needs
+
+    Parameter repeat: The number of runs of each suite
+    Precondition: repeat is an int > 1
+    """
+    samples = {}
+    for name in suites:
+        for run in range(repeat):
+            print('running %s suite (%d of %d)' % (name, run+1, repeat), file=sys.stderr)
+            for (metric, value) in SUITES[name](settings).items():
+                samples.setdefault(metric, []).append(value)
+    return dict((metric, summarize(values)) for (metric, values) in samples.items())
+
+
+def summarize(values):
+    """
+    Returns a dictionary with the mean of the values and its confidence interval.
+
+    The dictionary has the mean, the standard deviation, the bounds low and high of
+    the 95% confidence interval of the mean, and the values themselves.
+
+    Parameter values: The value of a metric in each run
+    Precondition: values is a non-empty list of numbers
+    """
+    n = len(values)
+    mean = sum(values)/n
+    if n > 1:
+        stdev = math.sqrt(sum((value-mean)**2 for value in values)/(n-1))
+        margin = _T_975[min(n-1, len(_T_975))-1]*stdev/math.sqrt(n)
+    else:
+        stdev = 0.0
+        margin = 0.0
+    return {'mean': mean, 'stdev': stdev, 'low': mean-margin, 'high': mean+margin,
+            'samples': values}
+
+
+def compare(base, current, threshold):
+    """
+    Returns the comparison of a new run with a baseline, as a list of rows.
+
+    Each row is the tuple (metric, base, current, change, status), where base and
+    current are the statistics of the metric, change is the relative change of its
+    mean, and status is 'slower' (a regression), 'faster', 'same', 'new' (not in the
+    baseline) or 'gone' (not in the new run).  The rows are sorted by change, the
+    largest regression first.
+
+    Parameter base: The statistics of the baseline
+    Precondition: base is a dictionary of statistics made by summarize
+
+    Parameter current: The statistics of the new run
+    Precondition: current is a dictionary of statistics made by summarize
+
+    Parameter threshold: The fraction by which a metric may get slower
+    Precondition: threshold is a float >= 0
+    """
+    rows = []
+    for metric in sorted(set(base) | set(current)):
+        if metric not in base:
+            rows.append((metric, None, current[metric], 0.0, 'new'))
+            continue
+        if metric not in current:
+            rows.append((metric, base[metric], None, 0.0, 'gone'))
+            continue
+        old = base[metric]
+        new = current[metric]
+        change = (new['mean']-old['mean'])/old['mean'] if old['mean'] > 0 else 0.0
+        if change > threshold and new['low'] > old['high']:
+            status = 'slower'
+        elif change < -threshold and new['high'] < old['low']:
+            status = 'faster'
+        else:
+            status = 'same'
+        rows.append((metric, old, new, change, status))
+    rows.sort(key=lambda row: -row[3])
+    return rows
+
+
+def report(rows, verbose=False):
+    """
+    Prints the table of a comparison made by compare.
+
+    Only the metrics that changed are printed, unless verbose is True.
+
+    Parameter rows: The comparison
+    Precondition: rows is a list made by compare
+
+    Parameter verbose: Whether to print the metrics that stayed the same
+    Precondition: verbose is a bool
+    """
+    print('%-36s %19s %19s %8s  %s' % ('metric (us)', 'baseline', 'current',
+                                       'change', 'status'))
+    for (metric, old, new, change, status) in rows:
+        if status == 'same' and not verbose:
+            continue
+        print('%-36s %19s %19s %+7.1f%%  %s' % (metric, _interval(old), _interval(new),
+                                                100*change, status))
+    counts = dict((status, 0) for status in ('slower', 'faster', 'same', 'new', 'gone'))
+    for row in rows:
+        counts[row[4]] += 1
+    print('%(slower)d slower, %(faster)d faster, %(same)d same, %(new)d new, '
+          '%(gone)d gone' % counts)
+
+
+def loadBaselines(path):
+    """
+    Returns the baselines in the file, as a dictionary by name.
+
+    A file that does not exist has no baselines.
+
+    Parameter path: The baseline file
+    Precondition: path is a str
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def saveBaselines(path, baselines):
+    """
+    Writes the baselines to the file.
+
+    Parameter path: The baseline file
+    Precondition: path is a str
+
+    Parameter baselines: The baselines, by name
+    Precondition: baselines is a dictionary of baselines
+    """
+    with open(path, 'w') as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def parse(args=None):
+    """
+    Returns the command line options of the baselines.
+
+    Parameter args: The arguments to parse (None for the ones in sys.argv)
+    Precondition: args is a list of str or None
+    """
+    parser = argparse.ArgumentParser(description='Save and check benchmark baselines.')
+    parser.add_argument('command', choices=('save', 'check', 'list'))
+    parser.add_argument('name', nargs='?', default='main',
+                        help='the name of the baseline (default: main)')
+    parser.add_argument('--file', default=BASELINE_FILE, help='the baseline file')
+    parser.add_argument('--suite', choices=('wave', 'game2d', 'all'), default=None,
+                        help='the suites to save (default: wave); a check runs the '
+                             'suites of the baseline')
+    parser.add_argument('--repeat', type=_repeat, default=None,
+                        help='the runs of each suite, at least 2 (default: %d, or the '
+                             'number in the baseline)' % BASELINE_REPEAT)
+    parser.add_argument('--threshold', type=float, default=BASELINE_THRESHOLD,
+                        help='the fraction a metric may get slower')
+    parser.add_argument('--frames', type=int, default=BASELINE_FRAMES,
+                        help='the ticks of each formation of the wave suite')
+    parser.add_argument('--number', type=int, default=BASELINE_NUMBER,
+                        help='the calls of each benchmark of the game2d suite')
+    parser.add_argument('--no-stress', dest='stress', action='store_false',
+                        help='skip the oversized formations of the wave suite')
+    parser.add_argument('--verbose', action='store_true',
+                        help='print the metrics that stayed the same')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """
+    Carries out the command given on the command line.
+
+    Returns the exit status: 1 if a check found a regression or the baseline is
+    missing, and 0 otherwise.
+
+    Parameter args: The arguments to parse (None for the ones in sys.argv)
+    Precondition: args is a list of str or None
+    """
+    options = parse(args)
+    baselines = loadBaselines(options.file)
+    if options.command == 'list':
+        for (name, baseline) in sorted(baselines.items()):
+            print('%-16s %-24s %s (%d runs, %d metrics)' %
+                  (name, baseline['created'], ','.join(baseline['suites']),
+                   baseline['repeat'], len(baseline['metrics'])))
+        return 0
+
+    if options.command == 'save':
+        suite = 'wave' if options.suite is None else options.suite
+        suites = list(SUITES) if suite == 'all' else [suite]
+        repeat = BASELINE_REPEAT if options.repeat is None else options.repeat
+        settings = {'frames': options.frames, 'seed': 0, 'speed': ALIEN_SPEED,
+                    'stress': options.stress, 'number': options.number}
+        metrics = collect(suites, settings, repeat)
+        baselines[options.name] = {'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                   'suites': suites, 'repeat': repeat,
+                                   'settings': settings, 'metrics': metrics}
+        saveBaselines(options.file, baselines)
+        print('saved baseline %s with %d metrics' % (options.name, len(metrics)))
+        return 0
+
+    if options.name not in baselines:
+        print('there is no baseline named %s in %s' % (options.name, options.file))
+        print('save one first, with: python baseline.py save %s' % options.name)
+        return 1
+    baseline = baselines[options.name]
+    repeat = baseline['repeat'] if options.repeat is None else options.repeat
+    metrics = collect(baseline['suites'], baseline['settings'], repeat)
+    rows = compare(baseline['metrics'], metrics, options.threshold)
+    report(rows, options.verbose)
+    return 1 if any(row[4] == 'slower' for row in rows) else 0
+
+
+# HELPER FUNCTIONS
+def _repeat(text):
+    """
+    Returns the number of runs given on the command line.
+
+    A confidence interval needs at least two runs, so any fewer is an error.
+
+    Parameter text: The number of runs
+    Precondition: text is a str
+    """
+    try:
+        repeat = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError('%s is not a number of runs' % repr(text))
+    if repeat < 2:
+        raise argparse.ArgumentTypeError('needs at least 2 runs, not %d' % repeat)
+    return repeat
+
+
+def _interval(stats):
+    """
+    Returns the mean and confidence interval of the statistics as a str.
+
+    Parameter stats: The statistics of a metric (None if there are none)
+    Precondition: stats is a dictionary made by summarize, or None
+    """
+    if stats is None:
+        return '-'
+    return '%.2f +- %.2f' % (stats['mean'], stats['high']-stats['mean'])
+
+
+# Application code
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Batch runner for Alien Invaders
+
+This module plays many games headless, spread over every core with a process pool.
+Each game has its own seed, its own input (a scripted bot, or a recording from
+replay.py) and its own settings for the size of the formation, the alien speed and
+the bolt rate.  Each game reports how far it got: the waves cleared, the ticks
+played, the aliens killed and how many ticks per second it simulated.
+
+To play 64 games with the bot, with seeds 1000 to 1063 and a faster first wave:
+
+    python batch.py --games 64 --seed 1000 --speed 0.5
+
+To play back recordings instead (each one is a game):
+
+    python batch.py --replay game1.replay game2.replay
+"""
+from consts import *
+from sim import *
+from replay import *
+import argparse
+import json
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# PRIMARY RULE: This module may only access consts.py, sim.py and replay.py.  Like
+# those modules, it must never import game2d.
+
+# The most ticks a single game may last, unless told otherwise (an hour of play)
+BATCH_FRAMES = 216000
+
+
+class Bot(object):
+    """
+    A class to play a game with a simple script, in place of GInput.
+
+    The bot starts the game, resumes it whenever it is paused, keeps the ship under
+    the lowest living alien and fires whenever it can.  It decides which keys to hold
+    once per tick, from the state of the game after the last tick.  Call nextFrame
+    after every tick, like ReplayInput.
+
+    INSTANCE ATTRIBUTES:
+        _game: the game being played [GameSim]
+        _keys: the keys held down this tick [set of str]
+    """
+
+    def __init__(self, game):
+        """
+        Initializes a bot to play the given game.
+
+        Parameter game: The game to play
+        Precondition: game is a GameSim
+        """
+        self._game = game
+        self._keys = set()
+        self.nextFrame()
+
+    def is_key_down(self, key):
+        """
+        Returns True if the bot holds the key down this tick.
+
+        Parameter key: The key to test
+        Precondition: key is a str
+        """
+        return key in self._keys
+
+    def nextFrame(self):
+        """
+        Decides which keys to hold down for the next tick.
+        """
+        state = self._game.getState()
+        if state == STATE_INACTIVE:
+            self._keys = {'x'}
+        elif state == STATE_PAUSED:
+            self._keys = {'r'}
+        elif state == STATE_ACTIVE:
+            self._keys = {'up'}
+            wave = self._game.getWave()
+            if wave.getAlienCount() > 0:
+                xs, ys, alive = wave.getAlienArrays()
+                pos = np.argmin(np.where(alive, ys, np.inf))
+                dx = float(xs.flat[pos])-wave.getShipX()
+                if dx > SHIP_MOVEMENT:
+                    self._keys.add('right')
+                elif dx < -SHIP_MOVEMENT:
+                    self._keys.add('left')
+        else:
+            self._keys = set()
+
+
+def runGame(job):
+    """
+    Returns a dictionary with the results of playing a single game.
+
+    The job says how to play the game.  It is a dictionary with these keys:
+
+        seed:     the seed of the game [int >= 0]
+        replay:   the recording to play, or None to use a Bot [str or None]
+        rows:     the number of rows of aliens [int > 0 or None]
+        cols:     the number of aliens per row [int > 0 or None]
+        speed:    the alien speed of the first wave [float > 0 or None]
+        boltRate: the upper limit on the alien steps between bolts [int > 1 or None]
+        frames:   the most ticks to play [int > 0]
+
+    A setting that is None comes from the recording, or from consts.py if there is
+    no recording.  The seed also comes from the recording, if there is one.  The game
+    ends when every life is lost, when the recording runs out or after the given
+    number of ticks, whichever comes first.
+
+    This is a function, not a method, so that a process pool can send it to the
+    other processes.
+
+    Parameter job: The settings of the game
+    Precondition: job is a dictionary as described above
+    """
+    replay = None if job['replay'] is None else load(job['replay'])
+    if replay is None:
+        seed = job['seed']
+        defaults = (ALIEN_ROWS, ALIENS_IN_ROW, ALIEN_SPEED, BOLT_RATE)
+    else:
+        seed = replay.seed
+        defaults = (replay.rows, replay.cols, replay.speed, replay.boltRate)
+    rows = defaults[0] if job['rows'] is None else job['rows']
+    cols = defaults[1] if job['cols'] is None else job['cols']
+    speed = defaults[2] if job['speed'] is None else job['speed']
+    boltRate = defaults[3] if job['boltRate'] is None else job['boltRate']
+    game = GameSim(seed, speed, rows, cols, boltRate)
+
+    if replay is None:
+        input = Bot(game)
+        frames = job['frames']
+    else:
+        input = ReplayInput(replay)
+        frames = min(job['frames'], replay.frames)
+
+    start = time.perf_counter()
+    for frame in range(frames):
+        game.tick(input)
+        input.nextFrame()
+        if game.isOver():
+            break
+    elapsed = time.perf_counter()-start
+    return {'seed': seed, 'replay': job['replay'], 'rows': rows, 'cols': cols,
+            'speed': speed, 'boltRate': boltRate,
+            'waves': game.getWavesCleared(), 'frames': game.getFrame(),
+            'kills': game.getKills(), 'over': game.isOver(), 'seconds': elapsed,
+            'ticksPerSecond': game.getFrame()/elapsed if elapsed > 0 else 0.0}
+
+
+def runBatch(jobs, workers=None):
+    """
+    Returns the results of playing every job, in the same order as the jobs.
+
+    The games are played in a pool of worker processes, one per core unless told
+    otherwise (see runGame for the jobs and the results).
+
+    Parameter jobs: The games to play
+    Precondition: jobs is a list of dictionaries as described in runGame
+
+    Parameter workers: The number of processes to use (None for one per core)
+    Precondition: workers is an int > 0 or None
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(runGame, jobs, chunksize=max(1, len(jobs)//64)))
+
+
+def parse(args=None):
+    """
+    Returns the command line options of the batch runner.
+
+    Parameter args: The arguments to parse (None for the ones in sys.argv)
+    Precondition: args is a list of str or None
+    """
+    parser = argparse.ArgumentParser(description='Play Alien Invaders games headless.')
+    parser.add_argument('--games', type=int, default=os.cpu_count() or 1,
+                        help='the number of games for the bot to play')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='the seed of the first game; each game adds one')
+    parser.add_argument('--replay', nargs='+', default=None,
+                        help='play these recordings instead of the bot')
+    parser.add_argument('--rows', type=int, default=None, help='ALIEN_ROWS')
+    parser.add_argument('--cols', type=int, default=None, help='ALIENS_IN_ROW')
+    parser.add_argument('--speed', type=float, default=None, help='ALIEN_SPEED')
+    parser.add_argument('--bolt-rate', type=int, default=None, help='BOLT_RATE')
+    parser.add_argument('--frames', type=int, default=BATCH_FRAMES,
+                        help='the most ticks to play in each game')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='the number of processes (default: one per core)')
+    parser.add_argument('--json', default=None,
+                        help='also write the results to this file as JSON')
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """
+    Plays the games given on the command line and prints the results.
+
+    Parameter args: The arguments to parse (None for the ones in sys.argv)
+    Precondition: args is a list of str or None
+    """
+    options = parse(args)
+    settings = {'rows': options.rows, 'cols': options.cols, 'speed': options.speed,
+                'boltRate': options.bolt_rate, 'frames': options.frames}
+    if options.replay is None:
+        jobs = [dict(settings, seed=options.seed+pos, replay=None)
+                for pos in range(options.games)]
+    else:
+        jobs = [dict(settings, seed=None, replay=path) for path in options.replay]
+
+    start = time.perf_counter()
+    results = runBatch(jobs, options.workers)
+    elapsed = time.perf_counter()-start
+
+    print('%12s %6s %8s %6s %5s %12s' % ('seed', 'waves', 'frames', 'kills', 'over',
+                                         'ticks/s'))
+    for result in results:
+        print('%12d %6d %8d %6d %5s %12.0f' % (result['seed'], result['waves'],
+                                               result['frames'], result['kills'],
+                                               result['over'], result['ticksPerSecond']))
+    frames = sum(result['frames'] for result in results)
+    print('%d games, %d ticks in %.2f seconds (%.0f ticks per second overall)' %
+          (len(results), frames, elapsed, frames/elapsed if elapsed > 0 else 0.0))
+    if options.json is not None:
+        with open(options.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+# Application code
+if __name__ == '__main__':
+    main()
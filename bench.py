@@ -0,0 +1,286 @@
+"""
+Scaling benchmarks for Alien Invaders
+
+This module measures how the simulation of a wave scales with the size of the
+formation.  For every formation from 1x1 to 10x15 aliens (every value of ALIEN_ROWS
+and ALIENS_IN_ROW the command line allows), plus a few oversized stress formations,
+it plays the same input script on a WaveSim and reports:
+
+    ticksPerSecond: how many ticks per second the wave simulates
+    helpers:        for each helper called by WaveSim.step (handleShip, alienWalk,
+                    alienFire, boltActions and defenseLine), the number of calls and
+                    the p50, p99 and mean time of a call in microseconds
+
+Each formation is played twice.  The first run is untimed, and gives the ticks per
+second.  The second run gives every wave a WaveProfile (see sim.py), which times each
+helper.  The clocks add some overhead of their own, so its times are only comparable
+with each other.  When the ship is destroyed, the next ship appears at once.  A wave
+that has lost every life plays on, so that the stress formations (which start below
+the defense line) are not over before they begin.  Only a cleared wave is replaced by
+a fresh one of the same size.
+
+The input script is a recording from replay.py, or else a made-up script of random
+key holds, the same for every formation.  To benchmark with a recording and write
+the results to a file:
+
+    python bench.py --replay game.replay --json results.json
+"""
+from consts import *
+from sim import *
+from replay import *
+import argparse
+import json
+import random
+import time
+import numpy as np
+
+# PRIMARY RULE: This module may only access consts.py, sim.py and replay.py.  Like
+# those modules, it must never import game2d.
+
+# The number of ticks each formation plays, unless told otherwise (a minute of play)
+BENCH_FRAMES = 3600
+# The oversized formations played after the regular ones, as (rows, cols)
+BENCH_STRESS = ((20,30), (40,60), (100,100))
+# The helpers of WaveSim.step that are timed, in the order step calls them (the ones
+# a WaveProfile times in every tick)
+BENCH_HELPERS = PROFILE_HELPERS[:5]
+
+
+def wander(frames, seed=0):
+    """
+    Returns a made-up input script of the given number of ticks.
+
+    The script holds left, right or neither for a random number of ticks at a time,
+    and holds fire about half of the time.
+
+    Parameter frames: The number of ticks
+    Precondition: frames is an int >= 0
+
+    Parameter seed: The seed of the script
+    Precondition: seed is an int >= 0
+    """
+    rng = random.Random(seed)
+    script = []
+    while len(script) < frames:
+        move = rng.randrange(3)
+        fire = rng.random() < 0.5
+        for tick in range(rng.randrange(1,60)):
+            script.append((move == 1, move == 2, fire))
+    return script[:frames]
+
+
+def record(replay, frames=None):
+    """
+    Returns the input script of a recording.
+
+    The script only has the controls of the ship, read from the keys the same way as
+    GameSim.toActive reads them.  The keys that change the state of the game are
+    ignored, so the ship is always playing.
+
+    Parameter replay: The recording
+    Precondition: replay is a Replay
+
+    Parameter frames: The most ticks to read (None for the whole recording)
+    Precondition: frames is an int >= 0 or None
+    """
+    input = ReplayInput(replay)
+    frames = replay.frames if frames is None else min(frames, replay.frames)
+    script = []
+    for frame in range(frames):
+        left = input.is_key_down('left') or input.is_key_down('a')
+        right = input.is_key_down('right') or input.is_key_down('d')
+        fire = (input.is_key_down('up') or input.is_key_down('spacebar') or
+                input.is_key_down('w'))
+        script.append((left, right, fire))
+        input.nextFrame()
+    return script
+
+
+def play(script, rows, cols, speed=ALIEN_SPEED, seed=0, profiles=None):
+    """
+    Returns the number of seconds it takes to play the script on a wave.
+
+    If profiles is given, every wave gets a WaveProfile, which is appended to the
+    list profiles.
+
+    Parameter script: The controls (left, right, fire) of each tick
+    Precondition: script is a list of tuples of three bool
+
+    Parameter rows: The number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: The number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter speed: The number of seconds between alien steps
+    Precondition: speed is a float > 0
+
+    Parameter seed: The seed of the random numbers of the waves
+    Precondition: seed is an int >= 0
+
+    Parameter profiles: The list to add the profile of each wave to (None to not time)
+    Precondition: profiles is a list or None
+    """
+    rng = random.Random(seed)
+    wave = _wave(speed, rows, cols, rng, profiles)
+    start = time.perf_counter()
+    for (left, right, fire) in script:
+        wave.tick(left, right, fire)
+        if not wave.isShipAlive():
+            wave.loseLife()
+        if wave.isCleared():
+            wave = _wave(speed, rows, cols, rng, profiles)
+    return time.perf_counter()-start
+
+
+def measure(script, rows, cols, speed=ALIEN_SPEED, seed=0):
+    """
+    Returns a dictionary with the benchmark results of a single formation.
+
+    See the module description for the results.
+
+    Parameter script: The controls (left, right, fire) of each tick
+    Precondition: script is a non-empty list of tuples of three bool
+
+    Parameter rows: The number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: The number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter speed: The number of seconds between alien steps
+    Precondition: speed is a float > 0
+
+    Parameter seed: The seed of the random numbers of the waves
+    Precondition: seed is an int >= 0
+    """
+    elapsed = play(script, rows, cols, speed, seed)
+    profiles = []
+    play(script, rows, cols, speed, seed, profiles)
+
+    helpers = {}
+    for name in BENCH_HELPERS:
+        times = [call for profile in profiles for call in profile.getTimes(name)]
+        calls = np.array(times, dtype=np.float64)/1000
+        if len(calls) == 0:
+            helpers[name] = {'calls': 0, 'p50': 0.0, 'p99': 0.0, 'mean': 0.0}
+        else:
+            helpers[name] = {'calls': len(calls),
+                             'p50': float(np.percentile(calls, 50)),
+                             'p99': float(np.percentile(calls, 99)),
+                             'mean': float(calls.mean())}
+    return {'rows': rows, 'cols': cols, 'aliens': rows*cols, 'ticks': len(script),
+            'seconds': elapsed,
+            'ticksPerSecond': len(script)/elapsed if elapsed > 0 else 0.0,
+            'helpers': helpers}
+
+
+def formations(stress=True):
+    """
+    Returns the formations to benchmark, as a list of (rows, cols).
+
+    Parameter stress: Whether to add the formations of BENCH_STRESS
+    Precondition: stress is a bool
+    """
+    sizes = [(rows, cols) for rows in range(1,11) for cols in range(1,16)]
+    if stress:
+        sizes.extend(BENCH_STRESS)
+    return sizes
+
+
+def parse(args=None):
+    """
+    Returns the command line options of the benchmarks.
+
+    Parameter args: The arguments to parse (None for the ones in sys.argv)
+    Precondition: args is a list of str or None
+    """
+    parser = argparse.ArgumentParser(description='Benchmark Alien Invaders waves.')
+    parser.add_argument('--replay', default=None,
+                        help='play the keys of this recording (default: made-up keys)')
+    parser.add_argument('--frames', type=int, default=BENCH_FRAMES,
+                        help='the most ticks to play with each formation')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='the seed of the waves and of the made-up script')
+    parser.add_argument('--speed', type=float, default=ALIEN_SPEED, help='ALIEN_SPEED')
+    parser.add_argument('--no-stress', dest='stress', action='store_false',
+                        help='skip the oversized formations')
+    parser.add_argument('--json', default=None, help='write the results to this file')
+    return parser.parse_args(args)
+
+
+def run(options):
+    """
+    Returns a dictionary with the settings and the results of the benchmarks.
+
+    Parameter options: The settings of the benchmarks
+    Precondition: options has the attributes made by parse
+    """
+    if options.replay is None:
+        script = wander(options.frames, options.seed)
+    else:
+        script = record(load(options.replay), options.frames)
+    results = []
+    for (rows, cols) in formations(options.stress):
+        results.append(measure(script, rows, cols, options.speed, options.seed))
+    return {'replay': options.replay, 'frames': len(script), 'seed': options.seed,
+            'speed': options.speed, 'results': results}
+
+
+def main(args=None):
+    """
+    Runs the benchmarks given on the command line and prints the results.
+
+    Parameter args: The arguments to parse (None for the ones in sys.argv)
+    Precondition: args is a list of str or None
+    """
+    options = parse(args)
+    report = run(options)
+    header = '%5s %5s %10s' % ('rows', 'cols', 'ticks/s')
+    for name in BENCH_HELPERS:
+        header += ' %19s' % (name+' p50/p99')
+    print(header)
+    for result in report['results']:
+        line = '%5d %5d %10.0f' % (result['rows'], result['cols'],
+                                   result['ticksPerSecond'])
+        for name in BENCH_HELPERS:
+            helper = result['helpers'][name]
+            line += ' %9.1f/%9.1f' % (helper['p50'], helper['p99'])
+        print(line)
+    print('times are in microseconds')
+    if options.json is not None:
+        with open(options.json, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+# HELPER FUNCTIONS
+def _wave(speed, rows, cols, rng, profiles):
+    """
+    Returns a new wave, with a new profile if profiles is not None.
+
+    Parameter speed: The number of seconds between alien steps
+    Precondition: speed is a float > 0
+
+    Parameter rows: The number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: The number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter rng: The source of the random numbers of the wave
+    Precondition: rng is a random.Random
+
+    Parameter profiles: The list to add the profile of the wave to (None to not time)
+    Precondition: profiles is a list or None
+    """
+    wave = WaveSim(speed, rows, cols, rng)
+    if profiles is not None:
+        profile = WaveProfile()
+        wave.setProfile(profile)
+        profiles.append(profile)
+    return wave
+
+
+# Application code
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+"""
+Script to run the micro-benchmarks of the game2d package
+
+This script runs the benchmarks of game2d/gbench.py from the application directory.
+Kivy reads the command line when it is imported, and would reject the options of the
+benchmarks, so this script turns that off before it imports game2d.  It takes the
+options of gbench.main:
+
+    python bench2d.py --number 1000 --json results.json
+"""
+import os
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+from game2d import gbench
+
+
+# Application code
+if __name__ == '__main__':
+    gbench.main()
@@ -27,7 +27,7 @@ SHIP_WIDTH    = 44
 SHIP_HEIGHT   = 44
 # the distance of the (bottom of the) ship from the bottom of the screen
 SHIP_BOTTOM   = 32
-# The number of pixels to move the ship per update
+# The number of pixels to move the ship per simulation tick
 SHIP_MOVEMENT = 5
 # The number of lives a ship has
 SHIP_LIVES    = 3
@@ -70,7 +70,7 @@ ALIEN_SPEED_UP = 1.33
 BOLT_WIDTH  = 4
 # the height of a laser bolt
 BOLT_HEIGHT = 16
-# the number of pixels to move the bolt per update
+# the number of pixels to move the bolt per simulation tick
 BOLT_SPEED  = 5
 # the number of ALIEN STEPS (not frames) between bolts
 BOLT_RATE   = 10
@@ -94,6 +94,9 @@ STATE_COMPLETE = 5
 # length of time in seconds that a screen will be displayed
 SCREEN_TIME = 5.0
 
+# the seed for the random numbers of a game (None picks a different seed every game)
+RANDOM_SEED = None
+
 
 ### USE COMMAND LINE ARGUMENTS TO CHANGE NUMBER OF ALIENS IN A ROW"""
 """
@@ -102,29 +105,88 @@ arguments are everything after the word python. So if you start the game typing
 
     python invaders 3 4 0.5
 
-Python puts ['breakout.py', '3', '4', '0.5'] into sys.argv. Below, we take
+Python puts ['breakout.py', '3', '4', '0.5'] into sys.argv. The function below takes
 advantage of this fact to change the constants ALIEN_ROWS, ALIENS_IN_ROW, and
-ALIEN_SPEED.
+ALIEN_SPEED.  An optional fourth argument sets RANDOM_SEED, so that the same
+seed and the same key presses always play the same game.
+
+Only the game itself reads these arguments: __main__.py calls readArguments before
+it imports the rest of the game.  The other scripts (batch.py, bench.py, baseline.py
+and so on) have command lines of their own, so importing this module must never
+read sys.argv.
 """
-try:
-    rows = int(sys.argv[1])
-    if rows >= 1 and rows <= 10:
-        ALIEN_ROWS = rows
-except:
-    pass # Use original value
-
-try:
-    perrow = int(sys.argv[2])
-    if perrow >= 1 and perrow <= 15:
-        ALIENS_IN_ROW = perrow
-except:
-    pass # Use original value
-
-try:
-    speed = float(sys.argv[3])
-    if speed > 0 and speed <= 3:
-        ALIEN_SPEED = speed
-except:
-    pass # Use original value
+def readArguments(argv):
+    """
+    Changes ALIEN_ROWS, ALIENS_IN_ROW, ALIEN_SPEED and RANDOM_SEED to the command line
+    arguments of the game, if they are given and valid.
+
+    This must be called before any module that uses these constants is imported, as
+    those modules copy the constants when they are imported.
+
+    Parameter argv: The command line arguments, with the script name first
+    Precondition: argv is a list of str
+    """
+    global ALIEN_ROWS, ALIENS_IN_ROW, ALIEN_SPEED, RANDOM_SEED
+    try:
+        rows = int(argv[1])
+        if rows >= 1 and rows <= 10:
+            ALIEN_ROWS = rows
+    except:
+        pass # Use original value
+
+    try:
+        perrow = int(argv[2])
+        if perrow >= 1 and perrow <= 15:
+            ALIENS_IN_ROW = perrow
+    except:
+        pass # Use original value
+
+    try:
+        speed = float(argv[3])
+        if speed > 0 and speed <= 3:
+            ALIEN_SPEED = speed
+    except:
+        pass # Use original value
+
+    try:
+        RANDOM_SEED = int(argv[4])
+    except:
+        pass # Use original value
 
 ### ADD MORE CONSTANTS (PROPERLY COMMENTED) AS NECESSARY ###
+
+
+### SIMULATION CONSTANTS ###
+
+# event recorded by the simulation when the player fires a bolt
+EVENT_SHIP_FIRE  = 'ship-fire'
+# event recorded by the simulation when an alien fires a bolt
+EVENT_ALIEN_FIRE = 'alien-fire'
+# event recorded by the simulation when a player bolt destroys an alien
+EVENT_ALIEN_DIE  = 'alien-die'
+# event recorded by the simulation when an alien bolt destroys the ship
+EVENT_SHIP_DIE   = 'ship-die'
+
+# the keys a game reads, in the order of their bits in a replay
+REPLAY_KEYS = ('x','p','r','left','a','right','d','up','spacebar','w')
+# the file to save a replay of the game to when the window closes (None to not save)
+REPLAY_FILE = None
+# whether a replay records the hash of the game after every tick (8 bytes per tick, so
+# about 60 KB per 6000 ticks, against a few kilobytes for the keys); turn it on to
+# find the tick where a replay stops matching the game
+REPLAY_HASHES = False
+# the number of ticks between two keyframes of a replay archive
+ARCHIVE_INTERVAL = 3600
+
+# the length in seconds of a single simulation tick
+SIM_TICK      = 1/60
+# the most ticks simulated in a single frame; any time beyond that is dropped
+SIM_MAX_TICKS = 5
+
+# whether to show the frame times (see GameApp.overlay) on top of the game
+FRAME_OVERLAY = False
+# whether to time the helpers of every wave and print a report when the wave ends
+WAVE_PROFILE = False
+# the file to write a timeline of the game to, for Perfetto or chrome://tracing (None to
+# not trace the game; see GTracer)
+TRACE_FILE = None
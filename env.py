@@ -0,0 +1,980 @@
+"""
+Learning environments for Alien Invaders
+
+This module wraps the rules of a wave in the reset/step interface used for
+reinforcement learning.  An episode is a single wave.  Each step is one simulation
+tick: the agent picks one of the ACTIONS, and the environment returns what it now
+observes, the reward for that tick and whether the episode is done.  The reward is
+ENV_KILL_REWARD for each alien killed and ENV_LIFE_REWARD for each life lost.  The
+episode is done when every alien is dead or every life is lost.  When the ship is
+destroyed, the next ship appears at once; there is no pause as in the game.
+
+The class InvadersEnv plays a single wave with a WaveSim, so it follows the rules of
+the game exactly.  The class VecInvadersEnv plays many waves at once.  It keeps the
+state of every wave in the same NumPy arrays, with one row per wave, so a step costs
+the same few dozen array operations however many waves there are.  It follows the
+same rules, but draws its random numbers from one NumPy generator for all of its
+waves, so it does not play the same waves as InvadersEnv for a given seed.  The class
+SharedVecEnv spreads the waves of a VecInvadersEnv over several processes, and passes
+the observations back through shared memory.
+
+The class WaveEncoder turns the state of a WaveSim into a tensor of small integers,
+for agents that would rather see the screen as an image than as a dictionary.
+
+An observation is a dictionary of arrays (VecInvadersEnv adds a first dimension, with
+one entry per wave):
+
+    alive:    whether each alien of the lattice is alive [bool array (rows,cols)]
+    aliens:   the (x, y) position of the top left alien of the lattice, living or
+              not; the other aliens are ALIEN_H_SEP+ALIEN_WIDTH apart horizontally
+              and ALIEN_V_SEP+ALIEN_HEIGHT apart vertically [float array (2,)]
+    ship:     the horizontal coordinate of the ship center [float]
+    lives:    the number of lives left [int]
+    bolts:    the (x, y, isPlayer) of each bolt, padded with zeros
+              [float array (ENV_BOLTS,3)]
+    boltMask: which rows of bolts hold a bolt [bool array (ENV_BOLTS,)]
+"""
+from consts import *
+from sim import *
+from sim import _sweep
+import random
+import os
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+# PRIMARY RULE: This module may only access consts.py and sim.py.  Like those modules,
+# it must never import game2d.
+
+# The (left, right, fire) controls of each action
+ACTIONS = ((False, False, False), (True, False, False), (False, True, False),
+           (False, False, True), (True, False, True), (False, True, True))
+# The reward for each alien killed
+ENV_KILL_REWARD = 1.0
+# The reward for each life lost
+ENV_LIFE_REWARD = -1.0
+# The most bolts in an observation (VecInvadersEnv also has no room for more)
+ENV_BOLTS = 32
+# The number of pixels on a side of a cell of the coarse grid of a WaveEncoder
+ENV_CELL = 25
+# The seconds a waiting SharedVecEnv process spins after its last command or answer
+ENV_SPIN = 0.002
+# The seconds a waiting SharedVecEnv process sleeps at a time once it stops spinning
+ENV_NAP = 0.001
+
+# The channels of a WaveEncoder tensor
+CHANNEL_ALIENS = 0
+CHANNEL_PLAYER = 1
+CHANNEL_BOLTS  = 2
+CHANNEL_SHIP   = 3
+
+# The keys of an observation
+_OBSERVATION = ('alive', 'aliens', 'ship', 'lives', 'bolts', 'boltMask')
+# The operations a SharedVecEnv worker can be told to do
+_RESET = 1
+_STEP = 2
+_CLOSE = 3
+
+# The controls of each action, as arrays indexed by action
+_LEFT = np.array([action[0] for action in ACTIONS])
+_RIGHT = np.array([action[1] for action in ACTIONS])
+_FIRE = np.array([action[2] for action in ACTIONS])
+
+
+class InvadersEnv(object):
+    """
+    A class to play a single wave one tick at a time, for a learning agent.
+
+    INSTANCE ATTRIBUTES:
+        _wave:     the wave being played [WaveSim, or None before the first reset]
+        _speed:    the alien speed of every wave [float > 0]
+        _rows:     the number of rows of aliens [int > 0]
+        _cols:     the number of aliens per row [int > 0]
+        _boltRate: the bolt rate of every wave (see WaveSim) [int > 1]
+    """
+
+    def __init__(self, speed=ALIEN_SPEED, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW,
+                 boltRate=BOLT_RATE):
+        """
+        Initializes an environment.  Call reset to start the first episode.
+
+        Parameter speed: The number of seconds between alien steps
+        Precondition: speed is a float > 0
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter boltRate: The upper limit (exclusive) on the alien steps between bolts
+        Precondition: boltRate is an int > 1
+        """
+        self._wave = None
+        self._speed = speed
+        self._rows = rows
+        self._cols = cols
+        self._boltRate = boltRate
+
+    def getWave(self):
+        """
+        Returns the wave being played, or None before the first reset.
+        """
+        return self._wave
+
+    def reset(self, seed=None):
+        """
+        Returns the first observation of a new episode.
+
+        Parameter seed: The seed of the episode (None for a random one)
+        Precondition: seed is an int >= 0 or None
+        """
+        self._wave = WaveSim(self._speed, self._rows, self._cols, random.Random(seed),
+                             self._boltRate)
+        return self.observe()
+
+    def step(self, action):
+        """
+        Returns the tuple (observation, reward, done) after one tick.
+
+        Parameter action: The index of the action in ACTIONS
+        Precondition: action is an int in 0..len(ACTIONS)-1
+        """
+        wave = self._wave
+        (left, right, fire) = ACTIONS[action]
+        kills = wave.getAlienCount()
+        lives = wave.getLives()
+        wave.tick(left, right, fire)
+        if not wave.isShipAlive():
+            wave.loseLife()
+        reward = ((kills-wave.getAlienCount())*ENV_KILL_REWARD +
+                  (lives-wave.getLives())*ENV_LIFE_REWARD)
+        done = wave.isCleared() or wave.getLives() == 0
+        return (self.observe(), reward, done)
+
+    def observe(self):
+        """
+        Returns the observation of the current state (see the module description).
+        """
+        wave = self._wave
+        xs, ys, alive = wave.getAlienArrays()
+        bx, by, player = wave.getBoltArrays()
+        n = min(len(bx), ENV_BOLTS)
+        bolts = np.zeros((ENV_BOLTS,3))
+        bolts[:n,0] = bx[:n]
+        bolts[:n,1] = by[:n]
+        bolts[:n,2] = player[:n]
+        mask = np.zeros(ENV_BOLTS, dtype=bool)
+        mask[:n] = True
+        return {'alive': alive.copy(), 'aliens': np.array([xs[0,0], ys[0,0]]),
+                'ship': wave.getShipX(), 'lives': wave.getLives(), 'bolts': bolts,
+                'boltMask': mask}
+
+
+class VecInvadersEnv(object):
+    """
+    A class to play many independent waves at once, one tick at a time.
+
+    Every attribute of a wave is an array with one entry per wave.  The aliens move
+    together, so their positions are not stored: the position of an alien is its
+    place in the lattice of a fresh wave, plus the offset of its wave.  The bolts of
+    each wave are kept in ENV_BOLTS slots; an alien that fires when every slot is full
+    does not get a bolt.  A wave has at most one player bolt.
+
+    When a wave is done, step starts a new one in its place, so every wave is always
+    playing.  The observation returned by that step is the first one of the new wave.
+
+    INSTANCE ATTRIBUTES:
+        _count:      the number of waves [int > 0]
+        _speed:      the number of seconds between alien steps [float > 0]
+        _boltRate:   the upper limit (exclusive) on the fire rate [int > 1]
+        _rng:        the source of every random choice [numpy.random.Generator]
+        _baseX:      the horizontal coordinate of each column in a fresh wave
+                     [float array (cols,)]
+        _baseY:      the vertical coordinate of each row in a fresh wave
+                     [float array (rows,)]
+        _alive:      whether each alien is alive [bool array (count,rows,cols)]
+        _dx:         the horizontal offset of the aliens [float array (count,)]
+        _dy:         the vertical offset of the aliens [float array (count,)]
+        _direction:  the direction of the alien march, 1 for right and -1 for left
+                     [float array (count,)]
+        _time:       the time since the last alien step [float array (count,)]
+        _alienSteps: the alien steps since the last alien bolt [int array (count,)]
+        _fireRate:   the alien steps between alien bolts [int array (count,)]
+        _shipX:      the horizontal coordinate of the ship center [float array (count,)]
+        _lives:      the number of lives left [int array (count,)]
+        _boltX:      the horizontal bolt coordinates [float array (count,ENV_BOLTS)]
+        _boltY:      the vertical bolt coordinates [float array (count,ENV_BOLTS)]
+        _boltV:      the bolt velocities [float array (count,ENV_BOLTS)]
+        _boltOn:     whether each slot holds a bolt [bool array (count,ENV_BOLTS)]
+        _boltPlayer: whether each bolt was fired by the player
+                     [bool array (count,ENV_BOLTS)]
+    """
+
+    def __init__(self, count, speed=ALIEN_SPEED, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW,
+                 boltRate=BOLT_RATE):
+        """
+        Initializes an environment with count waves.  Call reset to start them.
+
+        Parameter count: The number of waves to play at once
+        Precondition: count is an int > 0
+
+        Parameter speed: The number of seconds between alien steps
+        Precondition: speed is a float > 0
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter boltRate: The upper limit (exclusive) on the alien steps between bolts
+        Precondition: boltRate is an int > 1
+        """
+        self._count = count
+        self._speed = speed
+        self._boltRate = boltRate
+        self._rng = np.random.default_rng()
+        # The same lattice as WaveSim.fill
+        self._baseX = ((2+np.arange(cols))*ALIEN_H_SEP+
+                       np.arange(cols)*ALIEN_WIDTH).astype(np.float64)
+        self._baseY = (GAME_HEIGHT-ALIEN_CEILING-
+                       np.arange(rows)*(ALIEN_V_SEP+ALIEN_HEIGHT)).astype(np.float64)
+        self._alive = np.ones((count,rows,cols), dtype=bool)
+        self._dx = np.zeros(count)
+        self._dy = np.zeros(count)
+        self._direction = np.ones(count)
+        self._time = np.zeros(count)
+        self._alienSteps = np.zeros(count, dtype=np.int64)
+        self._fireRate = np.ones(count, dtype=np.int64)
+        self._shipX = np.full(count, GAME_WIDTH/2)
+        self._lives = np.full(count, SHIP_LIVES, dtype=np.int64)
+        self._boltX = np.zeros((count,ENV_BOLTS))
+        self._boltY = np.zeros((count,ENV_BOLTS))
+        self._boltV = np.zeros((count,ENV_BOLTS))
+        self._boltOn = np.zeros((count,ENV_BOLTS), dtype=bool)
+        self._boltPlayer = np.zeros((count,ENV_BOLTS), dtype=bool)
+
+    def getCount(self):
+        """
+        Returns the number of waves played at once.
+        """
+        return self._count
+
+    def reset(self, seed=None, out=None):
+        """
+        Returns the first observation of a new episode in every wave.
+
+        Parameter seed: The seed of the random number generator (None for a random one)
+        Precondition: seed is an int >= 0, a sequence of int >= 0, or None
+
+        Parameter out: The arrays to write the observations into (see observe)
+        Precondition: out is a dictionary of observation arrays, or None
+        """
+        self._rng = np.random.default_rng(seed)
+        self.restart(np.ones(self._count, dtype=bool))
+        return self.observe(out)
+
+    def step(self, actions, out=None):
+        """
+        Returns the tuple (observations, rewards, dones) after one tick of every wave.
+
+        The rewards and dones are arrays with one entry per wave.  A wave that is done
+        has already been restarted, and its observation is of the new wave.
+
+        Parameter actions: The index in ACTIONS of the action for each wave
+        Precondition: actions is an int array of length getCount()
+
+        Parameter out: The arrays to write the observations into (see observe)
+        Precondition: out is a dictionary of observation arrays, or None
+        """
+        actions = np.asarray(actions)
+        counts = self._alive.sum(axis=(1,2))
+        lives = self._lives.copy()
+
+        self._time += SIM_TICK
+        steps = np.floor(self._time/self._speed)
+        self._time -= steps*self._speed
+        steps = steps.astype(np.int64)
+        self._alienSteps += steps
+        steps[counts == 0] = 0
+        while steps.any():
+            self.alienWalk(steps > 0)
+            steps -= steps > 0
+
+        self.handleShip(_LEFT[actions], _RIGHT[actions], _FIRE[actions])
+        self.alienFire(counts > 0)
+        self.boltActions()
+        self.defenseLine()
+
+        left = self._alive.sum(axis=(1,2))
+        rewards = (counts-left)*ENV_KILL_REWARD+(lives-self._lives)*ENV_LIFE_REWARD
+        dones = (left == 0) | (self._lives <= 0)
+        if dones.any():
+            self.restart(dones)
+        return (self.observe(out), rewards, dones)
+
+    def observe(self, out=None):
+        """
+        Returns the observations of every wave (see the module description).
+
+        If out is given, the observations are written into its arrays and out is
+        returned, so nothing new is allocated for them.  This is how SharedVecEnv
+        writes observations straight into shared memory.
+
+        Parameter out: The arrays to write the observations into
+        Precondition: out is a dictionary with the keys of an observation, each an
+        array of the right shape (such as one returned by this method), or None
+        """
+        if out is None:
+            rows, cols = self._alive.shape[1:]
+            out = _observations(self._count, rows, cols)
+        on = self._boltOn
+        np.copyto(out['alive'], self._alive)
+        np.add(self._baseX[0], self._dx, out=out['aliens'][:,0])
+        np.add(self._baseY[0], self._dy, out=out['aliens'][:,1])
+        np.copyto(out['ship'], self._shipX)
+        np.copyto(out['lives'], self._lives)
+        bolts = out['bolts']
+        np.multiply(self._boltX, on, out=bolts[...,0])
+        np.multiply(self._boltY, on, out=bolts[...,1])
+        np.logical_and(on, self._boltPlayer, out=bolts[...,2], casting='unsafe')
+        np.copyto(out['boltMask'], on)
+        return out
+
+    # HELPER METHODS FOR step()
+    def restart(self, mask):
+        """
+        Starts a new wave in place of every selected wave.
+
+        Parameter mask: Which waves to restart
+        Precondition: mask is a bool array of length getCount()
+        """
+        self._alive[mask] = True
+        self._dx[mask] = 0
+        self._dy[mask] = 0
+        self._direction[mask] = 1
+        self._time[mask] = 0
+        self._alienSteps[mask] = 0
+        self._fireRate[mask] = self._rng.integers(1, self._boltRate, int(mask.sum()))
+        self._shipX[mask] = GAME_WIDTH/2
+        self._lives[mask] = SHIP_LIVES
+        self._boltOn[mask] = False
+
+    def alienWalk(self, mask):
+        """
+        Moves the aliens of every selected wave one step, as WaveSim.alienWalk does.
+
+        Parameter mask: Which waves take a step
+        Precondition: mask is a bool array of length getCount()
+        """
+        cols = self._alive.any(axis=1)
+        last = cols.shape[1]-1
+        right = self._baseX[last-np.argmax(cols[:,::-1], axis=1)]+self._dx
+        left = self._baseX[np.argmax(cols, axis=1)]+self._dx
+        limitRight = GAME_WIDTH-ALIEN_H_SEP-(.5*ALIEN_WIDTH)
+        limitLeft = ALIEN_H_SEP+(.5*ALIEN_WIDTH)
+        going = self._direction > 0
+        down = mask & np.where(going, right > limitRight, left < limitLeft)
+        walk = mask & ~down
+        self._dy[down] -= ALIEN_V_WALK
+        self._direction[down] *= -1
+        self._dx[walk] += self._direction[walk]*ALIEN_H_WALK
+
+    def handleShip(self, left, right, fire):
+        """
+        Moves the ships and fires player bolts, as WaveSim.handleShip does.
+
+        Parameter left: Whether each ship is steering left
+        Precondition: left is a bool array of length getCount()
+
+        Parameter right: Whether each ship is steering right
+        Precondition: right is a bool array of length getCount()
+
+        Parameter fire: Whether each player is pressing fire
+        Precondition: fire is a bool array of length getCount()
+        """
+        ship = self._shipX
+        ship[left] = np.maximum(ship[left]-SHIP_MOVEMENT, SHIP_WIDTH/2)
+        ship[right] = np.minimum(ship[right]+SHIP_MOVEMENT, GAME_WIDTH-SHIP_WIDTH/2)
+        fire = fire & ~(self._boltOn & self._boltPlayer).any(axis=1)
+        self.addBolts(fire, ship, np.full(self._count, SHIP_BOTTOM*1.0), True)
+
+    def alienFire(self, mask):
+        """
+        Fires an alien bolt in every selected wave that is due, as WaveSim.alienFire
+        does.
+
+        The shooter is the bottom alien of a random column with a living alien.
+
+        Parameter mask: Which waves may fire (the ones with living aliens)
+        Precondition: mask is a bool array of length getCount()
+        """
+        firing = mask & (self._alienSteps >= self._fireRate)
+        if not firing.any():
+            return
+
+        waves = np.flatnonzero(firing)
+        alive = self._alive[waves]
+        cols = alive.any(axis=1)
+        pick = np.floor(self._rng.random(len(waves))*cols.sum(axis=1))
+        col = np.argmax(np.cumsum(cols, axis=1) > pick[:,None], axis=1)
+        column = alive[np.arange(len(waves)),:,col]
+        row = column.shape[1]-1-np.argmax(column[:,::-1], axis=1)
+        xs = np.zeros(self._count)
+        ys = np.zeros(self._count)
+        xs[waves] = self._baseX[col]+self._dx[waves]
+        ys[waves] = self._baseY[row]+self._dy[waves]
+        self.addBolts(firing, xs, ys, False)
+        self._alienSteps[waves] = 0
+        self._fireRate[waves] = self._rng.integers(1, self._boltRate, len(waves))
+
+    def boltActions(self):
+        """
+        Moves the bolts and detects collisions, as WaveSim.boltActions does.
+
+        A player bolt kills the first living alien on its path.  When an alien bolt
+        hits a ship, the wave loses a life, the ship returns to the center and every
+        bolt of the wave is removed.  Bolts that leave the screen are removed.
+        """
+        y0 = self._boltY.copy()
+        self._boltY += self._boltV
+        on = self._boltOn
+        player = on & self._boltPlayer
+
+        shooting = np.flatnonzero(player.any(axis=1))
+        if len(shooting):
+            slot = np.argmax(player[shooting], axis=1)
+            bx = self._boltX[shooting,slot][:,None,None]
+            by0 = y0[shooting,slot][:,None,None]
+            by1 = self._boltY[shooting,slot][:,None,None]
+            ax = (self._baseX[None,None,:]+self._dx[shooting,None,None])
+            ay = (self._baseY[None,:,None]+self._dy[shooting,None,None])
+            hits = _sweep(bx, by0, by1, ax, ay, ALIEN_WIDTH, ALIEN_HEIGHT)
+            hits &= self._alive[shooting]
+            rows = hits.any(axis=2)
+            hit = rows.any(axis=1)
+            if hit.any():
+                # Player bolts move up, so the bottom row comes first
+                waves = shooting[hit]
+                row = rows.shape[1]-1-np.argmax(rows[hit][:,::-1], axis=1)
+                col = np.argmax(hits[hit,row], axis=1)
+                self._alive[waves,row,col] = False
+                on[waves,slot[hit]] = False
+
+        alien = on & ~self._boltPlayer
+        struck = (alien & _sweep(self._boltX, y0, self._boltY, self._shipX[:,None],
+                                 SHIP_BOTTOM, SHIP_WIDTH, SHIP_HEIGHT)).any(axis=1)
+        if struck.any():
+            self._lives[struck] -= 1
+            self._shipX[struck] = GAME_WIDTH/2
+            on[struck] = False
+
+        on &= (self._boltY <= GAME_HEIGHT) & (self._boltY >= -BOLT_HEIGHT)
+
+    def addBolts(self, mask, xs, ys, isPlayer):
+        """
+        Adds a bolt to the first free slot of every selected wave.
+
+        Parameter mask: Which waves get a bolt
+        Precondition: mask is a bool array of length getCount()
+
+        Parameter xs: The horizontal coordinate of each new bolt
+        Precondition: xs is a float array of length getCount()
+
+        Parameter ys: The vertical coordinate of each new bolt
+        Precondition: ys is a float array of length getCount()
+
+        Parameter isPlayer: Whether the bolts were fired by the player
+        Precondition: isPlayer is a bool
+        """
+        slot = np.argmin(self._boltOn, axis=1)
+        waves = np.flatnonzero(mask & ~self._boltOn[np.arange(self._count),slot])
+        slot = slot[waves]
+        self._boltX[waves,slot] = xs[waves]
+        self._boltY[waves,slot] = ys[waves]
+        self._boltV[waves,slot] = BOLT_SPEED if isPlayer else -BOLT_SPEED
+        self._boltPlayer[waves,slot] = isPlayer
+        self._boltOn[waves,slot] = True
+
+    def defenseLine(self):
+        """
+        Makes every wave with a living alien below the defense line lose every life.
+        """
+        rows = self._alive.any(axis=2)
+        last = rows.shape[1]-1
+        lowest = self._baseY[last-np.argmax(rows[:,::-1], axis=1)]+self._dy
+        breach = rows.any(axis=1) & (lowest-(.5*ALIEN_HEIGHT) < DEFENSE_LINE)
+        self._lives[breach] = 0
+
+
+class SharedVecEnv(object):
+    """
+    A class to play many waves at once, spread over several worker processes.
+
+    Each worker plays a VecInvadersEnv with its share of the waves.  Nothing is sent
+    between the processes: the actions, observations, rewards and dones all live in
+    one block of shared memory, and each worker writes the observations of its waves
+    straight into their rows.  The observations returned by reset and step are NumPy
+    views of that block.  They are only valid until the next call to reset or step,
+    so copy them if they must be kept.
+
+    The processes meet at a lock-free barrier.  Each worker has a command counter
+    and an answer counter in the shared block.  To step, the parent writes the
+    actions, then bumps the command counter of every worker.  A worker waiting for a
+    command sees its counter change, steps its waves and sets its answer counter to
+    the command counter.  The parent waits until every answer counter has caught up.
+    Each counter is only ever written by one process, so no lock is needed.
+
+    A waiting process spins, yielding the CPU between checks, for ENV_SPIN seconds
+    after its last command (or, for the parent, after sending one).  Back-to-back
+    steps never stop spinning, so they are answered at once.  After that it sleeps
+    ENV_NAP seconds between checks, so idle workers (for example while the parent
+    trains on a batch) cost next to no CPU.  The price is that the first command
+    after a pause may wait up to about ENV_NAP seconds longer.
+
+    Call close when done, or use the environment in a with statement, to stop the
+    workers and free the shared memory.
+
+    INSTANCE ATTRIBUTES:
+        _count:   the number of waves [int > 0]
+        _memory:  the shared block [multiprocessing.shared_memory.SharedMemory]
+        _views:   the arrays in the shared block, by name [dict of numpy arrays]
+        _obs:     the observation arrays in the shared block [dict of numpy arrays]
+        _workers: the worker processes [list of multiprocessing.Process]
+    """
+
+    def __init__(self, count, workers=None, speed=ALIEN_SPEED, rows=ALIEN_ROWS,
+                 cols=ALIENS_IN_ROW, boltRate=BOLT_RATE):
+        """
+        Initializes an environment with count waves and starts the workers.
+
+        Call reset to start the waves.
+
+        Parameter count: The number of waves to play at once
+        Precondition: count is an int > 0
+
+        Parameter workers: The number of worker processes (None for one per core)
+        Precondition: workers is an int > 0 or None
+
+        Parameter speed: The number of seconds between alien steps
+        Precondition: speed is a float > 0
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter boltRate: The upper limit (exclusive) on the alien steps between bolts
+        Precondition: boltRate is an int > 1
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = max(1, min(workers, count))
+        self._count = count
+        size = _sharedLayout(count, rows, cols, workers)[1]
+        self._memory = shared_memory.SharedMemory(create=True, size=size)
+        self._views = _sharedViews(self._memory.buf, count, rows, cols, workers)
+        self._obs = dict((key, self._views[key]) for key in _OBSERVATION)
+
+        bounds = np.linspace(0, count, workers+1).astype(int).tolist()
+        self._workers = []
+        for index in range(workers):
+            args = (self._memory.name, index, bounds[index], bounds[index+1], count,
+                    workers, speed, rows, cols, boltRate)
+            worker = multiprocessing.Process(target=_serve, args=args, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def __enter__(self):
+        """
+        Returns this environment, for use in a with statement.
+        """
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        """
+        Closes this environment at the end of a with statement.
+        """
+        self.close()
+
+    def getCount(self):
+        """
+        Returns the number of waves played at once.
+        """
+        return self._count
+
+    def reset(self, seed=None):
+        """
+        Returns the first observation of a new episode in every wave.
+
+        Each worker seeds its generator with the pair (seed, worker number).
+
+        Parameter seed: The seed of the random number generators (None for random ones)
+        Precondition: seed is an int >= 0 or None
+        """
+        self._views['seed'][:] = -1 if seed is None else seed
+        self.command(_RESET)
+        return self._obs
+
+    def step(self, actions):
+        """
+        Returns the tuple (observations, rewards, dones) after one tick of every wave.
+
+        The results are views of the shared memory (see the class description).
+
+        Parameter actions: The index in ACTIONS of the action for each wave
+        Precondition: actions is an int array of length getCount()
+        """
+        self._views['actions'][:] = actions
+        self.command(_STEP)
+        return (self._obs, self._views['rewards'], self._views['dones'])
+
+    def command(self, op):
+        """
+        Tells every worker to carry out an operation, and waits until they all have.
+
+        Parameter op: The operation
+        Precondition: op is one of _RESET, _STEP or _CLOSE
+        """
+        views = self._views
+        views['op'][:] = op
+        views['command'] += 1
+        target = views['command']
+        since = time.perf_counter()
+        while (views['answer'] != target).any():
+            for worker in self._workers:
+                if not worker.is_alive() and op != _CLOSE:
+                    raise RuntimeError('an environment worker has stopped')
+            _pause(since)
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory.
+        """
+        if self._memory is None:
+            return
+        self.command(_CLOSE)
+        for worker in self._workers:
+            worker.join()
+        self._obs = None
+        self._views = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+
+class WaveEncoder(object):
+    """
+    A class to encode the state of a wave as a fixed-shape uint8 tensor, in place.
+
+    The tensor has shape (4, height, width), with one channel for each of:
+
+        CHANNEL_ALIENS: 1 for each living alien, at its [row, col] in the lattice
+        CHANNEL_PLAYER: the number of player bolts in each cell of the coarse grid
+        CHANNEL_BOLTS:  the number of alien bolts in each cell of the coarse grid
+        CHANNEL_SHIP:   1 in the cell of the coarse grid holding the ship center, if
+                        the ship is alive
+
+    The coarse grid cuts the window into squares of ENV_CELL pixels, with row 0 at
+    the top like the lattice.  The height and width are the larger of the lattice
+    and the coarse grid, so both fit in every channel.
+
+    The tensor is allocated once, when the encoder is made, and encode writes over
+    it every time it is called.  The bolts are binned into the grid with scratch
+    arrays that are also reused, so encoding a frame allocates no arrays (unless the
+    wave has more bolts than ever before).  Copy the tensor if it must be kept.
+
+    INSTANCE ATTRIBUTES:
+        _buffer:  the tensor [uint8 array (4,height,width)]
+        _shipRow: the row of the coarse grid holding the ship center [int >= 0]
+        _cell:    scratch space for the cell of each bolt [float64 array]
+        _temp:    scratch space for binning the bolts [float64 array]
+        _index:   scratch space for the position of each bolt in the tensor
+                  [int64 array, as long as _cell]
+    """
+
+    def __init__(self, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW):
+        """
+        Initializes an encoder for waves with at most rows x cols aliens.
+
+        Parameter rows: The most rows of aliens in a wave
+        Precondition: rows is an int > 0
+
+        Parameter cols: The most aliens per row in a wave
+        Precondition: cols is an int > 0
+        """
+        height = max(rows, -(-GAME_HEIGHT//ENV_CELL))
+        width = max(cols, -(-GAME_WIDTH//ENV_CELL))
+        self._buffer = np.zeros((4,height,width), dtype=np.uint8)
+        # The ship center is at height SHIP_BOTTOM (see Ship), binned like a bolt
+        self._shipRow = int((GAME_HEIGHT-SHIP_BOTTOM)//ENV_CELL)
+        self.reserve(ENV_BOLTS)
+
+    def getShape(self):
+        """
+        Returns the shape of the tensor as the tuple (4, height, width).
+        """
+        return self._buffer.shape
+
+    def getBuffer(self):
+        """
+        Returns the tensor written by encode.
+
+        The tensor is owned by this object, and is overwritten by every call to encode
+        without an out argument.
+        """
+        return self._buffer
+
+    def encode(self, wave, out=None):
+        """
+        Returns the tensor of the current state of the wave.
+
+        The tensor is written in place, into out or else into the buffer of this
+        encoder, and then returned.
+
+        Parameter wave: The wave to encode
+        Precondition: wave is a WaveSim with at most the rows and columns of this
+        encoder
+
+        Parameter out: The tensor to write into (None for the buffer of this encoder)
+        Precondition: out is a C-contiguous uint8 array of shape getShape(), or None
+        """
+        if out is None:
+            out = self._buffer
+        # The bolts are added through a flat view, which would be a copy otherwise
+        assert out.flags.c_contiguous, 'the tensor is not C-contiguous'
+        out.fill(0)
+        xs, ys, alive = wave.getAlienArrays()
+        (rows, cols) = alive.shape
+        np.copyto(out[CHANNEL_ALIENS,:rows,:cols], alive, casting='unsafe')
+
+        bx, by, player = wave.getBoltArrays()
+        n = len(bx)
+        if n > 0:
+            if n > len(self._index):
+                self.reserve(2*n)
+            self.binBolts(bx, by, player, out.shape)
+            np.add.at(out.reshape(-1), self._index[:n], 1)
+
+        if wave.isShipAlive():
+            col = min(max(int(wave.getShipX()//ENV_CELL), 0), out.shape[2]-1)
+            out[CHANNEL_SHIP,self._shipRow,col] = 1
+        return out
+
+    # HELPER METHODS FOR encode()
+    def reserve(self, capacity):
+        """
+        Makes the scratch arrays long enough for the given number of bolts.
+
+        Parameter capacity: The number of bolts
+        Precondition: capacity is an int > 0
+        """
+        self._cell = np.zeros(capacity)
+        self._temp = np.zeros(capacity)
+        self._index = np.zeros(capacity, dtype=np.int64)
+
+    def binBolts(self, bx, by, player, shape):
+        """
+        Puts the position in a tensor of the given shape of each bolt in _index.
+
+        A bolt center outside of the window is binned into the nearest cell.
+
+        Parameter bx: The horizontal bolt coordinates
+        Precondition: bx is a float array no longer than _index
+
+        Parameter by: The vertical bolt coordinates
+        Precondition: by is a float array as long as bx
+
+        Parameter player: Whether each bolt was fired by the player
+        Precondition: player is a bool array as long as bx
+
+        Parameter shape: The shape of the tensor
+        Precondition: shape is the tuple (4, height, width) of a WaveEncoder
+        """
+        n = len(bx)
+        (height, width) = shape[1:]
+        plane = height*width
+        cell = self._cell[:n]
+        temp = self._temp[:n]
+        np.floor_divide(bx, ENV_CELL, out=cell)
+        np.clip(cell, 0, -(-GAME_WIDTH//ENV_CELL)-1, out=cell)
+        np.subtract(GAME_HEIGHT, by, out=temp)
+        np.floor_divide(temp, ENV_CELL, out=temp)
+        np.clip(temp, 0, -(-GAME_HEIGHT//ENV_CELL)-1, out=temp)
+        np.multiply(temp, width, out=temp)
+        np.add(cell, temp, out=cell)
+        np.multiply(player, (CHANNEL_BOLTS-CHANNEL_PLAYER)*plane, out=temp)
+        np.subtract(cell, temp, out=cell)
+        np.add(cell, CHANNEL_BOLTS*plane, out=cell)
+        np.copyto(self._index[:n], cell, casting='unsafe')
+
+
+# HELPER FUNCTIONS
+def _observations(count, rows, cols):
+    """
+    Returns a dictionary of new, empty observation arrays for count waves.
+
+    Parameter count: The number of waves
+    Precondition: count is an int > 0
+
+    Parameter rows: The number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: The number of aliens per row
+    Precondition: cols is an int > 0
+    """
+    return dict((key, np.zeros(shape, dtype))
+                for (key, dtype, shape) in _arrays(count, rows, cols, 1)
+                if key in _OBSERVATION)
+
+
+def _arrays(count, rows, cols, workers):
+    """
+    Returns the (name, dtype, shape) of each array shared by a SharedVecEnv.
+
+    Parameter count: The number of waves
+    Precondition: count is an int > 0
+
+    Parameter rows: The number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: The number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter workers: The number of worker processes
+    Precondition: workers is an int > 0
+    """
+    return (('alive', bool, (count,rows,cols)), ('aliens', np.float64, (count,2)),
+            ('ship', np.float64, (count,)), ('lives', np.int64, (count,)),
+            ('bolts', np.float64, (count,ENV_BOLTS,3)),
+            ('boltMask', bool, (count,ENV_BOLTS)), ('actions', np.int64, (count,)),
+            ('rewards', np.float64, (count,)), ('dones', bool, (count,)),
+            ('op', np.int64, (workers,)), ('seed', np.int64, (workers,)),
+            ('command', np.int64, (workers,)), ('answer', np.int64, (workers,)))
+
+
+def _sharedLayout(count, rows, cols, workers):
+    """
+    Returns the tuple (offsets, size) of the arrays in the shared block.
+
+    Every array starts on an 8 byte boundary.
+
+    Parameter count: The number of waves
+    Precondition: count is an int > 0
+
+    Parameter rows: The number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: The number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter workers: The number of worker processes
+    Precondition: workers is an int > 0
+    """
+    offsets = {}
+    size = 0
+    for (key, dtype, shape) in _arrays(count, rows, cols, workers):
+        offsets[key] = size
+        size += -(-np.dtype(dtype).itemsize*int(np.prod(shape))//8)*8
+    return (offsets, size)
+
+
+def _sharedViews(buffer, count, rows, cols, workers):
+    """
+    Returns a dictionary of the arrays in the shared block, as views of the buffer.
+
+    Parameter buffer: The shared block
+    Precondition: buffer is a buffer laid out by _sharedLayout
+
+    Parameter count: The number of waves
+    Precondition: count is an int > 0
+
+    Parameter rows: The number of rows of aliens
+    Precondition: rows is an int > 0
+
+    Parameter cols: The number of aliens per row
+    Precondition: cols is an int > 0
+
+    Parameter workers: The number of worker processes
+    Precondition: workers is an int > 0
+    """
+    offsets = _sharedLayout(count, rows, cols, workers)[0]
+    return dict((key, np.ndarray(shape, dtype, buffer, offsets[key]))
+                for (key, dtype, shape) in _arrays(count, rows, cols, workers))
+
+
+def _pause(since):
+    """
+    Gives up the CPU once while a SharedVecEnv process waits (see SharedVecEnv).
+
+    It only yields if the wait started less than ENV_SPIN seconds ago, and sleeps for
+    ENV_NAP seconds after that.
+
+    Parameter since: The time the wait started, from time.perf_counter
+    Precondition: since is a float
+    """
+    if time.perf_counter()-since < ENV_SPIN:
+        time.sleep(0)
+    else:
+        time.sleep(ENV_NAP)
+
+
+def _serve(name, index, start, stop, count, workers, speed, rows, cols, boltRate):
+    """
+    Plays waves start to stop-1 of a SharedVecEnv, until it is told to close.
+
+    This is the main function of each worker process.
+
+    Parameter name: The name of the shared block
+    Precondition: name is a str
+
+    Parameter index: The number of this worker
+    Precondition: index is an int in 0..workers-1
+
+    Parameter start: The first wave of this worker
+    Precondition: start is an int >= 0
+
+    Parameter stop: The wave after the last one of this worker
+    Precondition: stop is an int > start and <= count
+
+    Parameter count: The number of waves over every worker
+    Precondition: count is an int > 0
+
+    Parameter workers: The number of worker processes
+    Precondition: workers is an int > 0
+
+    The other parameters are the settings of the waves (see VecInvadersEnv).
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    views = _sharedViews(memory.buf, count, rows, cols, workers)
+    out = dict((key, views[key][start:stop]) for key in _OBSERVATION)
+    env = VecInvadersEnv(stop-start, speed, rows, cols, boltRate)
+    # The block starts zeroed, and the parent may already have sent a command
+    seen = 0
+    since = time.perf_counter()
+    while True:
+        command = views['command'][index]
+        if command == seen:
+            _pause(since)
+            continue
+        seen = command
+        op = views['op'][index]
+        if op == _RESET:
+            seed = int(views['seed'][index])
+            env.reset(None if seed < 0 else (seed, index), out)
+            views['rewards'][start:stop] = 0
+            views['dones'][start:stop] = False
+        elif op == _STEP:
+            (obs, rewards, dones) = env.step(views['actions'][start:stop], out)
+            views['rewards'][start:stop] = rewards
+            views['dones'][start:stop] = dones
+        views['answer'][index] = command
+        since = time.perf_counter()
+        if op == _CLOSE:
+            break
+    # The views must be gone before the block can be closed
+    del out, views
+    memory.close()
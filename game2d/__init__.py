@@ -8,9 +8,12 @@ Author: Walker M. White (wmw2)
 Date:   August 1, 2017 (Python 3 version)
 """
 from .gobject import GObject, GScene
+from .ggrid import GGrid
 from .grectangle import GRectangle, GEllipse, GImage, GLabel
 from .gsprite import GSprite
 from .gpath import GPath, GTriangle, GPolygon
 from .gview import GInput, GView
 from .sound import Sound, SoundLibrary
-from .app import GameApp
\ No newline at end of file
+from .app import GameApp
+from .gframe import GFrameTimer
+from .gtrace import GTracer
\ No newline at end of file
@@ -16,6 +16,9 @@ from kivy.config import Config
 from kivy.clock  import Clock
 
 import os.path
+import time
+from .gframe import GFrameTimer
+from .gtrace import GTracer
 
 class GameApp(kivy.app.App):
     """
@@ -35,6 +38,11 @@ class GameApp(kivy.app.App):
     
     :meth:`draw`: This method draws all of the objects to the screen.  The only 
     thing you should have in this method are calls to ``self.view.draw()``.
+    
+    Every frame is timed by the :class:`GFrameTimer` in the attribute ``frametimer``.
+    Set the attribute ``overlay`` to True to show the frame times on the screen.
+    Give the keyword ``trace`` to write a timeline of the frames to a file (see the
+    class :class:`GTracer`).
     """
     # Class attribute for tracking textures (to reduce memory footprint)
     TEXTURE_CACHE = {}
@@ -62,6 +70,25 @@ class GameApp(kivy.app.App):
         self._fps = value
         Clock.schedule_interval(self._refresh,1.0/self._fps)
     
+    @property
+    def overlay(self):
+        """
+        Whether to show the frame times on top of the game.
+        
+        The overlay is a :class:`GLabel` in the top left corner of the window, with
+        the statistics of ``frametimer``.  Its text is refreshed twice a second.  The
+        time to draw it is part of the draw phase.  The value is False by default.
+        
+        **Invariant**: Must be a bool
+        """
+        return self._overlay
+    
+    @overlay.setter
+    def overlay(self,value):
+        assert type(value) == bool, 'value %s is not a bool' % repr(value)
+        self._overlay = value
+        self._overlaytext = None
+    
     
     # IMMUTABLE PROPERTIES
     @property
@@ -106,6 +133,18 @@ class GameApp(kivy.app.App):
         """
         return self._input
     
+    @property
+    def frametimer(self):
+        """
+        The timer of the animation frames.
+        
+        Use this attribute to see where the time of each frame goes.  See the class
+        :class:`GFrameTimer` for more information.
+        
+        **Invariant**: Must be instance of :class:`GFrameTimer`
+        """
+        return self._frametimer
+    
     # CLASS METHODS
     @classmethod
     def is_image(cls,name):
@@ -181,7 +220,8 @@ class GameApp(kivy.app.App):
         
         try:
             from kivy.core.image import Image
-            texture = Image(name).texture
+            with GTracer.span('GameApp.load_texture','asset',{'name': name}):
+                texture = Image(name).texture
             cls.TEXTURE_CACHE[name] = texture
         except:
             texture = None
@@ -220,6 +260,10 @@ class GameApp(kivy.app.App):
             
             GameApp(width=400,height=400)
         
+        The keyword ``history`` is the number of frames kept by ``frametimer``.  The
+        keyword ``trace`` is a file to write a timeline of the game to, or None (the
+        default) to not trace the game.
+        
         The game window will not show until you start the game. To start the game, use 
         the method ``run()``.
         
@@ -232,15 +276,25 @@ class GameApp(kivy.app.App):
         w = keywords.pop('width', 0.0)
         h = keywords.pop('height', 0.0)
         f = keywords.pop('fps', 60.0)
+        n = keywords.pop('history', 600)
+        t = keywords.pop('trace', None)
 
         assert type(w) in [int,float], 'width %s is not a number' % repr(w)
         assert type(h) in [int,float], 'height %s is not a number' % repr(h)
         assert type(f) in [int,float], 'fps %s is not a number' % repr(value)
         assert f > 0, 'fps %s is not positive' % repr(value)
+        assert t is None or type(t) == str, 'trace %s is not a file name' % repr(t)
 
         self._gwidth = w
         self._gheight = h
         self._fps = f
+        self._frametimer = GFrameTimer(n)
+        self._frameend = None
+        self._overlay = False
+        self._overlaytext = None
+        
+        if t is not None:
+            GTracer.start(t)
         
         Config.set('graphics', 'width', str(self.width))
         Config.set('graphics', 'height', str(self.height))
@@ -345,13 +399,52 @@ class GameApp(kivy.app.App):
         
         This method a callback-proxy for the methods `update` and `draw`.  It handles
         important issues behind the scenes, particularly with clearing the window.
+        It also times each phase of the frame, and records the times in ``frametimer``.
+        If the game is traced, the phases are added to the timeline as well.
         
         :param dt: time in seconds since last update
         :type dt:  ``int`` or ``float``
         """
+        clock = time.perf_counter_ns
+        start = clock()
+        gap = 0 if self._frameend is None else start-self._frameend
         self.view.clear()
+        cleared = clock()
         self.update(dt)
+        updated = clock()
         self.draw()
+        if self._overlay:
+            self._draw_overlay()
+        drawn = clock()
+        self._frametimer.record(gap/1e9,(cleared-start)/1e9,(updated-cleared)/1e9,
+                                (drawn-updated)/1e9)
+        self._frameend = drawn
+        
+        tracer = GTracer.ACTIVE
+        if tracer is not None:
+            name = type(self).__name__
+            tracer.complete('GameApp._refresh',start,drawn-start,'frame',{'dt': dt})
+            tracer.complete('GView.clear',start,cleared-start,'frame')
+            tracer.complete(name+'.update',cleared,updated-cleared,'frame')
+            tracer.complete(name+'.draw',updated,drawn-updated,'frame')
+    
+    def _draw_overlay(self):
+        """
+        Draws the frame times on top of the game.
+        
+        The label is rebuilt twice a second (at the current fps), since building the
+        text of a label is much slower than drawing it.
+        """
+        if self._overlaytext is None or self._frametimer.total % max(1,int(self.fps/2)) == 0:
+            from .grectangle import GLabel
+            text = str(self._frametimer)
+            if self._overlaytext is None:
+                self._overlaytext = GLabel(text=text,font_size=12,halign='left')
+            else:
+                self._overlaytext.text = text
+            self._overlaytext.left = 8
+            self._overlaytext.top = self.height-8
+        self._overlaytext.draw(self.view)
     
     def _setpaths(self):
         """
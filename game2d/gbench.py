@@ -0,0 +1,304 @@
+"""
+Micro-benchmarks for the 2D game support.
+
+This module times the primitives of this package, so that we can see which of them
+are slow before we redesign them.  It measures
+
+    * the cost of constructing each kind of shape,
+    * the property setters ``x``, ``y``, ``width``, ``fillcolor`` and ``angle``,
+    * :meth:`GObject.contains` on unrotated and rotated shapes, and
+    * :meth:`GView.draw` and :meth:`GView.clear`.
+
+No game is started.  The shapes are drawn to a :class:`GStandInView`, which runs the
+drawing code of :class:`GView` without being a Kivy widget.  The shapes still build
+their Kivy graphics instructions, so Kivy must be installed, and the images must be in
+the **Images** folder of the application directory.  Those instructions call OpenGL, so
+:func:`run` loads the mock OpenGL backend of Kivy (see :func:`loadgl`), which needs no
+window.  Only the :class:`GLabel` benchmark opens the Kivy window, since a label is a
+Kivy widget, and every Kivy widget makes the window when it is created.  On a machine
+without a display, set the environment variable ``SDL_VIDEODRIVER=offscreen`` if that
+window cannot open.
+
+Each benchmark is called many times, and the time of each call is reported as the
+p50, p99 and mean in microseconds.  Kivy reads the command line when it is imported,
+and would reject the options of :func:`main`.  So the benchmarks are run with the
+script **bench2d.py** in the application directory, which turns that off (with
+``KIVY_NO_ARGS``) before it imports this package.  To run the benchmarks and write the
+results to a file::
+
+    python bench2d.py --json results.json
+
+A script that imports this module and has options of its own must set
+``KIVY_NO_ARGS`` itself, the same way.
+"""
+from kivy.graphics.instructions import InstructionGroup
+from .grectangle import GRectangle, GImage, GLabel
+from .gsprite import GSprite
+from .gpath import GPath, GPolygon
+from .gview import GView
+from .app import GameApp
+import argparse
+import itertools
+import json
+import os
+import time
+
+# The number of times each benchmark is called, unless told otherwise
+GBENCH_NUMBER = 1000
+# The number of shapes drawn in a frame by the view benchmarks
+GBENCH_SHAPES = 100
+
+
+class GStandInView(object):
+    """
+    A class standing in for :class:`GView`, without a window.
+
+    This view keeps the same frame and contents as a :class:`GView`, and its methods
+    :meth:`draw` and :meth:`clear` call the ones of :class:`GView`.  So drawing to it
+    costs the same as drawing to the real view, except that nothing is ever shown on
+    the screen.
+    """
+
+    # BUILT-IN METHODS
+    def __init__(self):
+        """
+        Creates a new stand-in view, with nothing drawn in it.
+        """
+        self._frame = InstructionGroup()
+        self._contents = set()
+
+    # PUBLIC METHODS
+    def draw(self,cmd):
+        """
+        Draws the given Kivy graphics command to this view.
+
+        :param cmd: the command to draw
+        :type cmd:  A Kivy graphics command
+        """
+        GView.draw(self,cmd)
+
+    def clear(self):
+        """
+        Clears the contents of this view.
+        """
+        GView.clear(self)
+
+
+# #mark -
+def setpaths(path=None):
+    """
+    Sets the resource paths of :class:`GameApp` to the given application directory.
+
+    A running :class:`GameApp` does this for itself.  The benchmarks do not start an
+    application, so they must call this before making any images.
+
+    :param path: the application directory (None for the current directory)
+    :type path:  ``str`` or None
+    """
+    if path is None:
+        path = os.getcwd()
+    GameApp.fonts  = str(os.path.join(path, 'Fonts'))
+    GameApp.sounds = str(os.path.join(path, 'Sounds'))
+    GameApp.images = str(os.path.join(path, 'Images'))
+
+    import kivy.resources
+    kivy.resources.resource_add_path(GameApp.fonts)
+    kivy.resources.resource_add_path(GameApp.sounds)
+    kivy.resources.resource_add_path(GameApp.images)
+
+
+def loadgl():
+    """
+    Loads the OpenGL functions called by the Kivy graphics instructions.
+
+    The instructions call OpenGL as soon as they are made, and crash if its functions
+    are not loaded.  A Kivy window loads them when it opens.  Unless a window has done
+    so already, this loads the mock backend of Kivy instead, whose functions do nothing.
+    So the benchmarks time the Python code of the primitives, but not the upload of
+    textures to the graphics card.
+    """
+    from kivy.graphics.cgl import cgl_get_initialized_backend_name, cgl_init
+    if cgl_get_initialized_backend_name() is None:
+        cgl_init(allowed=['mock'])
+
+
+def repeat(func,number):
+    """
+    Returns the time in nanoseconds of each of ``number`` calls to ``func``.
+
+    :param func: the function to time
+    :type func:  a function with no arguments
+
+    :param number: the number of calls
+    :type number:  ``int`` > 0
+    """
+    clock = time.perf_counter_ns
+    times = []
+    for pos in range(number):
+        start = clock()
+        func()
+        times.append(clock()-start)
+    return times
+
+
+def summarize(times):
+    """
+    Returns a dictionary with the number of calls and the p50, p99 and mean time.
+
+    The times in the dictionary are in microseconds.
+
+    :param times: the time of each call in nanoseconds
+    :type times:  non-empty ``list`` of ``int``
+    """
+    ordered = sorted(times)
+    def percentile(q):
+        return ordered[min(len(ordered)-1,int(q*len(ordered)))]/1000.0
+    return {'calls': len(ordered), 'p50': percentile(0.50), 'p99': percentile(0.99),
+            'mean': sum(ordered)/len(ordered)/1000.0}
+
+
+# #mark -
+def construct(number):
+    """
+    Returns the benchmarks of the constructors, as a dictionary of call times.
+
+    :param number: the number of calls of each benchmark
+    :type number:  ``int`` > 0
+    """
+    shapes = {
+        'GRectangle()': lambda : GRectangle(x=100,y=100,width=40,height=20,
+                                            fillcolor='red',linecolor='black'),
+        'GImage()':     lambda : GImage(x=100,y=100,width=33,height=33,
+                                        source='alien1.png'),
+        'GLabel()':     lambda : GLabel(text='Wave complete!',font_size=35,x=400,y=350),
+        'GSprite()':    lambda : GSprite(x=100,y=100,width=33,height=33,
+                                         source='alien-strip1.png',format=(3,2)),
+        'GPath()':      lambda : GPath(points=[0,0,50,50,100,0,150,50],
+                                       linecolor='red',linewidth=2),
+        'GPolygon()':   lambda : GPolygon(points=[87,50,0,100,-87,50,
+                                                  -87,-50,0,-100,87,-50],
+                                          fillcolor='blue'),
+    }
+    return dict((name,repeat(func,number)) for (name,func) in shapes.items())
+
+
+def setters(number):
+    """
+    Returns the benchmarks of the property setters, as a dictionary of call times.
+
+    Each setter is timed on a :class:`GRectangle` and on a :class:`GImage`.  The
+    values cycle, so that every call changes the property.
+
+    :param number: the number of calls of each benchmark
+    :type number:  ``int`` > 0
+    """
+    values = {'x': (100,101), 'y': (200,201), 'width': (40,41),
+              'fillcolor': ('red','blue'), 'angle': (0,30)}
+    results = {}
+    for kind in (GRectangle, GImage):
+        for (prop, pair) in values.items():
+            if kind is GImage:
+                shape = GImage(x=100,y=100,width=33,height=33,source='alien1.png')
+            else:
+                shape = GRectangle(x=100,y=100,width=40,height=20,fillcolor='red')
+            cycle = itertools.cycle(pair)
+            def func(shape=shape,prop=prop,cycle=cycle):
+                setattr(shape,prop,next(cycle))
+            results['%s.%s' % (kind.__name__,prop)] = repeat(func,number)
+    return results
+
+
+def contains(number):
+    """
+    Returns the benchmarks of :meth:`GObject.contains`, as a dictionary of call times.
+
+    The points alternate between one inside the shape and one outside of it.
+
+    :param number: the number of calls of each benchmark
+    :type number:  ``int`` > 0
+    """
+    results = {}
+    for angle in (0,30):
+        shape = GRectangle(x=100,y=100,width=40,height=20,angle=angle)
+        points = itertools.cycle(((105,102),(300,300)))
+        def func(shape=shape,points=points):
+            shape.contains(next(points))
+        name = 'GObject.contains (%s)' % ('rotated' if angle else 'unrotated')
+        results[name] = repeat(func,number)
+    return results
+
+
+def view(number):
+    """
+    Returns the benchmarks of :meth:`GView.draw` and :meth:`GView.clear`.
+
+    A frame draws :data:`GBENCH_SHAPES` rectangles to a cleared view.  The draw
+    benchmark times each call to draw, and the clear benchmark times clearing a
+    full view.  The result is a dictionary of call times.
+
+    :param number: the number of frames
+    :type number:  ``int`` > 0
+    """
+    clock = time.perf_counter_ns
+    stand = GStandInView()
+    shapes = [GRectangle(x=8*pos,y=100,width=6,height=6,fillcolor='red')
+              for pos in range(GBENCH_SHAPES)]
+    draws = []
+    clears = []
+    for frame in range(number):
+        for shape in shapes:
+            start = clock()
+            shape.draw(stand)
+            draws.append(clock()-start)
+        start = clock()
+        stand.clear()
+        clears.append(clock()-start)
+    return {'GView.draw': draws, 'GView.clear (%d shapes)' % GBENCH_SHAPES: clears}
+
+
+def run(number=GBENCH_NUMBER):
+    """
+    Returns the results of every benchmark, as a dictionary of summaries.
+
+    See :func:`summarize` for the summary of each benchmark.
+
+    :param number: the number of calls of each benchmark
+    :type number:  ``int`` > 0
+    """
+    loadgl()
+    results = {}
+    for suite in (construct, setters, contains, view):
+        for (name, times) in suite(number).items():
+            results[name] = summarize(times)
+    return results
+
+
+def main(args=None):
+    """
+    Runs the benchmarks and prints the results.
+
+    :param args: the arguments to parse (None for the ones in ``sys.argv``)
+    :type args:  ``list`` of ``str`` or None
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the game2d primitives.')
+    parser.add_argument('--number', type=int, default=GBENCH_NUMBER,
+                        help='the number of calls of each benchmark')
+    parser.add_argument('--path', default=None,
+                        help='the application directory (default: this one)')
+    parser.add_argument('--json', default=None, help='write the results to this file')
+    options = parser.parse_args(args)
+
+    setpaths(options.path)
+    results = run(options.number)
+    print('%-32s %10s %10s %10s' % ('benchmark','p50','p99','mean'))
+    for (name, result) in results.items():
+        print('%-32s %10.2f %10.2f %10.2f' % (name,result['p50'],result['p99'],
+                                              result['mean']))
+    print('times are in microseconds')
+    if options.json is not None:
+        with open(options.json,'w') as file:
+            json.dump({'number': options.number, 'results': results},file,indent=2)
+
+
+if __name__ == '__main__':
+    main()
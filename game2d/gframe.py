@@ -0,0 +1,223 @@
+"""
+Frame-time statistics for 2D game support.
+
+This module records how long each animation frame takes, and where the time goes.
+Every :class:`GameApp` times its own frames with a :class:`GFrameTimer`, which you
+can get from the attribute ``frametimer`` of the application.
+
+A frame has four phases:
+
+    gap:    the time between the end of the last frame and the start of this one,
+            which Kivy spends rendering the window, handling events and waiting
+            for the clock
+    clear:  the time spent clearing the view
+    update: the time spent in the method ``update`` of the game
+    draw:   the time spent in the method ``draw`` of the game (and the overlay)
+
+The statistics also have two sums: ``work`` is clear+update+draw (the time spent in
+the game), and ``frame`` is gap+work (the full time from one frame to the next).
+"""
+from array import array
+
+
+class GFrameTimer(object):
+    """
+    A class recording the phase times of the most recent animation frames.
+
+    The times are kept in a ring buffer of fixed size, allocated once, so recording a
+    frame never allocates memory.  When the buffer is full, each new frame replaces
+    the oldest one.  The statistics are only computed when you ask for them.
+
+    All times given to and returned by this class are in seconds, except for the
+    text of :meth:`__str__`, which is in milliseconds.
+    """
+    # The phases of a frame, in the order they are recorded
+    PHASES = ('gap','clear','update','draw')
+    # The statistics that can be computed, which adds the sums of phases
+    STATS  = PHASES+('work','frame')
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def size(self):
+        """
+        The number of frames kept in the ring buffer.
+
+        **Immutable**: This value cannot be altered.
+
+        **Invariant**: Must be an ``int`` > 0.
+        """
+        return self._size
+
+    @property
+    def count(self):
+        """
+        The number of frames currently in the ring buffer.
+
+        **Immutable**: This value cannot be altered.
+
+        **Invariant**: Must be an ``int`` between 0 and ``size``.
+        """
+        return self._count
+
+    @property
+    def total(self):
+        """
+        The number of frames recorded since the timer was made or last reset.
+
+        **Immutable**: This value cannot be altered.
+
+        **Invariant**: Must be an ``int`` >= ``count``.
+        """
+        return self._total
+
+
+    # BUILT-IN METHODS
+    def __init__(self,size=600):
+        """
+        Creates a new timer, with no frames recorded.
+
+        :param size: the number of frames to keep
+        :type size:  ``int`` > 0
+        """
+        assert type(size) == int, '%s is not an int' % repr(size)
+        assert size > 0, '%s is not positive' % repr(size)
+        self._size  = size
+        self._times = dict((phase,array('d',[0.0])*size) for phase in self.PHASES)
+        self.reset()
+
+    def __str__(self):
+        """
+        :return: A summary of the frame times in milliseconds, one statistic per line.
+        :rtype:  ``str``
+        """
+        lines = ['%-6s %6s %6s %6s %6s' % ('ms','p50','p95','p99','max')]
+        for (stat, values) in self.summary().items():
+            lines.append('%-6s %6.2f %6.2f %6.2f %6.2f' % (stat,1000*values['p50'],
+                         1000*values['p95'],1000*values['p99'],1000*values['max']))
+        return '\n'.join(lines)
+
+
+    # PUBLIC METHODS
+    def reset(self):
+        """
+        Forgets every frame recorded so far.
+        """
+        self._next  = 0
+        self._count = 0
+        self._total = 0
+
+    def record(self,gap,clear,update,draw):
+        """
+        Records the phase times of a single frame.
+
+        :param gap: the time between the end of the last frame and the start of this one
+        :type gap:  ``float`` >= 0
+
+        :param clear: the time spent clearing the view
+        :type clear:  ``float`` >= 0
+
+        :param update: the time spent updating the game
+        :type update:  ``float`` >= 0
+
+        :param draw: the time spent drawing the game
+        :type draw:  ``float`` >= 0
+        """
+        pos = self._next
+        times = self._times
+        times['gap'][pos] = gap
+        times['clear'][pos] = clear
+        times['update'][pos] = update
+        times['draw'][pos] = draw
+        self._next = pos+1 if pos+1 < self._size else 0
+        if self._count < self._size:
+            self._count += 1
+        self._total += 1
+
+    def values(self,stat):
+        """
+        :return: the value of a statistic in each frame in the buffer, oldest first
+        :rtype:  ``list`` of ``float``
+
+        :param stat: the statistic
+        :type stat:  one of ``STATS``
+        """
+        assert stat in self.STATS, '%s is not a frame statistic' % repr(stat)
+        if stat in self._times:
+            return self._window(self._times[stat])
+        result = [0.0]*self._count
+        phases = ('clear','update','draw') if stat == 'work' else self.PHASES
+        for phase in phases:
+            for (pos, value) in enumerate(self._window(self._times[phase])):
+                result[pos] += value
+        return result
+
+    def percentile(self,stat,q):
+        """
+        :return: the q-th percentile of a statistic over the frames in the buffer
+                 (0 if there are none)
+        :rtype:  ``float``
+
+        :param stat: the statistic
+        :type stat:  one of ``STATS``
+
+        :param q: the percentile
+        :type q:  ``int`` or ``float`` between 0 and 100
+        """
+        assert type(q) in [int,float] and 0 <= q <= 100, '%s is not a percentile' % repr(q)
+        ordered = sorted(self.values(stat))
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered)-1,int(q/100.0*len(ordered)))]
+
+    def summary(self):
+        """
+        :return: the p50, p95, p99, mean and max of every statistic, by statistic
+        :rtype:  ``dict`` of ``dict`` of ``float``
+        """
+        result = {}
+        for stat in self.STATS:
+            ordered = sorted(self.values(stat))
+            n = len(ordered)
+            def percentile(q):
+                return ordered[min(n-1,int(q*n))] if n else 0.0
+            result[stat] = {'p50': percentile(0.50), 'p95': percentile(0.95),
+                            'p99': percentile(0.99), 'mean': sum(ordered)/n if n else 0.0,
+                            'max': ordered[-1] if n else 0.0}
+        return result
+
+    def worst(self):
+        """
+        Returns the phase times of the frame in the buffer with the most work.
+
+        The frame is the one with the largest clear+update+draw time, because that is
+        the time the game itself is responsible for.  The result has the time of each
+        phase, the sums ``work`` and ``frame``, and ``age``: the number of frames
+        recorded since then (0 for the most recent frame).
+
+        :return: the worst frame, or None if there are no frames in the buffer
+        :rtype:  ``dict`` or None
+        """
+        if self._count == 0:
+            return None
+        work = self.values('work')
+        pos = max(range(self._count),key=lambda index: work[index])
+        result = {'age': self._count-1-pos}
+        for phase in self.PHASES:
+            result[phase] = self._window(self._times[phase])[pos]
+        result['work'] = work[pos]
+        result['frame'] = work[pos]+result['gap']
+        return result
+
+
+    # HIDDEN METHODS
+    def _window(self,times):
+        """
+        :return: the recorded part of a ring buffer, oldest first
+        :rtype:  ``list`` of ``float``
+
+        :param times: the ring buffer of a phase
+        :type times:  ``array``
+        """
+        if self._count < self._size:
+            return times[:self._count].tolist()
+        return times[self._next:].tolist()+times[:self._next].tolist()
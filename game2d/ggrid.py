@@ -0,0 +1,242 @@
+"""
+A uniform grid to speed up spatial queries for 2D game support.
+
+This module provides a broadphase for collision detection and mouse selection.  Instead
+of testing an object against every other object on the screen, you insert the objects
+into a :class:`GGrid` and ask it for the objects near a point or a box.  The grid only
+looks at the cells that the point or box overlaps, so the cost of a query depends on
+how crowded that part of the screen is, not on the total number of objects.
+
+Objects in a grid keep it up to date on their own.  Whenever the position, size, scale
+or angle of a :class:`GObject` changes, it moves itself to its new cells.
+"""
+import math
+
+
+class GGrid(object):
+    """
+    A class representing a uniform grid of square cells.
+
+    Each object in the grid is stored in every cell that its bounding box overlaps.  The
+    bounding box is given by the attributes ``left``, ``right``, ``bottom`` and ``top``,
+    so it is correct for rotated objects as well.
+
+    A :class:`GObject` can be in at most one grid at a time.  The results of a query
+    are always in the order that the objects were inserted into the grid.
+    """
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def cell_size(self):
+        """
+        The width (and height) of a single grid cell.
+
+        A good cell size is a little larger than a typical object.  If the cells are
+        too small, each object is stored in many cells.  If they are too large, each
+        query returns many candidates.
+
+        **Immutable**: This value cannot be altered.
+
+        **Invariant**: Must be an ``int`` or ``float`` > 0.
+        """
+        return self._size
+
+
+    # BUILT-IN METHODS
+    def __init__(self,cell_size=64):
+        """
+        Creates a new, empty grid.
+
+        :param cell_size: the width (and height) of a single grid cell
+        :type cell_size:  ``int`` or ``float`` > 0
+        """
+        assert type(cell_size) in [int,float], '%s is not a number' % repr(cell_size)
+        assert cell_size > 0, '%s is not positive' % repr(cell_size)
+        self._size  = float(cell_size)
+        self._cells = {}
+        self._spans = {}
+        self._order = {}
+        self._count = 0
+
+    def __len__(self):
+        """
+        :return: The number of objects in this grid.
+        :rtype:  ``int``
+        """
+        return len(self._spans)
+
+    def __contains__(self,obj):
+        """
+        :return: True if ``obj`` is in this grid.
+        :rtype:  ``bool``
+        """
+        return obj in self._spans
+
+
+    # PUBLIC METHODS
+    def insert(self,obj):
+        """
+        Adds an object to this grid.
+
+        From now on, the object will update its cells whenever it moves.
+
+        :param obj: the object to add
+        :type obj:  :class:`GObject` not in any grid
+        """
+        assert obj._grid is None, '%s is already in a grid' % repr(obj)
+        obj._grid = self
+        self._order[obj] = self._count
+        self._count += 1
+        span = self._span(obj.left,obj.bottom,obj.right,obj.top)
+        self._spans[obj] = span
+        self._add(obj,span)
+
+    def remove(self,obj):
+        """
+        Removes an object from this grid.
+
+        :param obj: the object to remove
+        :type obj:  :class:`GObject` in this grid
+        """
+        assert obj in self._spans, '%s is not in this grid' % repr(obj)
+        self._discard(obj,self._spans.pop(obj))
+        del self._order[obj]
+        obj._grid = None
+
+    def update(self,obj):
+        """
+        Moves an object to the cells for its current bounding box.
+
+        This method is called for you whenever the position, size, scale or angle of
+        the object changes.  You only need to call it yourself if you change the bounding
+        box some other way.
+
+        :param obj: the object to update
+        :type obj:  :class:`GObject` in this grid
+        """
+        old = self._spans[obj]
+        new = self._span(obj.left,obj.bottom,obj.right,obj.top)
+        if new != old:
+            self._discard(obj,old)
+            self._add(obj,new)
+            self._spans[obj] = new
+
+    def clear(self):
+        """
+        Removes every object from this grid.
+        """
+        for obj in self._spans:
+            obj._grid = None
+        self._cells.clear()
+        self._spans.clear()
+        self._order.clear()
+
+    def query(self,left,bottom,right,top):
+        """
+        Returns the objects whose bounding box overlaps the given box.
+
+        :param left: the left edge of the box
+        :type left:  ``int`` or ``float``
+
+        :param bottom: the bottom edge of the box
+        :type bottom:  ``int`` or ``float``
+
+        :param right: the right edge of the box
+        :type right:  ``int`` or ``float`` >= left
+
+        :param top: the top edge of the box
+        :type top:  ``int`` or ``float`` >= bottom
+
+        :return: the overlapping objects, in insertion order
+        :rtype:  ``list`` of :class:`GObject`
+        """
+        found = set()
+        result = []
+        (i0,j0,i1,j1) = self._span(left,bottom,right,top)
+        for i in range(i0,i1+1):
+            for j in range(j0,j1+1):
+                cell = self._cells.get((i,j))
+                if cell is None:
+                    continue
+                for obj in cell:
+                    if not obj in found:
+                        found.add(obj)
+                        if (obj.left <= right and left <= obj.right and
+                            obj.bottom <= top and bottom <= obj.top):
+                            result.append(obj)
+        result.sort(key=self._order.__getitem__)
+        return result
+
+    def query_point(self,point):
+        """
+        Returns the objects whose bounding box contains the given point.
+
+        This is a broadphase: use :meth:`GObject.contains` on the result for an exact
+        test.
+
+        :param point: the point to check
+        :type point:  :class:`Point2` or a pair of numbers
+
+        :return: the candidate objects, in insertion order
+        :rtype:  ``list`` of :class:`GObject`
+        """
+        if not type(point) in [tuple,list]:
+            point = (point.x,point.y)
+        return self.query(point[0],point[1],point[0],point[1])
+
+    def query_object(self,obj):
+        """
+        Returns the other objects whose bounding box overlaps the one of ``obj``.
+
+        The object does not need to be in this grid.
+
+        :param obj: the object to check
+        :type obj:  :class:`GObject`
+
+        :return: the overlapping objects (other than ``obj``), in insertion order
+        :rtype:  ``list`` of :class:`GObject`
+        """
+        result = self.query(obj.left,obj.bottom,obj.right,obj.top)
+        if obj in self._spans:
+            result.remove(obj)
+        return result
+
+
+    # HIDDEN METHODS
+    def _span(self,left,bottom,right,top):
+        """
+        Returns the range of cells (i0,j0,i1,j1) overlapped by the given box.
+        """
+        size = self._size
+        return (int(math.floor(left/size)),int(math.floor(bottom/size)),
+                int(math.floor(right/size)),int(math.floor(top/size)))
+
+    def _add(self,obj,span):
+        """
+        Adds an object to every cell in the given range.
+        """
+        (i0,j0,i1,j1) = span
+        for i in range(i0,i1+1):
+            for j in range(j0,j1+1):
+                cell = self._cells.get((i,j))
+                if cell is None:
+                    self._cells[(i,j)] = [obj]
+                else:
+                    cell.append(obj)
+
+    def _discard(self,obj,span):
+        """
+        Removes an object from every cell in the given range.
+
+        Objects are removed by swapping them with the last object in the cell, so
+        removal does not shift the rest of the cell.
+        """
+        (i0,j0,i1,j1) = span
+        for i in range(i0,i1+1):
+            for j in range(j0,j1+1):
+                cell = self._cells[(i,j)]
+                pos = cell.index(obj)
+                cell[pos] = cell[-1]
+                cell.pop()
+                if not cell:
+                    del self._cells[(i,j)]
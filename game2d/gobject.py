@@ -11,6 +11,8 @@ Date:   August 1, 2017 (Python 3 version)
 from kivy.graphics import *
 from kivy.graphics.instructions import *
 from introcs.geom import Point2, Matrix
+import numpy as np
+from .ggrid import GGrid
 
 def is_color(c):
     """
@@ -89,6 +91,8 @@ class GObject(object):
     subclasses: :class:`GRectangle`, :class:`GEllipse`, :class:`GImage`, :class:`GLabel`,
     :class:`GTriangle`, :class:`GPolygon`, or :class:`GPath`.
     """
+    # The GGrid indexing this object (if any); it is updated whenever the object moves
+    _grid = None
 
     # MUTABLE PROPERTIES
     @property
@@ -105,6 +109,8 @@ class GObject(object):
         assert type(value) in [int,float], '%s is not a number' % repr(value)
         self._trans.x = float(value)
         self._mtrue = False
+        if not self._grid is None:
+            self._grid.update(self)
 
     @property
     def y(self):
@@ -120,6 +126,8 @@ class GObject(object):
         assert type(value) in [int,float], '%s is not a number' % repr(value)
         self._trans.y = float(value)
         self._mtrue = False
+        if not self._grid is None:
+            self._grid.update(self)
 
     @property
     def width(self):
@@ -139,6 +147,8 @@ class GObject(object):
         self._width = float(value)
         if self._defined:
             self._reset()
+        if not self._grid is None:
+            self._grid.update(self)
 
     @property
     def height(self):
@@ -158,6 +168,8 @@ class GObject(object):
         self._height = float(value)
         if self._defined:
             self._reset()
+        if not self._grid is None:
+            self._grid.update(self)
 
     @property
     def scale(self):
@@ -188,6 +200,8 @@ class GObject(object):
             self._scale.x = float(value[0])
             self._scale.y = float(value[1])
         self._mtrue = False
+        if not self._grid is None:
+            self._grid.update(self)
 
     @property
     def angle(self):
@@ -207,6 +221,8 @@ class GObject(object):
         self._rotate.angle = float(value)
         if not diff:
             self._mtrue = False
+            if not self._grid is None:
+                self._grid.update(self)
 
     @property
     def linecolor(self):
@@ -559,7 +575,7 @@ class GObject(object):
         if self._rotate.angle == 0.0:
             return abs(point[0]-self.x) < self.width/2.0 and abs(point[1]-self.y) < self.height/2.0
 
-        p = self.matrix.inverse()._transform(point[0],point[1])
+        p = tuple(self.matrix.inverse()._transform(point[0],point[1]))
         return abs(p[0]) < self.width/2.0 and abs(p[1]) < self.height/2.0
 
     def transform(self,point):
@@ -581,7 +597,7 @@ class GObject(object):
             return self.inverse.transform(point)
         else:
             assert is_num_tuple(point,2), "%s is not a valid point" % repr(point)
-            p = self.inverse._transform(point[0],point[2])
+            p = tuple(self.inverse._transform(point[0],point[1]))
             return Point2(p[0],p[1])
 
     def draw(self, view):
@@ -659,7 +675,13 @@ class GScene(GObject):
     @children.setter
     def children(self,value):
         assert is_gobject_list(value), '%s is not a list of valid objects' % repr(value)
+        if hasattr(self,'_index'):
+            self._index.clear()
         self._children = list(value)
+        self._index = GGrid()
+        for child in self._children:
+            if child._grid is None:
+                self._index.insert(child)
         if self._defined:
             self._reset()
 
@@ -734,6 +756,10 @@ class GScene(GObject):
         recursively calls this method.  If not child contains this point, it returns
         either this object, or ``None`` if the point is completely out of bounds.
 
+        The children are indexed by a :class:`GGrid`, so only the children whose
+        bounding box contains the point are tested.  If a child was already in another
+        grid when it was added to this scene, every child is tested instead.
+
         **Warning**: Using this method on a rotated object may slow down your framerate.
 
         :param point: the point to check
@@ -742,14 +768,19 @@ class GScene(GObject):
         if not self.contains(point):
             return None
 
-        for child in self._children:
+        if len(self._index) == len(self._children):
+            candidates = self._index.query_point(point)
+        else:
+            candidates = self._children
+
+        for child in candidates:
             result = None
             if isinstance(child,GScene):
                 result = child.select(point)
             elif child.contains(point):
                 result = child
-            if not child is None:
-                return child
+            if not result is None:
+                return result
 
         return None
 
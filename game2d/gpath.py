@@ -10,7 +10,9 @@ Date:   August 1, 2017 (Python 3 version)
 # Lower-level kivy modules to support animation
 from kivy.graphics import *
 from kivy.graphics.instructions import *
+from introcs.geom import Point2
 from .gobject import GObject
+import numpy as np
 
 
 def same_side(p1, p2, a, b):
@@ -232,7 +234,7 @@ class GPath(GObject):
         x = point[0]
         y = point[1]
         
-        size = len(self.points)/2
+        size = len(self.points)//2
         epsilon = 1e-6
         for ii in range(size-1):
             p = self.points[2*ii  :2*ii+2]
@@ -345,7 +347,7 @@ class GTriangle(GPath):
             point = (point.x,point.y)
         assert is_point_tuple(point,1), "%s is not a valid point" % repr(point)
         
-        return in_triangle(points,self._points)
+        return in_triangle(point,self._points)
     
     
     # HIDDEN METHODS
@@ -478,7 +480,7 @@ class GPolygon(GPath):
     
     @source_height.setter
     def source_height(self,value):
-        assert value is None or _is_num(value), 'value %s is not a valid width' % repr(value)
+        assert value is None or type(value) in [int,float], 'value %s is not a valid width' % repr(value)
         self._source_height = None
         if self._defined:
             self._reset()
@@ -532,7 +534,7 @@ class GPolygon(GPath):
         assert is_point_tuple(point,1), "%s is not a valid point" % repr(point)
         
         found = False
-        for i in xrange(4,len(self._points),2):
+        for i in range(4,len(self._points),2):
             t = (0,0)+self.points[i-4:i]
             found = found or in_triangle(point,t)
         
@@ -544,9 +546,10 @@ class GPolygon(GPath):
         """
         Creates the mesh for this polygon
         """
-        size = len(self.points)/2
+        size = len(self.points)//2
         try:
-            texture = Image(source=self.source).texture
+            from kivy.core.image import Image
+            texture = Image(self.source).texture
             texture.wrap = 'repeat'
             tw = float(texture.width)  if self.source_width is None else self.source_width
             th = float(texture.height) if self.source_height is None else self.source_height
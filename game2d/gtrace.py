@@ -0,0 +1,371 @@
+"""
+Timeline tracing for 2D game support.
+
+This module writes a timeline of the game loop to a file of Chrome trace events, which
+you can open in Perfetto (https://ui.perfetto.dev) or in ``chrome://tracing``.  The
+statistics of :class:`GFrameTimer` show that a frame was slow; the timeline shows
+what that frame was doing, nested call by call.
+
+To trace a game, give the keyword ``trace`` to the application::
+
+    GameApp(width=400,height=400,trace='game.trace.json')
+
+Every :class:`GameApp` then reports a span for each animation frame, with the clear,
+update and draw phases nested inside it, and a span for every texture and sound that
+it loads.  A game adds spans of its own with :meth:`GTracer.span`::
+
+    with GTracer.span('Wave.draw'):
+        self._wave.draw(self.view)
+
+The spans are kept in memory as plain tuples, and a background thread turns them
+into JSON and writes them to the file a few times a second, so that the frames are
+not slowed down by the file.  When the game is not traced, a span is an empty
+``with`` block, and costs less than a microsecond.
+
+The file is in the JSON Array Format of the trace events, which may leave out the
+closing bracket.  So the events written before a crash can still be read.
+"""
+import atexit
+import collections
+import json
+import os
+import threading
+import time
+
+
+class GTraceSpan(object):
+    """
+    A class representing a single span of a timeline, used as a ``with`` block.
+
+    The span records the time when the block is entered, and adds a complete event
+    to its tracer when the block is left.  You should not make these yourself; use
+    :meth:`GTracer.span` instead.
+    """
+
+    # BUILT-IN METHODS
+    def __init__(self,tracer,name,cat,args=None):
+        """
+        Creates a new span, which has not started yet.
+
+        :param tracer: the tracer to add the span to
+        :type tracer:  :class:`GTracer`
+
+        :param name: the name of the span
+        :type name:  ``str``
+
+        :param cat: the category of the span
+        :type cat:  ``str``
+
+        :param args: the values to show with the span (None for no values)
+        :type args:  ``dict`` or None
+        """
+        self._tracer = tracer
+        self._name = name
+        self._cat = cat
+        self._args = args
+        self._start = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self,type,value,traceback):
+        self._tracer.complete(self._name,self._start,
+                              time.perf_counter_ns()-self._start,self._cat,self._args)
+        return False
+
+
+class _GNullSpan(object):
+    """
+    A span that records nothing, used when the game is not traced.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,type,value,traceback):
+        return False
+
+# The only null span, since it has no state
+_NULL_SPAN = _GNullSpan()
+
+
+class GTracer(object):
+    """
+    A class writing trace events to a file, on a background thread.
+
+    The events are added to a queue, which the writer thread empties every
+    ``interval`` seconds.  Adding an event only appends a tuple to the queue; the
+    writer thread formats the JSON.  All times are from :func:`time.perf_counter_ns`,
+    and are written in microseconds since the tracer was made.
+
+    There is at most one active tracer, in the class attribute ``ACTIVE``.  The class
+    methods :meth:`start`, :meth:`stop` and :meth:`span` work with that tracer, so
+    that code anywhere in the game can add spans without being given the tracer.
+    """
+    # The tracer the game reports to, or None if the game is not traced
+    ACTIVE = None
+
+    # IMMUTABLE PROPERTIES
+    @property
+    def path(self):
+        """
+        The file the events are written to.
+
+        **Immutable**: This value cannot be altered.
+
+        **Invariant**: Must be a ``str``.
+        """
+        return self._path
+
+    @property
+    def count(self):
+        """
+        The number of events written to the file so far.
+
+        **Immutable**: This value cannot be altered.
+
+        **Invariant**: Must be an ``int`` >= 0.
+        """
+        return self._count
+
+    @property
+    def closed(self):
+        """
+        Whether this tracer has been closed.
+
+        **Immutable**: This value cannot be altered.
+
+        **Invariant**: Must be a ``bool``.
+        """
+        return self._closed
+
+
+    # CLASS METHODS
+    @classmethod
+    def start(cls,path,interval=0.5):
+        """
+        Starts tracing the game to the given file, and returns the tracer.
+
+        If the game is already traced, the old tracer is closed first.  The new
+        tracer is closed when Python exits, if :meth:`stop` is never called.
+
+        :param path: the file to write the events to
+        :type path:  ``str``
+
+        :param interval: the number of seconds between two writes to the file
+        :type interval:  ``int`` or ``float`` > 0
+        """
+        cls.stop()
+        cls.ACTIVE = cls(path,interval)
+        atexit.register(cls.ACTIVE.close)
+        return cls.ACTIVE
+
+    @classmethod
+    def stop(cls):
+        """
+        Stops tracing the game, and closes the active tracer (if any).
+        """
+        tracer = cls.ACTIVE
+        cls.ACTIVE = None
+        if tracer is not None:
+            tracer.close()
+
+    @classmethod
+    def span(cls,name,cat='game',args=None):
+        """
+        Returns a span of the active tracer, to be used as a ``with`` block.
+
+        If the game is not traced, the span records nothing.
+
+        :param name: the name of the span
+        :type name:  ``str``
+
+        :param cat: the category of the span
+        :type cat:  ``str``
+
+        :param args: the values to show with the span (None for no values)
+        :type args:  ``dict`` or None
+        """
+        tracer = cls.ACTIVE
+        if tracer is None:
+            return _NULL_SPAN
+        return GTraceSpan(tracer,name,cat,args)
+
+
+    # BUILT-IN METHODS
+    def __init__(self,path,interval=0.5):
+        """
+        Creates a new tracer, and starts its writer thread.
+
+        The file is created (or emptied) at once.  This does not make the tracer
+        active; use :meth:`start` for that.
+
+        :param path: the file to write the events to
+        :type path:  ``str``
+
+        :param interval: the number of seconds between two writes to the file
+        :type interval:  ``int`` or ``float`` > 0
+        """
+        assert type(path) == str, '%s is not a str' % repr(path)
+        assert type(interval) in [int,float], '%s is not a number' % repr(interval)
+        assert interval > 0, '%s is not positive' % repr(interval)
+        self._path = path
+        self._interval = interval
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._queue = collections.deque()
+        self._count = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._file = open(path,'w')
+        self._file.write('[\n')
+
+        self._done = threading.Event()
+        self._writer = threading.Thread(target=self._run,name='GTracer',daemon=True)
+        self.metadata('process_name',{'name': 'game2d'},0)
+        self.metadata('thread_name',{'name': threading.current_thread().name})
+        self._writer.start()
+
+
+    # PUBLIC METHODS
+    def complete(self,name,start,duration,cat='game',args=None):
+        """
+        Adds a span that has already ended.
+
+        Use this for spans timed by other code.  The span is on the timeline of the
+        thread calling this method.
+
+        :param name: the name of the span
+        :type name:  ``str``
+
+        :param start: the clock time at the start of the span, in nanoseconds
+        :type start:  ``int`` from :func:`time.perf_counter_ns`
+
+        :param duration: the time of the span in nanoseconds
+        :type duration:  ``int`` >= 0
+
+        :param cat: the category of the span
+        :type cat:  ``str``
+
+        :param args: the values to show with the span (None for no values)
+        :type args:  ``dict`` or None
+        """
+        self._queue.append(('X',name,cat,start,duration,threading.get_ident(),args))
+
+    def instant(self,name,cat='game',args=None):
+        """
+        Adds an event with no duration at the current time.
+
+        :param name: the name of the event
+        :type name:  ``str``
+
+        :param cat: the category of the event
+        :type cat:  ``str``
+
+        :param args: the values to show with the event (None for no values)
+        :type args:  ``dict`` or None
+        """
+        self._queue.append(('i',name,cat,time.perf_counter_ns(),0,
+                            threading.get_ident(),args))
+
+    def counter(self,name,values,start=None):
+        """
+        Adds the values of a counter, which the timeline shows as a graph.
+
+        :param name: the name of the counter
+        :type name:  ``str``
+
+        :param values: the value of each series of the counter
+        :type values:  ``dict`` of ``int`` or ``float``
+
+        :param start: the clock time of the values (None for the current time)
+        :type start:  ``int`` from :func:`time.perf_counter_ns` or None
+        """
+        if start is None:
+            start = time.perf_counter_ns()
+        self._queue.append(('C',name,'counter',start,0,threading.get_ident(),values))
+
+    def metadata(self,name,args,tid=None):
+        """
+        Adds a metadata event, such as the name of the process or of a thread.
+
+        :param name: the kind of metadata (e.g. 'thread_name')
+        :type name:  ``str``
+
+        :param args: the value of the metadata
+        :type args:  ``dict``
+
+        :param tid: the thread it is about (None for the calling thread)
+        :type tid:  ``int`` or None
+        """
+        if tid is None:
+            tid = threading.get_ident()
+        self._queue.append(('M',name,'',self._origin,0,tid,args))
+
+    def flush(self):
+        """
+        Writes every event added so far to the file.
+
+        The writer thread calls this on its own, so you only need it to make sure
+        that the file is up to date.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            lines = []
+            queue = self._queue
+            while queue:
+                lines.append(self._format(queue.popleft()))
+            if lines:
+                self._file.write(',\n'.join(lines) if self._count == 0 else
+                                 ',\n'+',\n'.join(lines))
+                self._file.flush()
+                self._count += len(lines)
+
+    def close(self):
+        """
+        Writes the last events, stops the writer thread and closes the file.
+
+        Closing a tracer that is already closed does nothing.
+        """
+        if self._closed:
+            return
+        self._done.set()
+        if self._writer is not threading.current_thread():
+            self._writer.join()
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._file.write('\n]\n')
+            self._file.close()
+
+
+    # HIDDEN METHODS
+    def _run(self):
+        """
+        Writes the events to the file every ``interval`` seconds, until closed.
+        """
+        while not self._done.wait(self._interval):
+            self.flush()
+
+    def _format(self,event):
+        """
+        :return: the JSON text of an event in the queue
+        :rtype:  ``str``
+
+        :param event: the event, as (ph,name,cat,start,duration,tid,args)
+        :type event:  ``tuple``
+        """
+        (ph,name,cat,start,duration,tid,args) = event
+        result = {'ph': ph, 'name': name, 'pid': self._pid, 'tid': tid,
+                  'ts': (start-self._origin)/1000.0}
+        if cat:
+            result['cat'] = cat
+        if ph == 'X':
+            result['dur'] = duration/1000.0
+        elif ph == 'i':
+            result['s'] = 't'
+        if args is not None:
+            result['args'] = args
+        return json.dumps(result)
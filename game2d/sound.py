@@ -7,6 +7,7 @@ Author: Walker M. White (wmw2)
 Date:   August 1, 2017 (Python 3 version)
 """
 from kivy.core.audio import SoundLoader
+from .gtrace import GTracer
 from .app import GameApp
 
 
@@ -78,7 +79,8 @@ class Sound(object):
         from .app import GameApp
         assert GameApp.is_sound(source), 'source %s is not a sound file' % repr(source)
         self._source = source
-        self._sound  = SoundLoader.load(source)
+        with GTracer.span('Sound','asset',{'source': source}):
+            self._sound  = SoundLoader.load(source)
         if self._sound is None:
             raise IOError('Module game2d cannot read the file %s' % repr(source))
     
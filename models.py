@@ -201,6 +201,27 @@ class Bolt(GRectangle):
         self._velocity = self.velo()
 
     # ADD MORE METHODS (PROPERLY SPECIFIED) AS NECESSARY
+    def reset(self, x, y, isPlayer):
+        """
+        Reuses this bolt for a new shot.
+
+        Only the position and velocity change, so the Kivy instructions built by the
+        initializer are kept as they are.
+
+        Parameter x: The horizontal coordinate of the bolt center
+        Precondition: x is an int or float
+
+        Parameter y: The vertical coordinate of the bolt center
+        Precondition: y is an int or float
+
+        Parameter isPlayer: Whether the bolt was fired by the player
+        Precondition: isPlayer is a bool
+        """
+        self.x = x
+        self.y = y
+        self._isPlayerBolt = isPlayer
+        self._velocity = self.velo()
+
     def velo(self):
         """
         Determines if self._velocity is a player-launched bolt or not, and assigns BOLT_SPEED accordingly.
@@ -215,3 +236,57 @@ class Bolt(GRectangle):
             return -BOLT_SPEED
 
 # IF YOU NEED ADDITIONAL MODEL CLASSES, THEY GO HERE
+class BoltPool(object):
+    """
+    A class to recycle Bolt objects.
+
+    Building a Bolt is expensive: GRectangle parses its color and builds a whole group
+    of Kivy instructions.  A pool builds each Bolt once.  The simulation keeps the
+    bolts themselves, so the pool only has to show as many sprites as there are bolts
+    in a frame: resize activates or deactivates bolts at the end of the list, and
+    each active bolt is moved onto a bolt of the simulation with Bolt.reset.
+
+    INSTANCE ATTRIBUTES:
+        _bolts: every bolt built by this pool, active ones first [list of Bolt]
+        _count: the number of active bolts [int >= 0 and <= len(_bolts)]
+    """
+
+    # GETTERS AND SETTERS
+    def getCount(self):
+        """
+        Returns the number of active bolts.
+        """
+        return self._count
+
+    def getBolt(self, pos):
+        """
+        Returns the active bolt at the given position.
+
+        Parameter pos: The position of the bolt
+        Precondition: pos is an int in 0..getCount()-1
+        """
+        assert 0 <= pos < self._count, '%s is not an active position' % repr(pos)
+        return self._bolts[pos]
+
+    # INITIALIZER
+    def __init__(self):
+        """
+        Initializes an empty pool.
+        """
+        self._bolts = []
+        self._count = 0
+
+    # METHODS TO ACTIVATE AND DEACTIVATE BOLTS
+    def resize(self, count):
+        """
+        Activates or deactivates bolts from the end so that exactly count are active.
+
+        A bolt is only built when there are more active bolts than ever before.  The
+        bolts are activated where they were last; move them with Bolt.reset.
+
+        Parameter count: The number of active bolts
+        Precondition: count is an int >= 0
+        """
+        while len(self._bolts) < count:
+            self._bolts.append(Bolt(0,0,False))
+        self._count = count
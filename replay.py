@@ -0,0 +1,554 @@
+"""
+Replay module for Alien Invaders
+
+This module records the keys that a game reads, and plays them back.  A recording
+is stored as one bitfield per tick, with one bit for each key in REPLAY_KEYS.  The
+player holds the same keys for many ticks in a row, so the bitfields are run-length
+encoded: a recording is a list of (count, bits) runs.  Along with the seed, the
+formation settings and the bolt rate, that is all GameSim needs to play the exact same
+game again, and a whole game fits in a few kilobytes.
+
+The class InputRecorder wraps the input of a live game.  The class ReplayInput
+stands in for GInput during playback, so a recording can be played headless, with
+no window, as fast as GameSim can run.
+
+A recording may also store the hash of the game after every tick (see
+GameSim.getHash).  Playing it back and comparing the hashes (see verify) finds the
+first tick where the playback no longer matches the original game, without having to
+dump or compare whole game states.  The hashes take 8 bytes per tick, many times
+the size of the keys, so they are off by default: a game only records them if
+REPLAY_HASHES is True.
+
+The file format is little-endian binary:
+
+    magic       4 bytes, b'INVR'
+    version     1 byte
+    seed        8 bytes, unsigned
+    rows, cols  2 bytes each, unsigned
+    speed       8 byte float
+    boltRate    2 bytes, unsigned
+    keys        1 byte count, then a 1 byte length and the ASCII name of each key
+    frames      4 bytes, unsigned (the number of ticks recorded)
+    runs        4 bytes, unsigned (the number of runs)
+
+followed by each run as two unsigned LEB128 varints: the count, then the bits.  After
+the runs come the number of hashes (4 bytes, unsigned; either 0 or the number of
+frames) and the hashes themselves (8 bytes each, unsigned).
+"""
+from consts import *
+from sim import *
+import struct
+import bisect
+import array
+import numpy as np
+
+# PRIMARY RULE: This module may only access consts.py and sim.py.  Like sim.py, it
+# must never import game2d, so that replays can be played without Kivy.
+
+# The magic number at the start of every replay file
+REPLAY_MAGIC = b'INVR'
+# The version of the replay file format
+REPLAY_VERSION = 1
+# The layout of the replay header, up to the key names
+_HEADER = struct.Struct('<4sBQHHdHB')
+# The layout of the frame and run counts, after the key names
+_COUNTS = struct.Struct('<II')
+# The layout of the hash count, after the runs
+_HASHES = struct.Struct('<I')
+
+
+class Replay(object):
+    """
+    A class representing a recorded game.
+
+    INSTANCE ATTRIBUTES:
+        seed:   the seed of the game [int >= 0]
+        rows:   the number of rows of aliens [int > 0]
+        cols:   the number of aliens per row [int > 0]
+        speed:  the alien speed of the first wave [float > 0]
+        boltRate: the bolt rate of every wave (see WaveSim) [int > 1]
+        keys:   the key for each bit of a frame, lowest bit first [tuple of str]
+        runs:   the recorded frames, as (count, bits) pairs
+                [list of (int > 0, int >= 0) tuples]
+        frames: the total number of frames (ticks) recorded [int >= 0]
+        hashes: the hash of the game after each frame, if recorded
+                [array of unsigned 64-bit int, empty or of length frames]
+    """
+
+    def __init__(self, seed, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW, speed=ALIEN_SPEED,
+                 boltRate=BOLT_RATE, keys=REPLAY_KEYS, runs=None, hashes=None):
+        """
+        Initializes a recording.
+
+        Parameter seed: The seed of the game
+        Precondition: seed is an int >= 0
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter speed: The alien speed of the first wave
+        Precondition: speed is a float > 0
+
+        Parameter boltRate: The upper limit (exclusive) on the alien steps between bolts
+        Precondition: boltRate is an int > 1
+
+        Parameter keys: The key for each bit of a frame, lowest bit first
+        Precondition: keys is a tuple of at most 64 str
+
+        Parameter runs: The recorded frames as (count, bits) pairs
+        Precondition: runs is a list of (int > 0, int >= 0) tuples, or None
+
+        Parameter hashes: The hash of the game after each frame
+        Precondition: hashes is an array('Q') of the same length as the frames, or None
+        """
+        self.seed = seed
+        self.rows = rows
+        self.cols = cols
+        self.speed = speed
+        self.boltRate = boltRate
+        self.keys = tuple(keys)
+        self.runs = [] if runs is None else runs
+        self.frames = sum(count for (count, bits) in self.runs)
+        self.hashes = array.array('Q') if hashes is None else hashes
+
+    def encode(self):
+        """
+        Returns this recording in the replay file format, as bytes.
+        """
+        data = bytearray(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed,
+                                      self.rows, self.cols, self.speed, self.boltRate,
+                                      len(self.keys)))
+        for key in self.keys:
+            name = key.encode('ascii')
+            data.append(len(name))
+            data.extend(name)
+        data.extend(_COUNTS.pack(self.frames, len(self.runs)))
+        for (count, bits) in self.runs:
+            _putVarint(data, count)
+            _putVarint(data, bits)
+        data.extend(_HASHES.pack(len(self.hashes)))
+        data.extend(np.asarray(self.hashes, dtype='<u8').tobytes())
+        return bytes(data)
+
+    def truncate(self, frames):
+        """
+        Drops every frame after the given number of frames.
+
+        Parameter frames: The number of frames to keep
+        Precondition: frames is an int >= 0
+        """
+        runs = self.runs
+        total = self.frames
+        while runs and total-runs[-1][0] >= frames:
+            total -= runs.pop()[0]
+        if total > frames:
+            runs[-1] = (runs[-1][0]-(total-frames), runs[-1][1])
+            total = frames
+        self.frames = total
+        del self.hashes[frames:]
+
+    def save(self, path):
+        """
+        Saves this recording to a file.
+
+        Parameter path: The file to write
+        Precondition: path is a str
+        """
+        with open(path, 'wb') as file:
+            file.write(self.encode())
+
+
+def decode(data):
+    """
+    Returns the Replay stored in the given bytes.
+
+    Parameter data: A recording in the replay file format
+    Precondition: data is a bytes-like object
+    """
+    data = memoryview(data)
+    (magic, version, seed, rows, cols, speed, boltRate,
+     count) = _HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC:
+        raise ValueError('not a replay file')
+    if version != REPLAY_VERSION:
+        raise ValueError('unsupported replay version %d' % version)
+
+    pos = _HEADER.size
+    keys = []
+    for k in range(count):
+        size = data[pos]
+        keys.append(bytes(data[pos+1:pos+1+size]).decode('ascii'))
+        pos += 1+size
+    (frames, total) = _COUNTS.unpack_from(data, pos)
+    pos += _COUNTS.size
+
+    runs = []
+    for k in range(total):
+        (length, pos) = _getVarint(data, pos)
+        (bits, pos) = _getVarint(data, pos)
+        runs.append((length, bits))
+
+    (count,) = _HASHES.unpack_from(data, pos)
+    pos += _HASHES.size
+    hashes = array.array('Q', np.frombuffer(data, '<u8', count, pos).tolist())
+    replay = Replay(seed, rows, cols, speed, boltRate, keys, runs, hashes)
+    if replay.frames != frames:
+        raise ValueError('replay has %d frames, expected %d' % (replay.frames, frames))
+    if hashes and len(hashes) != frames:
+        raise ValueError('replay has %d hashes, expected %d' % (len(hashes), frames))
+    return replay
+
+
+def load(path):
+    """
+    Returns the Replay stored in a file.
+
+    Parameter path: The file to read
+    Precondition: path is a str naming a replay file
+    """
+    with open(path, 'rb') as file:
+        return decode(file.read())
+
+
+class InputRecorder(object):
+    """
+    A class to record the keys a game reads from its input.
+
+    An InputRecorder wraps another input (usually the GInput of the window) and is
+    passed to GameSim in its place.  Whenever the game asks whether a key is down, the
+    recorder asks the wrapped input, and if the key is down it sets the bit for that
+    key in the current frame.  Keys that the game does not ask about are not recorded,
+    since they cannot change the game.  Call nextFrame after every tick.
+
+    INSTANCE ATTRIBUTES:
+        _input:  the input being recorded [object with a method is_key_down(key)]
+        _masks:  the bit for each recorded key [dict mapping str to int]
+        _bits:   the bits of the current frame [int >= 0]
+        _replay: the recording so far [Replay]
+    """
+
+    def __init__(self, input, seed, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW,
+                 speed=ALIEN_SPEED, boltRate=BOLT_RATE):
+        """
+        Initializes a recorder for a game with the given settings.
+
+        Parameter input: The input to record
+        Precondition: input has a method is_key_down(key)
+
+        Parameter seed: The seed of the game
+        Precondition: seed is an int >= 0
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter speed: The alien speed of the first wave
+        Precondition: speed is a float > 0
+
+        Parameter boltRate: The upper limit (exclusive) on the alien steps between bolts
+        Precondition: boltRate is an int > 1
+        """
+        self._input = input
+        self._replay = Replay(seed, rows, cols, speed, boltRate)
+        self._masks = _masks(self._replay.keys)
+        self._bits = 0
+
+    def getReplay(self):
+        """
+        Returns the recording of every completed frame so far.
+        """
+        return self._replay
+
+    def rewind(self, frame):
+        """
+        Drops the recording after the given frame, to record from there again.
+
+        Use this after restoring a game to an earlier snapshot, so that the recording
+        still matches the game.
+
+        Parameter frame: The number of frames to keep
+        Precondition: frame is an int >= 0
+        """
+        self._replay.truncate(frame)
+        self._bits = 0
+
+    def is_key_down(self, key):
+        """
+        Returns True if the key is held down in the wrapped input, recording it if so.
+
+        Parameter key: The key to test
+        Precondition: key is a str
+        """
+        down = self._input.is_key_down(key)
+        if down:
+            self._bits |= self._masks.get(key, 0)
+        return down
+
+    def nextFrame(self, hash=None):
+        """
+        Completes the current frame and starts a new one.
+
+        Either every frame of a recording has a hash or none of them do.
+
+        Parameter hash: The hash of the game after this frame (None to not record it)
+        Precondition: hash is an unsigned 64-bit int or None
+        """
+        replay = self._replay
+        if hash is not None:
+            replay.hashes.append(hash)
+        runs = replay.runs
+        if runs and runs[-1][1] == self._bits:
+            runs[-1] = (runs[-1][0]+1, self._bits)
+        else:
+            runs.append((1, self._bits))
+        replay.frames += 1
+        self._bits = 0
+
+
+class ReplayInput(object):
+    """
+    A class to play back a recording in place of GInput.
+
+    This class has the same key interface as GInput: is_key_down, keys and key_count.
+    It never reports a touch.  Call nextFrame after every tick to move on to the keys
+    of the next frame.  Once the recording runs out, no keys are down.
+
+    INSTANCE ATTRIBUTES:
+        _replay: the recording being played [Replay]
+        _masks:  the bit for each recorded key [dict mapping str to int]
+        _run:    the position of the current run in the recording [int >= 0]
+        _left:   the number of frames left in the current run [int >= 0]
+        _bits:   the bits of the current frame [int >= 0]
+        _frame:  the number of frames played so far [int >= 0]
+    """
+
+    # IMMUTABLE ATTRIBUTES
+    @property
+    def touch(self):
+        """
+        The mouse position; always None, as touches are not recorded.
+        """
+        return None
+
+    @property
+    def keys(self):
+        """
+        The keys held down in the current frame.
+        """
+        return tuple(key for key in self._replay.keys if self._bits & self._masks[key])
+
+    @property
+    def key_count(self):
+        """
+        The number of keys held down in the current frame.
+        """
+        return len(self.keys)
+
+    def __init__(self, replay):
+        """
+        Initializes playback at the first frame of a recording.
+
+        Parameter replay: The recording to play
+        Precondition: replay is a Replay
+        """
+        self._replay = replay
+        self._masks = _masks(replay.keys)
+        self._run = 0
+        self._frame = 0
+        self._loadRun()
+
+    def getFrame(self):
+        """
+        Returns the number of frames played so far.
+        """
+        return self._frame
+
+    def isDone(self):
+        """
+        Returns True if every frame of the recording has been played; False otherwise.
+        """
+        return self._frame >= self._replay.frames
+
+    def is_key_down(self, key):
+        """
+        Returns True if the key was held down in the current frame of the recording.
+
+        Parameter key: The key to test
+        Precondition: key is a str
+        """
+        return (self._bits & self._masks.get(key, 0)) != 0
+
+    def is_touch_down(self):
+        """
+        Returns False, as touches are not recorded.
+        """
+        return False
+
+    def seek(self, frame):
+        """
+        Moves playback to the given frame of the recording.
+
+        Parameter frame: The number of frames to skip from the start
+        Precondition: frame is an int >= 0
+        """
+        starts = [0]
+        for (count, bits) in self._replay.runs:
+            starts.append(starts[-1]+count)
+        self._run = bisect.bisect_right(starts, frame)-1
+        self._frame = frame
+        self._loadRun()
+        if self._run < len(self._replay.runs):
+            self._left = starts[self._run+1]-frame
+
+    def nextFrame(self):
+        """
+        Moves on to the next frame of the recording.
+        """
+        self._frame += 1
+        self._left -= 1
+        if self._left <= 0:
+            self._run += 1
+            self._loadRun()
+
+    def _loadRun(self):
+        """
+        Loads the bits of the current run, or no keys if the recording is over.
+        """
+        runs = self._replay.runs
+        if self._run < len(runs):
+            (self._left, self._bits) = runs[self._run]
+        else:
+            self._left = 0
+            self._bits = 0
+
+
+def play(replay, frames=None):
+    """
+    Returns the GameSim after playing back a recording, headless.
+
+    Parameter replay: The recording to play
+    Precondition: replay is a Replay
+
+    Parameter frames: The number of frames to play (None plays the whole recording)
+    Precondition: frames is an int >= 0 or None
+    """
+    game = GameSim(replay.seed, replay.speed, replay.rows, replay.cols, replay.boltRate)
+    input = ReplayInput(replay)
+    if frames is None:
+        frames = replay.frames
+    for frame in range(frames):
+        game.tick(input)
+        input.nextFrame()
+    return game
+
+
+def verify(replay):
+    """
+    Returns the first frame where playback does not match the recording, or None.
+
+    The recording must have hashes.  The frames are numbered from 0, and frame n is
+    the one whose hash is replay.hashes[n].  Playback stops at the first mismatch.
+
+    Parameter replay: The recording to check
+    Precondition: replay is a Replay with hashes
+    """
+    assert len(replay.hashes) == replay.frames, 'the replay has no hashes'
+    game = GameSim(replay.seed, replay.speed, replay.rows, replay.cols, replay.boltRate)
+    input = ReplayInput(replay)
+    for frame in range(replay.frames):
+        game.tick(input)
+        input.nextFrame()
+        if game.getHash() != replay.hashes[frame]:
+            return frame
+    return None
+
+
+def divergence(first, second):
+    """
+    Returns the first frame where two runs have different hashes, or None.
+
+    Only the frames that both runs have are compared.
+
+    Parameter first: The hashes of the first run
+    Precondition: first is a sequence of unsigned 64-bit int (such as Replay.hashes)
+
+    Parameter second: The hashes of the second run
+    Precondition: second is a sequence of unsigned 64-bit int
+    """
+    n = min(len(first), len(second))
+    differ = np.flatnonzero(np.asarray(first[:n], dtype=np.uint64) !=
+                            np.asarray(second[:n], dtype=np.uint64))
+    return int(differ[0]) if len(differ) else None
+
+
+# HELPER FUNCTIONS
+def _masks(keys):
+    """
+    Returns a dictionary mapping each key to its bit.
+
+    Parameter keys: The key for each bit, lowest bit first
+    Precondition: keys is a tuple of str
+    """
+    return dict((keys[pos], 1 << pos) for pos in range(len(keys)))
+
+
+def _putVarint(data, value):
+    """
+    Appends an unsigned LEB128 varint to the data.
+
+    Parameter data: The data to extend
+    Precondition: data is a bytearray
+
+    Parameter value: The value to append
+    Precondition: value is an int >= 0
+    """
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+
+
+def _getVarint(data, pos):
+    """
+    Returns the tuple (value, next position) of the varint at the given position.
+
+    Parameter data: The data to read
+    Precondition: data is a bytes-like object
+
+    Parameter pos: The position of the varint
+    Precondition: pos is an int >= 0
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return (value, pos)
+        shift += 7
+
+
+# Application code
+if __name__ == '__main__':
+    import sys
+    import time
+    replay = load(sys.argv[1])
+    start = time.perf_counter()
+    game = play(replay)
+    elapsed = time.perf_counter()-start
+    print('%d frames in %.3f seconds (%.0f frames per second)' %
+          (replay.frames, elapsed, replay.frames/elapsed if elapsed else 0))
+    print('waves cleared: %d, aliens killed: %d, game over: %s' %
+          (game.getWavesCleared(), game.getKills(), game.isOver()))
+    if replay.hashes:
+        frame = verify(replay)
+        if frame is None:
+            print('playback matches the recorded hashes')
+        else:
+            print('playback diverges from the recording at frame %d' % frame)
@@ -0,0 +1,1537 @@
+"""
+Simulation module for Alien Invaders
+
+This module contains the headless rules for Alien Invaders. The class WaveSim marches
+the aliens, moves the ship, fires and moves the laser bolts and detects collisions for
+a single wave, but it only stores numbers.  There are no GObjects, no sounds and no
+view in this module, so it never touches Kivy, OpenGL or the audio system.
+
+The class GameSim plays a whole game on top of WaveSim: the game states, the waves
+and the lives.  It moves in fixed ticks, scheduled by the class Timestep, and reads
+the keys for each tick from an input object, so the same game can be played from the
+keyboard or from a recording (see replay.py).
+
+The class WaveProfile records where the time of a wave goes.  It is opt-in: a wave
+only times its helpers when it has a profile, and a GameSim made with
+profile=WaveProfile gives one to every wave.  A subclass of WaveProfile can do more
+with the times; the class WaveTrace in wave.py adds them to a timeline.
+
+The class Invaders in app.py is a thin adapter over GameSim, and the class Wave in
+wave.py is a thin adapter over WaveSim.  They play the sounds and copy the simulation
+state into sprites when it is time to draw.  Offline tools (balancing runs, regression
+checks) can use these classes directly and run as many games as they like without
+opening a window.
+"""
+from consts import *
+import random
+import math
+import struct
+import copy
+import hashlib
+import time
+import numpy as np
+
+# PRIMARY RULE: This module may only access consts.py.  It must never import game2d,
+# models.py or wave.py, as those modules require Kivy.
+
+# The layout of the numbers at the start of a WaveSim snapshot
+_WAVE_STATE = struct.Struct('<HHIHIddddBBBIIQQ')
+# The layout of the numbers at the start of a GameSim snapshot
+_GAME_STATE = struct.Struct('<BddBQHHIQIIIdB')
+# The layout of the state of a random.Random (the Mersenne Twister words, then the
+# cached value of gauss, if any)
+_RNG_STATE = struct.Struct('<625IBd')
+# The layout of the numbers hashed by WaveSim.getHash
+_WAVE_HASH = struct.Struct('<QdddBBQI')
+# The layout of the numbers hashed by GameSim.getHash
+_GAME_HASH = struct.Struct('<QBdIII')
+# The bits of a 64-bit hash
+_HASH_MASK = (1 << 64)-1
+# The helpers timed by a WaveProfile; the first five are the ones WaveSim.step calls
+PROFILE_HELPERS = ('alienWalk', 'handleShip', 'alienFire', 'boltActions',
+                   'defenseLine', 'mute')
+# The number of slowest ticks listed in the report of a WaveProfile
+PROFILE_SPIKES = 5
+
+
+class Timestep(object):
+    """
+    A class to turn variable frame times into a whole number of fixed ticks.
+
+    Each frame, the frame time is added to an accumulator, and as many whole ticks of
+    SIM_TICK seconds as it holds are due.  The leftover time carries over to the next
+    frame.  If a frame is so slow that it holds more than SIM_MAX_TICKS ticks, the
+    extra time is dropped rather than letting the game fall further and further behind.
+
+    INSTANCE ATTRIBUTES:
+        _accum: the frame time not yet simulated [number >= 0 and < SIM_TICK]
+    """
+
+    def __init__(self):
+        """
+        Initializes a timestep with no time accumulated.
+        """
+        self._accum = 0
+
+    def getAccum(self):
+        """
+        Returns the frame time not yet simulated.
+        """
+        return self._accum
+
+    def setAccum(self, value):
+        """
+        Sets the frame time not yet simulated.
+
+        Parameter value: The new accumulated time
+        Precondition: value is a number >= 0 and < SIM_TICK
+        """
+        self._accum = value
+
+    def schedule(self, dt):
+        """
+        Returns the number of ticks to simulate for a frame of dt seconds.
+
+        Parameter dt: The time in seconds since last frame
+        Precondition: dt is a number (int or float) >= 0
+        """
+        self._accum += dt
+        # Round up a hair, so that frames of exactly n ticks never lose one to rounding
+        ticks = int(self._accum/SIM_TICK+1e-6)
+        if ticks > SIM_MAX_TICKS:
+            ticks = SIM_MAX_TICKS
+            self._accum = 0
+        else:
+            self._accum = max(self._accum-ticks*SIM_TICK, 0)
+        return ticks
+
+
+class WaveSim(object):
+    """
+    This class simulates a single wave of Alien Invaders without drawing anything.
+
+    The aliens are stored as a structure of arrays: one NumPy array per attribute, each
+    with one entry per alien of a rectangular lattice of rows and columns.  The lattice
+    is in the same order as Wave.fill created it (row 0 is the top row).  A dead alien
+    stays in the lattice, but its entry in _alive is False.  Marching, edge detection
+    and descent are whole-array operations, so a step costs the same handful of NumPy
+    calls no matter how large the formation is.
+
+    The bolts are stored the same way: the first _boltCount entries of each bolt
+    array are the bolts on screen, and the rest is spare capacity.  Moving the bolts
+    and removing the ones that left the screen are single array operations.
+
+    INSTANCE ATTRIBUTES:
+        _alienX:      the horizontal alien coordinates [float64 array (rows,cols)]
+        _alienY:      the vertical alien coordinates [float64 array (rows,cols)]
+        _alive:       whether each alien is alive [bool array (rows,cols)]
+        _alienType:   the index in ALIEN_IMAGES of each alien [uint8 array (rows,cols)]
+        _alienCount:  the number of living aliens [int >= 0]
+        _bottom:      the row of the lowest living alien in each column, or -1 if the
+                      column is empty [list of int, one per column]
+        _liveCols:    the columns with a living alien, in no particular order, followed
+                      by the empty ones [list of int, a permutation of the columns]
+        _colSlot:     the position of each column in _liveCols [list of int]
+        _liveCount:   the number of columns with a living alien [int >= 0]
+        _boltX:       the horizontal bolt coordinates [float64 array]
+        _boltY:       the vertical bolt coordinates [float64 array]
+        _boltV:       the bolt velocities in y direction [float64 array]
+        _boltPlayer:  whether each bolt was fired by the player [bool array]
+        _boltCount:   the number of bolts on screen [int >= 0 and <= len(_boltX)]
+        _shipX:       the horizontal coordinate of the ship center [float]
+        _shipAlive:   whether the ship is still in one piece [bool]
+        _lives:       the number of lives left [int >= 0 and <= SHIP_LIVES]
+        _time:        the amount of time since the last alien step
+                      [number >= 0 and < _alienSpeed]
+        _clock:       the fixed timestep used by update [Timestep]
+        _alienSpeed:  the number of seconds between alien steps [float > 0]
+        _adirection:  the direction of the alien march ['left' or 'right']
+        _fireRate:    the number of alien steps between alien bolts
+                      [int >= 1 and < _boltRate]
+        _boltRate:    the upper limit (exclusive) on the fire rate [int > 1]
+        _alienSteps:  the number of alien steps since the last alien bolt [int >= 0]
+        _events:      what happened during the last update [list of EVENT_* constants]
+        _rng:         the source of every random choice in the wave [random.Random]
+        _draws:       the number of values drawn from _rng by this wave [int >= 0]
+        _keys:        the Zobrist key of each alien [rectangular 2d list of int]
+        _zobrist:     the XOR of the keys of the living aliens [int]
+        _profile:     the record of where the time of each tick goes
+                      [WaveProfile, or None to not time the ticks]
+    """
+
+    # GETTERS AND SETTERS
+    def getRows(self):
+        """
+        Returns the number of rows in the alien lattice.
+        """
+        return self._alive.shape[0]
+
+    def getCols(self):
+        """
+        Returns the number of columns in the alien lattice.
+        """
+        return self._alive.shape[1]
+
+    def getAlienType(self, row, col):
+        """
+        Returns the index in ALIEN_IMAGES of the alien at (row, col).
+
+        Parameter row: The lattice row
+        Precondition: row is an int in 0..getRows()-1
+
+        Parameter col: The lattice column
+        Precondition: col is an int in 0..getCols()-1
+        """
+        return int(self._alienType[row,col])
+
+    def getAlienArrays(self):
+        """
+        Returns the tuple (x, y, alive) of formation arrays.
+
+        The arrays are owned by this object and should not be modified.  Entries of x
+        and y for dead aliens are still updated, but have no meaning.
+        """
+        return (self._alienX, self._alienY, self._alive)
+
+    def getAlienCount(self):
+        """
+        Returns the number of living aliens.
+        """
+        return self._alienCount
+
+    def getBoltCount(self):
+        """
+        Returns the number of bolts currently on screen.
+        """
+        return self._boltCount
+
+    def getBoltArrays(self):
+        """
+        Returns the tuple (x, y, isPlayer) of arrays for the bolts on screen.
+
+        The arrays are views owned by this object; they should not be modified, and
+        are only valid until the next update.
+        """
+        n = self._boltCount
+        return (self._boltX[:n], self._boltY[:n], self._boltPlayer[:n])
+
+    def getShipX(self):
+        """
+        Returns the horizontal coordinate of the ship center.
+        """
+        return self._shipX
+
+    def isShipAlive(self):
+        """
+        Returns True if the ship has not been destroyed; False otherwise.
+        """
+        return self._shipAlive
+
+    def getLives(self):
+        """
+        Returns the number of lives left.
+        """
+        return self._lives
+
+    def getEvents(self):
+        """
+        Returns the list of EVENT_* constants recorded by the last update or tick.
+        """
+        return self._events
+
+    def isCleared(self):
+        """
+        Returns True if every alien in the wave is dead; False otherwise.
+        """
+        return self._alienCount == 0
+
+    def getProfile(self):
+        """
+        Returns the profile of this wave, or None if it is not being profiled.
+        """
+        return self._profile
+
+    def setProfile(self, profile):
+        """
+        Sets the profile that records the time of every tick of this wave.
+
+        Parameter profile: The profile (None to stop timing the ticks)
+        Precondition: profile is a WaveProfile or None
+        """
+        self._profile = profile
+
+    def getHash(self):
+        """
+        Returns a 64-bit hash of the state of this wave.
+
+        Two waves with the same hash are, for all practical purposes, in the same
+        state.  The hash covers the living aliens and their position, the bolts, the
+        ship, the lives, the march direction and the number of random draws.
+
+        The living aliens are hashed incrementally: each alien has a fixed random key,
+        and _zobrist is the XOR of the keys of the living aliens, updated whenever an
+        alien dies.  The aliens always move together, so their position is the
+        position of the top left alien.  Only the bolts are hashed in full, and there
+        are never many of them.
+        """
+        n = self._boltCount
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(_WAVE_HASH.pack(self._zobrist, self._alienX[0,0],
+                                      self._alienY[0,0], self._shipX, self._shipAlive,
+                                      self._adirection == 'right', self._draws,
+                                      self._lives))
+        if n:
+            digest.update(self._boltX[:n].tobytes())
+            digest.update(self._boltY[:n].tobytes())
+            digest.update(self._boltPlayer[:n].tobytes())
+        return int.from_bytes(digest.digest(), 'little')
+
+    # INITIALIZER
+    def __init__(self, speed=ALIEN_SPEED, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW, rng=None,
+                 boltRate=BOLT_RATE):
+        """
+        Initializes a new wave.
+
+        The formation size and the bolt rate default to the ones in consts.py.  Larger
+        formations are allowed for stress tests, even if they do not fit in the window.
+
+        Every random choice is drawn from rng.  A game should create one generator
+        and pass it to each of its waves, so that the same seed and the same controls
+        always play the same game.  If rng is None, the wave gets its own unseeded
+        generator.
+
+        Parameter speed: The number of seconds between alien steps
+        Precondition: speed is a float > 0
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter rng: The random number generator for this wave
+        Precondition: rng is a random.Random or None
+
+        Parameter boltRate: The upper limit (exclusive) on the alien steps between bolts
+        Precondition: boltRate is an int > 1
+        """
+        self._rng = random.Random() if rng is None else rng
+        self._boltRate = boltRate
+        self._time = 0
+        self._clock = Timestep()
+        self._boltX = np.zeros(16)
+        self._boltY = np.zeros(16)
+        self._boltV = np.zeros(16)
+        self._boltPlayer = np.zeros(16, dtype=bool)
+        self._boltCount = 0
+        self.fill(rows, cols)
+        self._shipX = GAME_WIDTH/2
+        self._shipAlive = True
+        self._adirection = 'right'
+        self._fireRate = self._rng.randrange(1,self._boltRate)
+        self._draws = 1
+        self._alienSteps = 0
+        self._lives = SHIP_LIVES
+        self._alienSpeed = speed
+        self._events = []
+        self._profile = None
+
+    def fill(self, rows, cols):
+        """
+        Fills the formation arrays with rows x cols living aliens.
+
+        The positions and images match the ones the original Wave.fill used. Rows past
+        the sixth reuse the images of the rows five above them.
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+        """
+        kinds = []
+        for row in range(rows):
+            image = row
+            while image > 5:
+                image -= 5
+            if image == 0:
+                kinds.append(2)
+            elif image <= 2:
+                kinds.append(1)
+            else:
+                kinds.append(0)
+
+        xs = (2+np.arange(cols))*ALIEN_H_SEP+np.arange(cols)*ALIEN_WIDTH
+        ys = GAME_HEIGHT-ALIEN_CEILING-np.arange(rows)*(ALIEN_V_SEP+ALIEN_HEIGHT)
+        self._alienX = np.tile(xs.astype(np.float64), (rows,1))
+        self._alienY = np.repeat(ys.astype(np.float64), cols).reshape(rows,cols)
+        self._alive = np.ones((rows,cols), dtype=bool)
+        kinds = np.array(kinds, dtype=np.uint8)
+        self._alienType = np.repeat(kinds, cols).reshape(rows,cols)
+        self._alienCount = rows*cols
+        self._bottom = [rows-1]*cols
+        self._liveCols = list(range(cols))
+        self._colSlot = list(range(cols))
+        self._liveCount = cols
+        self._keys = [[_mix(row << 32 | col) for col in range(cols)]
+                      for row in range(rows)]
+        self._zobrist = 0
+        for row in self._keys:
+            for key in row:
+                self._zobrist ^= key
+
+    def aliens(self):
+        """
+        Yields a (row, col, x, y) tuple for each living alien.
+
+        The coordinates are Python floats, so they may be assigned to GObject
+        attributes directly.
+        """
+        rows, cols = np.nonzero(self._alive)
+        xs = self._alienX[rows,cols].tolist()
+        ys = self._alienY[rows,cols].tolist()
+        return zip(rows.tolist(), cols.tolist(), xs, ys)
+
+    # SNAPSHOTS
+    def getSnapshot(self):
+        """
+        Returns the state of this wave as bytes.
+
+        The aliens always move together, so every alien in a column has the same x
+        and every alien in a row has the same y.  The snapshot only stores one x per
+        column and one y per row, with the living aliens as a bitmask.  The bolts are
+        stored as their positions and a bitmask of player bolts, as their velocity
+        follows from who fired them.  The alien images follow from the rows.
+
+        The snapshot does not include the random number generator, which belongs to
+        the game (see GameSim.getSnapshot), or the events of the last tick.
+        """
+        rows, cols = self._alive.shape
+        n = self._boltCount
+        head = _WAVE_STATE.pack(rows, cols, self._alienCount, self._liveCount, n,
+                                self._shipX, self._time, self._alienSpeed,
+                                self._clock.getAccum(), self._shipAlive,
+                                self._adirection == 'right', self._lives,
+                                self._fireRate, self._boltRate, self._alienSteps,
+                                self._draws)
+        return b''.join((head, self._alienX[0].tobytes(), self._alienY[:,0].tobytes(),
+                         np.packbits(self._alive).tobytes(),
+                         np.array(self._liveCols, dtype=np.uint16).tobytes(),
+                         self._boltX[:n].tobytes(), self._boltY[:n].tobytes(),
+                         np.packbits(self._boltPlayer[:n]).tobytes()))
+
+    def setSnapshot(self, data):
+        """
+        Restores the state of this wave from a snapshot made by getSnapshot.
+
+        The state is copied into the existing arrays when the formation has the same
+        size, so restoring a snapshot allocates almost nothing.  The random number
+        generator of this wave is kept as it is.
+
+        Parameter data: The snapshot
+        Precondition: data is a bytes-like object made by getSnapshot
+        """
+        (rows, cols, alienCount, liveCount, n, self._shipX, self._time,
+         self._alienSpeed, accum, alive, right, self._lives, self._fireRate,
+         self._boltRate, self._alienSteps,
+         self._draws) = _WAVE_STATE.unpack_from(data, 0)
+        if self._alive.shape != (rows, cols):
+            self.fill(rows, cols)
+        self._alienCount = alienCount
+        self._liveCount = liveCount
+        self._shipAlive = bool(alive)
+        self._adirection = 'right' if right else 'left'
+        self._clock.setAccum(accum)
+        self._events = []
+
+        pos = _WAVE_STATE.size
+        size = rows*cols
+        arrays = []
+        for (dtype, count) in ((np.float64, cols), (np.float64, rows),
+                               (np.uint8, (size+7)//8), (np.uint16, cols),
+                               (np.float64, n), (np.float64, n), (np.uint8, (n+7)//8)):
+            array = np.frombuffer(data, dtype, count, pos)
+            arrays.append(array)
+            pos += array.nbytes
+        self._alienX[:] = arrays[0]
+        self._alienY[:] = arrays[1][:,None]
+        self._alive[:] = np.unpackbits(arrays[2], count=size).reshape(rows,cols)
+
+        self._liveCols = arrays[3].tolist()
+        for slot in range(cols):
+            self._colSlot[self._liveCols[slot]] = slot
+        # The bottom row of each column is the last living row, or -1 if there is none
+        flipped = self._alive[::-1]
+        self._bottom = np.where(flipped.any(axis=0), rows-1-flipped.argmax(axis=0),
+                                -1).tolist()
+        self._zobrist = 0
+        for (row, col) in zip(*np.nonzero(self._alive)):
+            self._zobrist ^= self._keys[row][col]
+
+        if n > len(self._boltX):
+            self._boltX = np.zeros(n)
+            self._boltY = np.zeros(n)
+            self._boltV = np.zeros(n)
+            self._boltPlayer = np.zeros(n, dtype=bool)
+        self._boltX[:n] = arrays[4]
+        self._boltY[:n] = arrays[5]
+        self._boltPlayer[:n] = np.unpackbits(arrays[6], count=n)
+        self._boltV[:n] = np.where(self._boltPlayer[:n], BOLT_SPEED, -BOLT_SPEED)
+        self._boltCount = n
+
+    def copy(self, rng):
+        """
+        Returns a copy of this wave that draws from the given generator.
+
+        The copy shares nothing that changes with this wave, so the two can be played
+        on separately.  This is much faster than a snapshot when the state does not
+        need to leave the process.
+
+        Parameter rng: The random number generator for the copy
+        Precondition: rng is a random.Random
+        """
+        clone = copy.copy(self)
+        clone._alienX = self._alienX.copy()
+        clone._alienY = self._alienY.copy()
+        clone._alive = self._alive.copy()
+        clone._bottom = list(self._bottom)
+        clone._liveCols = list(self._liveCols)
+        clone._colSlot = list(self._colSlot)
+        clone._boltX = self._boltX.copy()
+        clone._boltY = self._boltY.copy()
+        clone._boltV = self._boltV.copy()
+        clone._boltPlayer = self._boltPlayer.copy()
+        clone._clock = Timestep()
+        clone._clock.setAccum(self._clock.getAccum())
+        clone._events = []
+        clone._rng = rng
+        clone._profile = None
+        return clone
+
+    # UPDATE METHOD
+    def update(self, dt, left=False, right=False, fire=False):
+        """
+        Advances the wave by one animation frame.
+
+        The simulation moves in fixed ticks of SIM_TICK seconds, so the game plays at
+        the same speed whatever the frame rate.  The frame time is handed to a
+        Timestep, and as many whole ticks as it allows are simulated with the same
+        controls.
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float) >= 0
+
+        Parameter left: Whether the player is steering the ship left
+        Precondition: left is a bool
+
+        Parameter right: Whether the player is steering the ship right
+        Precondition: right is a bool
+
+        Parameter fire: Whether the player is pressing a fire key
+        Precondition: fire is a bool
+        """
+        self._events = []
+        for tick in range(self._clock.schedule(dt)):
+            self.step(left, right, fire)
+
+    def tick(self, left=False, right=False, fire=False):
+        """
+        Advances the wave by exactly one simulation tick.
+
+        Headless tools call this directly to run the simulation faster than real
+        time.  Unlike update, this method clears the events of the previous tick.
+
+        Parameter left: Whether the player is steering the ship left
+        Precondition: left is a bool
+
+        Parameter right: Whether the player is steering the ship right
+        Precondition: right is a bool
+
+        Parameter fire: Whether the player is pressing a fire key
+        Precondition: fire is a bool
+        """
+        self._events = []
+        self.step(left, right, fire)
+
+    def step(self, left, right, fire):
+        """
+        Applies the rules of the wave for one tick of SIM_TICK seconds.
+
+        The rules are applied in the same order as Wave.update did before it became an
+        adapter.  Events are added to the current event list.
+
+        Parameter left: Whether the player is steering the ship left
+        Precondition: left is a bool
+
+        Parameter right: Whether the player is steering the ship right
+        Precondition: right is a bool
+
+        Parameter fire: Whether the player is pressing a fire key
+        Precondition: fire is a bool
+        """
+        if self._profile is not None:
+            self.profiledStep(left, right, fire)
+            return
+        self._time += SIM_TICK
+        if self._time >= self._alienSpeed:
+            steps = int(self._time/self._alienSpeed)
+            self._time -= steps*self._alienSpeed
+            self.alienWalk(steps)
+        self.handleShip(left, right, fire)
+        self.alienFire()
+        self.boltActions()
+        self.defenseLine()
+
+    def profiledStep(self, left, right, fire):
+        """
+        Applies the rules of the wave for one tick, timing every helper.
+
+        This is step with a clock around each helper, and it must apply the rules in
+        the same order.  The times, and the aliens and bolts left after the tick, are
+        recorded in the profile.  It is a separate method so that step costs a single
+        test when the wave is not being profiled.
+
+        Parameter left: Whether the player is steering the ship left
+        Precondition: left is a bool
+
+        Parameter right: Whether the player is steering the ship right
+        Precondition: right is a bool
+
+        Parameter fire: Whether the player is pressing a fire key
+        Precondition: fire is a bool
+        """
+        clock = time.perf_counter_ns
+        aliens = self._alienCount
+        start = clock()
+        walk = 0
+        self._time += SIM_TICK
+        if self._time >= self._alienSpeed:
+            steps = int(self._time/self._alienSpeed)
+            self._time -= steps*self._alienSpeed
+            self.alienWalk(steps)
+            walk = clock()-start
+        mark = clock()
+        self.handleShip(left, right, fire)
+        ship = clock()-mark
+        mark = clock()
+        self.alienFire()
+        shoot = clock()-mark
+        mark = clock()
+        self.boltActions()
+        bolts = clock()-mark
+        mark = clock()
+        self.defenseLine()
+        line = clock()
+        self._profile.tick(line-start, (walk, ship, shoot, bolts, line-mark),
+                           self._alienCount, self._boltCount, aliens-self._alienCount,
+                           start)
+
+    def loseLife(self):
+        """
+        Spends a life to replace a destroyed ship with a new one at the center.
+        """
+        self._lives = max(self._lives-1, 0)
+        self._shipX = GAME_WIDTH/2
+        self._shipAlive = True
+
+    # HELPER METHODS FOR update()
+    def handleShip(self, left, right, fire):
+        """
+        Moves the ship left and right, and fires a bolt if requested.
+
+        The player may only have one bolt on screen at a time.
+
+        Parameter left: Whether the player is steering the ship left
+        Precondition: left is a bool
+
+        Parameter right: Whether the player is steering the ship right
+        Precondition: right is a bool
+
+        Parameter fire: Whether the player is pressing a fire key
+        Precondition: fire is a bool
+        """
+        if not self._shipAlive:
+            return
+
+        if left:
+            self._shipX = max(self._shipX-SHIP_MOVEMENT, SHIP_WIDTH/2)
+        if right:
+            self._shipX = min(self._shipX+SHIP_MOVEMENT, GAME_WIDTH-SHIP_WIDTH/2)
+
+        if fire:
+            if self._boltPlayer[:self._boltCount].any():
+                return
+            self.addBolt(self._shipX, SHIP_BOTTOM, True)
+            self._events.append(EVENT_SHIP_FIRE)
+
+    def alienWalk(self, steps=1):
+        """
+        Moves the aliens the given number of steps.
+
+        Each step moves the aliens ALIEN_H_WALK pixels in the current direction.  But
+        if the outermost living alien has passed the edge of the window, the aliens
+        step down instead and reverse direction.
+
+        When the wave is so fast that several steps are due in a single tick, the steps
+        are not taken one at a time.  Instead, each run of horizontal steps up to the
+        next edge is applied with a single array addition, so the cost depends on the
+        number of edges reached, not the number of steps.
+
+        Parameter steps: The number of steps to take
+        Precondition: steps is an int > 0
+        """
+        self._alienSteps += steps
+        if self._alienCount == 0:
+            return
+
+        alive = self._alive
+        limitRight = GAME_WIDTH-ALIEN_H_SEP-(.5*ALIEN_WIDTH)
+        limitLeft = ALIEN_H_SEP+(.5*ALIEN_WIDTH)
+        while steps > 0:
+            if self._adirection == 'right':
+                edge = np.max(self._alienX, where=alive, initial=-np.inf)
+                if edge > limitRight:
+                    self.alienDown()
+                    self._adirection = 'left'
+                    steps -= 1
+                    continue
+                walk = min(steps, int(math.floor((limitRight-edge)/ALIEN_H_WALK))+1)
+                self._alienX += walk*ALIEN_H_WALK
+            else:
+                edge = np.min(self._alienX, where=alive, initial=np.inf)
+                if edge < limitLeft:
+                    self.alienDown()
+                    self._adirection = 'right'
+                    steps -= 1
+                    continue
+                walk = min(steps, int(math.floor((edge-limitLeft)/ALIEN_H_WALK))+1)
+                self._alienX -= walk*ALIEN_H_WALK
+            steps -= walk
+
+    def alienDown(self):
+        """
+        Moves every alien down by ALIEN_V_WALK.
+        """
+        self._alienY -= ALIEN_V_WALK
+
+    def alienFire(self):
+        """
+        Fires an alien bolt once every _fireRate alien steps.
+
+        The new fire rate is chosen randomly between 1 and _boltRate.  If the aliens
+        took several steps in one tick and went past the fire rate, they still only
+        fire a single bolt.
+        """
+        if self._alienSteps >= self._fireRate and self._alienCount > 0:
+            row, col = self.alienSelect()
+            x = float(self._alienX[row,col])
+            y = float(self._alienY[row,col])
+            self.addBolt(x, y, False)
+            self._events.append(EVENT_ALIEN_FIRE)
+            self._alienSteps = 0
+            self._fireRate = self._rng.randrange(1,self._boltRate)
+            self._draws += 1
+
+    def alienSelect(self):
+        """
+        Returns the (row, col) of the alien that fires the next bolt.
+
+        The shooter is the bottommost living alien of a random column.  The columns
+        with living aliens and their bottom rows are kept up to date by killAlien,
+        so this takes constant time and never has to retry.
+        """
+        col = self._liveCols[self._rng.randrange(self._liveCount)]
+        self._draws += 1
+        return (self._bottom[col], col)
+
+    def boltActions(self):
+        """
+        Moves the bolts, deletes bolts that are off screen, and detects collisions
+        between a bolt and the ship or an alien.
+
+        All bolts are moved with one array addition.  Collisions are swept: a bolt hits
+        anything it touched anywhere along its path this tick, not just at its new
+        position, so fast bolts cannot tunnel through an alien or the ship.  Then one
+        mask selects the bolts that are still on screen.  A player bolt destroys at most
+        one alien (the first on its path).  When an alien bolt destroys the ship, every
+        bolt on screen is removed.
+        """
+        n = self._boltCount
+        if n == 0:
+            return
+
+        xs = self._boltX[:n]
+        ys = self._boltY[:n]
+        vs = self._boltV[:n]
+        player = self._boltPlayer[:n]
+        ys += vs
+        keep = np.ones(n, dtype=bool)
+
+        for pos in np.flatnonzero(player).tolist():
+            y = float(ys[pos])
+            if self.hitAlien(float(xs[pos]), y-float(vs[pos]), y):
+                keep[pos] = False
+
+        alien = ~player
+        if self._shipAlive and self.hitShip(xs[alien], ys[alien]-vs[alien], ys[alien]):
+            self._shipAlive = False
+            self._events.append(EVENT_SHIP_DIE)
+            self._boltCount = 0
+            return
+
+        keep &= (ys <= GAME_HEIGHT) & (ys >= -BOLT_HEIGHT)
+        if not keep.all():
+            self.removeBolts(keep)
+
+    def addBolt(self, x, y, isPlayer):
+        """
+        Adds a bolt to the screen.
+
+        If the bolt arrays are full, their capacity is doubled.
+
+        Parameter x: The horizontal coordinate of the bolt center
+        Precondition: x is an int or float
+
+        Parameter y: The vertical coordinate of the bolt center
+        Precondition: y is an int or float
+
+        Parameter isPlayer: Whether the bolt was fired by the player
+        Precondition: isPlayer is a bool
+        """
+        n = self._boltCount
+        if n == len(self._boltX):
+            self._boltX = np.concatenate((self._boltX, np.zeros(n)))
+            self._boltY = np.concatenate((self._boltY, np.zeros(n)))
+            self._boltV = np.concatenate((self._boltV, np.zeros(n)))
+            self._boltPlayer = np.concatenate((self._boltPlayer, np.zeros(n, dtype=bool)))
+        self._boltX[n] = x
+        self._boltY[n] = y
+        self._boltV[n] = BOLT_SPEED if isPlayer else -BOLT_SPEED
+        self._boltPlayer[n] = isPlayer
+        self._boltCount = n+1
+
+    def removeBolts(self, keep):
+        """
+        Removes every bolt not selected by the mask, keeping the rest in order.
+
+        Parameter keep: Whether to keep each bolt on screen
+        Precondition: keep is a bool array of length _boltCount
+        """
+        index = np.flatnonzero(keep)
+        k = len(index)
+        for array in (self._boltX, self._boltY, self._boltV, self._boltPlayer):
+            array[:k] = array[index]
+        self._boltCount = k
+
+    def hitAlien(self, x, y0, y1):
+        """
+        Returns True if the player bolt moving from (x, y0) to (x, y1) destroyed an
+        alien; False otherwise.
+
+        The bolt kills the first living alien that it touches along its path.
+
+        The aliens sit on a regular lattice, so the columns a bolt can touch are found
+        directly from its x coordinate, and the rows it can touch from the span of its
+        path.  Only those cells are checked, nearest first, so this test does not
+        depend on the size of the formation.
+
+        Parameter x: The horizontal coordinate of the bolt
+        Precondition: x is a float
+
+        Parameter y0: The vertical coordinate of the bolt before it moved
+        Precondition: y0 is a float
+
+        Parameter y1: The vertical coordinate of the bolt after it moved
+        Precondition: y1 is a float
+        """
+        hw = ALIEN_WIDTH/2
+        cols = _lattice(x-hw, x+BOLT_WIDTH+hw, self._alienX[0], ALIEN_H_SEP+ALIEN_WIDTH)
+        if not cols:
+            return False
+
+        hh = ALIEN_HEIGHT/2
+        low = min(y0, y1)
+        high = max(y0, y1)
+        rows = _lattice(low-hh, high+BOLT_HEIGHT+hh, self._alienY[:,0],
+                        -(ALIEN_V_SEP+ALIEN_HEIGHT))
+        if y1 > y0:
+            # Moving up, so the bottom rows come first
+            rows.reverse()
+
+        alive = self._alive
+        for row in rows:
+            for col in cols:
+                if alive[row,col]:
+                    self.killAlien(row, col)
+                    return True
+        return False
+
+    def killAlien(self, row, col):
+        """
+        Kills the alien at (row, col), updating the bottom alien of its column.
+
+        If the column has no living aliens left, it is swapped out of the live columns.
+
+        Parameter row: The lattice row
+        Precondition: row is an int in 0..getRows()-1
+
+        Parameter col: The lattice column, with a living alien at (row, col)
+        Precondition: col is an int in 0..getCols()-1
+        """
+        alive = self._alive
+        alive[row,col] = False
+        self._alienCount -= 1
+        self._zobrist ^= self._keys[row][col]
+        self._events.append(EVENT_ALIEN_DIE)
+        if self._bottom[col] != row:
+            return
+
+        while row >= 0 and not alive[row,col]:
+            row -= 1
+        self._bottom[col] = row
+        if row < 0:
+            slot = self._colSlot[col]
+            last = self._liveCount-1
+            other = self._liveCols[last]
+            self._liveCols[slot] = other
+            self._colSlot[other] = slot
+            self._liveCols[last] = col
+            self._colSlot[col] = last
+            self._liveCount = last
+
+    def hitShip(self, xs, ys0, ys1):
+        """
+        Returns True if any of the given alien bolts touched the ship on its path;
+        False otherwise.
+
+        Parameter xs: The horizontal coordinates of the bolts
+        Precondition: xs is a float array
+
+        Parameter ys0: The vertical coordinates of the bolts before they moved
+        Precondition: ys0 is a float array the same length as xs
+
+        Parameter ys1: The vertical coordinates of the bolts after they moved
+        Precondition: ys1 is a float array the same length as xs
+        """
+        hits = _sweep(xs, ys0, ys1, self._shipX, SHIP_BOTTOM, SHIP_WIDTH, SHIP_HEIGHT)
+        return bool(hits.any())
+
+    def defenseLine(self):
+        """
+        Makes the player lose every life if a living alien is below the defense line.
+        """
+        lowest = np.min(self._alienY, where=self._alive, initial=np.inf)
+        if (lowest-(.5*ALIEN_HEIGHT)) < DEFENSE_LINE:
+            self._lives = 0
+
+
+class GameSim(object):
+    """
+    This class simulates a whole game of Alien Invaders without drawing anything.
+
+    This is the headless counterpart of Invaders in app.py.  It owns the game state
+    (inactive, active, paused, complete), creates a WaveSim for every wave, speeds up
+    the aliens between waves and spends lives when the ship is destroyed.  Invaders
+    is a thin adapter over this class, so a game played in the window and the same
+    game replayed here follow exactly the same rules.
+
+    The game moves in ticks of SIM_TICK seconds.  Each tick reads the keys it needs
+    from an input object.  That object only needs a method is_key_down(key), like
+    GInput in game2d; the replay module has one that plays back a recording.
+
+    INSTANCE ATTRIBUTES:
+        _state:      the current state of the game [one of STATE_INACTIVE,
+                     STATE_NEWWAVE, STATE_ACTIVE, STATE_PAUSED, STATE_COMPLETE]
+        _wave:       the current wave [WaveSim, or None before the first wave]
+        _speed:      the alien speed of the next wave [float > 0]
+        _timeCount:  the time the wave complete screen has been shown
+                     [float >= 0 and <= SCREEN_TIME]
+        _keyCount:   the number of times the game has been started [int 0 or 1]
+        _seed:       the seed of the random number generator [int]
+        _rng:        the random number generator shared by every wave [random.Random]
+        _rows:       the number of rows of aliens in every wave [int > 0]
+        _cols:       the number of aliens per row in every wave [int > 0]
+        _boltRate:   the bolt rate of every wave (see WaveSim) [int > 1]
+        _frame:      the number of ticks simulated so far [int >= 0]
+        _waveCount:  the number of waves started [int >= 0]
+        _cleared:    the number of waves cleared [int >= 0]
+        _kills:      the number of aliens killed in every wave so far [int >= 0]
+        _events:     the wave events since the last call to popEvents
+                     [list of EVENT_* constants]
+        _clock:      the fixed timestep used by update [Timestep]
+        _profiled:   the class of the profile every wave gets
+                     [WaveProfile or a subclass, or None to not profile]
+        _profiles:   the profiles of the waves that ended since the last call to
+                     popProfiles [list of WaveProfile]
+        _reported:   the number of waves whose profile has been added to _profiles
+                     [int >= 0]
+    """
+
+    # GETTERS AND SETTERS
+    def getState(self):
+        """
+        Returns the current state of the game.
+        """
+        return self._state
+
+    def getWave(self):
+        """
+        Returns the current wave, or None if no wave has started yet.
+        """
+        return self._wave
+
+    def getSeed(self):
+        """
+        Returns the seed of the random number generator.
+        """
+        return self._seed
+
+    def getFrame(self):
+        """
+        Returns the number of ticks simulated so far.
+        """
+        return self._frame
+
+    def getWaveCount(self):
+        """
+        Returns the number of waves started so far.
+        """
+        return self._waveCount
+
+    def getWavesCleared(self):
+        """
+        Returns the number of waves cleared so far.
+        """
+        return self._cleared
+
+    def getKills(self):
+        """
+        Returns the number of aliens killed so far, over every wave.
+        """
+        return self._kills
+
+    def isOver(self):
+        """
+        Returns True if the game is over (every life is lost); False otherwise.
+        """
+        return (self._state == STATE_COMPLETE and self._wave is not None and
+                self._wave.getLives() == 0)
+
+    def popEvents(self):
+        """
+        Returns the wave events since the last call to this method, and forgets them.
+        """
+        events = self._events
+        self._events = []
+        return events
+
+    def popProfiles(self):
+        """
+        Returns the profiles of the waves that ended since the last call to this
+        method, and forgets them.
+
+        There are only profiles if this game was made with a profile class.
+        """
+        profiles = self._profiles
+        self._profiles = []
+        return profiles
+
+    def getHash(self):
+        """
+        Returns a 64-bit hash of the state of this game.
+
+        The hash covers the game state, the waves and kills so far, and the hash of
+        the current wave (see WaveSim.getHash).  It is cheap enough to take after
+        every tick, so two runs can be compared tick by tick.
+        """
+        wave = 0 if self._wave is None else self._wave.getHash()
+        data = _GAME_HASH.pack(wave, self._state, self._timeCount, self._waveCount,
+                               self._cleared, self._kills)
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+    # INITIALIZER
+    def __init__(self, seed=None, speed=ALIEN_SPEED, rows=ALIEN_ROWS, cols=ALIENS_IN_ROW,
+                 boltRate=BOLT_RATE, profile=None):
+        """
+        Initializes a new game, waiting for the player to press 'x'.
+
+        If seed is None, a random seed is chosen.  Either way, getSeed returns the
+        seed, so that the game can be replayed.
+
+        Parameter seed: The seed of the random number generator
+        Precondition: seed is an int >= 0 or None
+
+        Parameter speed: The alien speed of the first wave
+        Precondition: speed is a float > 0
+
+        Parameter rows: The number of rows of aliens
+        Precondition: rows is an int > 0
+
+        Parameter cols: The number of aliens per row
+        Precondition: cols is an int > 0
+
+        Parameter boltRate: The upper limit (exclusive) on the alien steps between bolts
+        Precondition: boltRate is an int > 1
+
+        Parameter profile: The class of the profile of every wave (see popProfiles)
+        Precondition: profile is WaveProfile or a subclass, or None to not profile
+        """
+        if seed is None:
+            seed = random.randrange(2**32)
+        self._seed = seed
+        self._rng = random.Random(seed)
+        self._state = STATE_INACTIVE
+        self._wave = None
+        self._speed = speed
+        self._timeCount = 0
+        self._keyCount = 0
+        self._rows = rows
+        self._cols = cols
+        self._boltRate = boltRate
+        self._frame = 0
+        self._waveCount = 0
+        self._cleared = 0
+        self._kills = 0
+        self._events = []
+        self._clock = Timestep()
+        self._profiled = profile
+        self._profiles = []
+        self._reported = 0
+
+    # SNAPSHOTS
+    def getSnapshot(self):
+        """
+        Returns the state of this game as bytes.
+
+        The snapshot has a fixed header of numbers, then the state of the random
+        number generator, then the snapshot of the current wave (if any).  Events that
+        have not been popped are not included.  A snapshot taken between two ticks and
+        restored with setSnapshot plays on exactly as the original game would.
+        """
+        wave = self._wave
+        head = _GAME_STATE.pack(self._state, self._speed, self._timeCount,
+                                self._keyCount, self._seed, self._rows, self._cols,
+                                self._boltRate, self._frame, self._waveCount,
+                                self._cleared, self._kills, self._clock.getAccum(),
+                                wave is not None)
+        (version, words, gauss) = self._rng.getstate()
+        rng = _RNG_STATE.pack(*words, gauss is not None, gauss or 0.0)
+        if wave is None:
+            return head+rng
+        return head+rng+wave.getSnapshot()
+
+    def setSnapshot(self, data):
+        """
+        Restores the state of this game from a snapshot made by getSnapshot.
+
+        If this game already has a wave, the snapshot is restored into that same
+        WaveSim, so anything holding on to it (such as a Wave) sees the restored state.
+
+        Parameter data: The snapshot
+        Precondition: data is a bytes-like object made by getSnapshot
+        """
+        (self._state, self._speed, self._timeCount, self._keyCount, self._seed,
+         self._rows, self._cols, self._boltRate, self._frame, self._waveCount,
+         self._cleared, self._kills, accum, hasWave) = _GAME_STATE.unpack_from(data, 0)
+        self._clock.setAccum(accum)
+        self._events = []
+
+        state = _RNG_STATE.unpack_from(data, _GAME_STATE.size)
+        gauss = state[-1] if state[-2] else None
+        if hasWave:
+            # Creating a wave draws from the generator, so restore it afterwards
+            if self._wave is None:
+                self._wave = WaveSim(self._speed, self._rows, self._cols, self._rng,
+                                     self._boltRate)
+            self._wave.setSnapshot(memoryview(data)[_GAME_STATE.size+_RNG_STATE.size:])
+        else:
+            self._wave = None
+        self._rng.setstate((3, state[:-2], gauss))
+
+    def copy(self):
+        """
+        Returns a copy of this game that can be played on separately.
+
+        This is the fastest way to branch a game, for example to search ahead for the
+        best move.  The copy has its own random number generator, in the same state as
+        the one of this game.  The copy is never profiled.
+        """
+        clone = copy.copy(self)
+        # Seeding with an int is cheaper than the default seed; the state is replaced
+        clone._rng = random.Random(self._seed)
+        clone._rng.setstate(self._rng.getstate())
+        if self._wave is not None:
+            clone._wave = self._wave.copy(clone._rng)
+        clone._clock = Timestep()
+        clone._clock.setAccum(self._clock.getAccum())
+        clone._events = []
+        clone._profiled = None
+        clone._profiles = []
+        return clone
+
+    # UPDATE METHODS
+    def update(self, dt, input):
+        """
+        Advances the game by one animation frame.
+
+        This runs as many ticks as a Timestep allows for dt (see WaveSim.update).
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float) >= 0
+
+        Parameter input: The source of the key presses
+        Precondition: input has a method is_key_down(key)
+        """
+        for tick in range(self._clock.schedule(dt)):
+            self.tick(input)
+
+    def schedule(self, dt):
+        """
+        Returns the number of ticks to simulate for a frame of dt seconds.
+
+        Use this instead of update to do something after each tick, such as recording
+        the keys that tick used.
+
+        Parameter dt: The time in seconds since last update
+        Precondition: dt is a number (int or float) >= 0
+        """
+        return self._clock.schedule(dt)
+
+    def tick(self, input):
+        """
+        Advances the game by exactly one tick.
+
+        STATE_INACTIVE lasts until the player presses 'x'.  STATE_NEWWAVE creates a
+        new wave and switches to STATE_ACTIVE.  The other states are handled by the
+        methods toActive, toPause and toComplete.
+
+        Parameter input: The source of the key presses
+        Precondition: input has a method is_key_down(key)
+        """
+        self._frame += 1
+        if input.is_key_down('x') and self._keyCount < 1:
+            self._keyCount += 1
+            self._state = STATE_NEWWAVE
+
+        if self._state == STATE_NEWWAVE:
+            self._wave = WaveSim(self._speed, self._rows, self._cols, self._rng,
+                                 self._boltRate)
+            if self._profiled is not None:
+                self._wave.setProfile(self._profiled())
+            self._waveCount += 1
+            self._state = STATE_ACTIVE
+        elif self._state == STATE_ACTIVE:
+            self.toActive(input)
+        elif self._state == STATE_PAUSED:
+            self.toPause(input)
+        elif self._state == STATE_COMPLETE:
+            self.toComplete()
+
+        if (self._state == STATE_COMPLETE and self._reported < self._waveCount and
+            self._wave.getProfile() is not None):
+            self._profiles.append(self._wave.getProfile())
+            self._reported = self._waveCount
+
+    # HELPER METHODS FOR THE STATES
+    def toActive(self, input):
+        """
+        Plays one tick of the current wave.
+
+        The wave is complete when every alien is dead or every life is lost.  When the
+        ship is destroyed, a life is spent and the game pauses.  The player may also
+        pause the game with 'p'.
+
+        Parameter input: The source of the key presses
+        Precondition: input has a method is_key_down(key)
+        """
+        wave = self._wave
+        if wave.isCleared():
+            self._state = STATE_COMPLETE
+        else:
+            left = input.is_key_down('left') or input.is_key_down('a')
+            right = input.is_key_down('right') or input.is_key_down('d')
+            fire = (input.is_key_down('up') or input.is_key_down('spacebar') or
+                    input.is_key_down('w'))
+            count = wave.getAlienCount()
+            wave.tick(left, right, fire)
+            self._kills += count-wave.getAlienCount()
+            self._events.extend(wave.getEvents())
+        if not wave.isShipAlive():
+            wave.loseLife()
+            self._state = STATE_PAUSED
+        if wave.getLives() == 0:
+            self._state = STATE_COMPLETE
+
+        if input.is_key_down('p'):
+            self._state = STATE_PAUSED
+
+    def toPause(self, input):
+        """
+        Waits for the player to resume the game with 'r'.
+
+        Parameter input: The source of the key presses
+        Precondition: input has a method is_key_down(key)
+        """
+        if input.is_key_down('r'):
+            self._state = STATE_ACTIVE
+
+    def toComplete(self):
+        """
+        Waits SCREEN_TIME seconds after a cleared wave, then starts a faster one.
+
+        If every life is lost, the game is over and stays in this state.
+        """
+        if self._wave.getLives() == 0:
+            return
+
+        if self._timeCount < SCREEN_TIME:
+            self._timeCount += SIM_TICK
+        else:
+            self._speed = self._speed/ALIEN_SPEED_UP
+            self._state = STATE_NEWWAVE
+            self._timeCount = 0
+            self._cleared += 1
+
+
+class WaveProfile(object):
+    """
+    A class to record where the time of a wave goes, tick by tick.
+
+    A WaveSim with a profile times each helper of every tick, and records the aliens
+    and bolts left after it.  The Wave that draws it also records the time of mute.
+    The report ties the slowest ticks to what happened in them: a tick that marched
+    the aliens, or one that had many bolts or killed aliens.
+
+    A profile only costs time while it is attached to a wave.  A wave without one
+    tests a single attribute per tick.
+
+    INSTANCE ATTRIBUTES:
+        _ticks:   the time of each tick in nanoseconds [list of int]
+        _helpers: the time of each of the first five PROFILE_HELPERS in each tick, in
+                  nanoseconds (0 if it was not called) [list of tuples of five int]
+        _aliens:  the number of living aliens after each tick [list of int]
+        _bolts:   the number of bolts after each tick [list of int]
+        _kills:   the number of aliens killed in each tick [list of int]
+        _mute:    the time of each call of mute in nanoseconds [list of int]
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty profile.
+        """
+        self._ticks = []
+        self._helpers = []
+        self._aliens = []
+        self._bolts = []
+        self._kills = []
+        self._mute = []
+
+    def getTicks(self):
+        """
+        Returns the number of ticks recorded.
+        """
+        return len(self._ticks)
+
+    def getTimes(self, name):
+        """
+        Returns the time of each call of a helper in nanoseconds, in the order of the
+        calls.
+
+        A tick that did not call the helper (such as a tick without an alien step)
+        adds nothing to the list.
+
+        Parameter name: The helper
+        Precondition: name is one of PROFILE_HELPERS
+        """
+        if name == 'mute':
+            return list(self._mute)
+        pos = PROFILE_HELPERS.index(name)
+        return [tick[pos] for tick in self._helpers if tick[pos] > 0]
+
+    def tick(self, elapsed, helpers, aliens, bolts, kills, start):
+        """
+        Records a single tick of the wave.
+
+        Parameter elapsed: The time of the tick in nanoseconds
+        Precondition: elapsed is an int >= 0
+
+        Parameter helpers: The time of each of the first five PROFILE_HELPERS in the
+        tick, in nanoseconds (0 if it was not called)
+        Precondition: helpers is a tuple of five int >= 0
+
+        Parameter aliens: The number of living aliens after the tick
+        Precondition: aliens is an int >= 0
+
+        Parameter bolts: The number of bolts after the tick
+        Precondition: bolts is an int >= 0
+
+        Parameter kills: The number of aliens killed in the tick
+        Precondition: kills is an int >= 0
+
+        Parameter start: The clock time at the start of the tick, in nanoseconds
+        Precondition: start is an int from time.perf_counter_ns
+        """
+        self._ticks.append(elapsed)
+        self._helpers.append(helpers)
+        self._aliens.append(aliens)
+        self._bolts.append(bolts)
+        self._kills.append(kills)
+
+    def mute(self, elapsed):
+        """
+        Records a single call of Wave.mute.
+
+        Parameter elapsed: The time of the call in nanoseconds
+        Precondition: elapsed is an int >= 0
+        """
+        self._mute.append(elapsed)
+
+    def getReport(self):
+        """
+        Returns a dictionary with the summary of this profile.
+
+        The times in the summary are in microseconds.  It has these keys:
+
+            ticks:   the number of ticks
+            helpers: for each of PROFILE_HELPERS, the number of calls and the mean,
+                     p99 and max time of a call
+            aliens:  the living aliens after the first and the last tick
+            bolts:   the mean and the max number of bolts after a tick
+            spikes:  the PROFILE_SPIKES slowest ticks, slowest first, each with its
+                     number, time, slowest helper, whether the aliens marched, and
+                     the aliens, bolts and kills
+        """
+        n = len(self._ticks)
+        helpers = {}
+        for name in PROFILE_HELPERS:
+            times = np.array(self.getTimes(name), dtype=np.float64)/1000
+            if len(times) == 0:
+                helpers[name] = {'calls': 0, 'mean': 0.0, 'p99': 0.0, 'max': 0.0}
+            else:
+                helpers[name] = {'calls': len(times), 'mean': float(times.mean()),
+                                 'p99': float(np.percentile(times, 99)),
+                                 'max': float(times.max())}
+
+        spikes = []
+        for index in sorted(range(n), key=lambda index: -self._ticks[index]):
+            if len(spikes) == PROFILE_SPIKES:
+                break
+            times = self._helpers[index]
+            slowest = max(range(len(times)), key=lambda pos: times[pos])
+            spikes.append({'tick': index, 'time': self._ticks[index]/1000,
+                           'helper': PROFILE_HELPERS[slowest], 'march': times[0] > 0,
+                           'aliens': self._aliens[index], 'bolts': self._bolts[index],
+                           'kills': self._kills[index]})
+
+        if n == 0:
+            return {'ticks': 0, 'helpers': helpers, 'aliens': (0,0), 'bolts': (0.0,0),
+                    'spikes': spikes}
+        bolts = np.array(self._bolts, dtype=np.float64)
+        return {'ticks': n, 'helpers': helpers,
+                'aliens': (self._aliens[0]+self._kills[0], self._aliens[-1]),
+                'bolts': (float(bolts.mean()), int(bolts.max())), 'spikes': spikes}
+
+    def __str__(self):
+        """
+        Returns the report of this profile as a table (see getReport).
+        """
+        report = self.getReport()
+        lines = ['wave profile: %d ticks, aliens %d -> %d, bolts mean %.1f max %d' %
+                 ((report['ticks'],)+report['aliens']+report['bolts'])]
+        lines.append('%-12s %7s %9s %9s %9s' % ('helper', 'calls', 'mean us', 'p99 us',
+                                                'max us'))
+        for name in PROFILE_HELPERS:
+            helper = report['helpers'][name]
+            lines.append('%-12s %7d %9.1f %9.1f %9.1f' % (name, helper['calls'],
+                         helper['mean'], helper['p99'], helper['max']))
+        lines.append('slowest ticks:')
+        for spike in report['spikes']:
+            lines.append('  tick %6d %9.1f us  %-12s %-6s aliens %4d bolts %3d kills %d' %
+                         (spike['tick'], spike['time'], spike['helper'],
+                          'march' if spike['march'] else '', spike['aliens'],
+                          spike['bolts'], spike['kills']))
+        return '\n'.join(lines)
+
+
+# HELPER FUNCTIONS
+def _mix(value):
+    """
+    Returns a well-scrambled 64-bit int for the given int (the splitmix64 finalizer).
+
+    Parameter value: The value to scramble
+    Precondition: value is an int >= 0
+    """
+    value = (value+0x9E3779B97F4A7C15) & _HASH_MASK
+    value = ((value ^ (value >> 30))*0xBF58476D1CE4E5B9) & _HASH_MASK
+    value = ((value ^ (value >> 27))*0x94D049BB133111EB) & _HASH_MASK
+    return value ^ (value >> 31)
+
+
+def _sweep(bx, by0, by1, x, y, width, height):
+    """
+    Returns whether each bolt touched the given box on its way from by0 to by1.
+
+    This is a swept version of the test used by Alien.collides and Ship.collides.  Like
+    those methods, it treats (bx, by) as the bottom left corner of a BOLT_WIDTH x
+    BOLT_HEIGHT box, and the bolt touches the box when one of its corners is inside.
+    Since the bolt is smaller than the box, that happens exactly when bx is in the
+    open interval (x-width/2-BOLT_WIDTH, x+width/2) and by is in the open interval
+    (y-height/2-BOLT_HEIGHT, y+height/2).  The bolt only moves vertically, so it
+    touched the box somewhere along its path when bx is in the first interval and the
+    segment from by0 to by1 overlaps the second.
+
+    Parameter bx: The horizontal coordinates of the bolts
+    Precondition: bx is a float array
+
+    Parameter by0: The vertical coordinates of the bolts before they moved
+    Precondition: by0 is a float array the same length as bx
+
+    Parameter by1: The vertical coordinates of the bolts after they moved
+    Precondition: by1 is a float array the same length as bx
+
+    Parameter x: The horizontal coordinate of the box center
+    Precondition: x is an int or float
+
+    Parameter y: The vertical coordinate of the box center
+    Precondition: y is an int or float
+
+    Parameter width: The width of the box
+    Precondition: width is an int or float > BOLT_WIDTH
+
+    Parameter height: The height of the box
+    Precondition: height is an int or float > BOLT_HEIGHT
+    """
+    hw = width/2
+    hh = height/2
+    low = np.minimum(by0, by1)
+    high = np.maximum(by0, by1)
+    return ((bx > x-hw-BOLT_WIDTH) & (bx < x+hw) &
+            (high > y-hh-BOLT_HEIGHT) & (low < y+hh))
+
+
+def _lattice(low, high, centers, pitch):
+    """
+    Returns the sorted list of lattice indices with a center strictly between low
+    and high.
+
+    Since the centers are evenly spaced, the range of possible indices is found by
+    division, and only the indices at the ends of that range need to be checked.
+
+    Parameter low: The bottom of the interval
+    Precondition: low is an int or float
+
+    Parameter high: The top of the interval
+    Precondition: high is an int or float >= low
+
+    Parameter centers: The centers of the lattice cells, in index order
+    Precondition: centers is a nonempty 1d array of float spaced pitch apart
+
+    Parameter pitch: The (signed) distance from one center to the next
+    Precondition: pitch is a nonzero int or float
+    """
+    first = float(centers[0])
+    k0 = (low-first)/pitch
+    k1 = (high-first)/pitch
+    start = max(int(math.floor(min(k0, k1))), 0)
+    stop = min(int(math.ceil(max(k0, k1))), len(centers)-1)
+    return [k for k in range(start, stop+1) if low < centers[k] < high]
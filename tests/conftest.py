@@ -0,0 +1,55 @@
+"""
+Test configuration for Alien Invaders
+
+The modules of the game are imported by name from the application directory, the
+same way the game imports them, so that directory must be on the path.
+"""
+import os
+import random
+import sys
+
+# The application directory, which holds the modules of the game
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# Kivy must not read the command line of pytest when game2d is imported
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+
+
+class Keys(object):
+    """
+    An input that holds each key down at random, for playing a GameSim headless.
+
+    The answers depend only on the seed and the order of the questions, so two games
+    asking the same questions get the same answers.
+    """
+
+    def __init__(self, seed, odds=0.3):
+        """
+        Initializes an input with its own random number generator.
+
+        Parameter seed: The seed of the generator
+        Precondition: seed is an int
+
+        Parameter odds: The chance that a key is down when asked
+        Precondition: odds is a float between 0 and 1
+        """
+        self._rng = random.Random(seed)
+        self._odds = odds
+
+    def copy(self):
+        """
+        Returns an input that gives the same answers as this one from now on.
+        """
+        clone = Keys(0, self._odds)
+        clone._rng.setstate(self._rng.getstate())
+        return clone
+
+    def is_key_down(self, key):
+        """
+        Returns True with the chance given to the initializer.
+
+        Parameter key: The key to test
+        Precondition: key is a str
+        """
+        return self._rng.random() < self._odds
@@ -0,0 +1,52 @@
+"""
+Tests for archive.py
+"""
+import pytest
+from consts import *
+from archive import *
+from conftest import Keys
+
+
+def test_seek(tmp_path):
+    """
+    Tests that seeking to a tick gives the same game as playing up to that tick.
+
+    The ticks include the first and last one, and the ticks on, just before and just
+    after a keyframe.  The input returned by seek must carry on from the same tick.
+    """
+    game = GameSim(6, ALIEN_SPEED, 1, 3, 4)
+    recorder = InputRecorder(Keys(6), 6, 1, 3, ALIEN_SPEED, 4)
+    for frame in range(4000):
+        game.tick(recorder)
+        recorder.nextFrame(game.getHash())
+    replay = recorder.getReplay()
+    path = str(tmp_path / 'game.archive')
+    write(path, replay, 500)
+
+    with ReplayArchive(path) as archive:
+        assert archive.getInterval() == 500
+        assert archive.getKeyframeCount() == 9
+        assert archive.getReplay().encode() == replay.encode()
+        for frame in (0, 1, 499, 500, 501, 1777, 3500, 3999, 4000):
+            (game, input) = archive.seek(frame)
+            assert game.getSnapshot() == play(replay, frame).getSnapshot()
+            assert input.getFrame() == frame
+            for tick in range(frame, min(frame+100, 4000)):
+                game.tick(input)
+                input.nextFrame()
+                assert game.getHash() == replay.hashes[tick]
+
+
+def test_open_errors(tmp_path):
+    """
+    Tests that an archive of another format or version is not opened.
+    """
+    path = str(tmp_path / 'game.archive')
+    write(path, Replay(1), 100)
+    with open(path, 'rb') as file:
+        data = file.read()
+    for bad in (b'XXXX'+data[4:], data[:4]+bytes([ARCHIVE_VERSION+1])+data[5:]):
+        with open(path, 'wb') as file:
+            file.write(bad)
+        with pytest.raises(ValueError):
+            ReplayArchive(path)
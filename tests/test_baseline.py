@@ -0,0 +1,79 @@
+"""
+Tests for baseline.py
+
+The game2d suite builds Kivy graphics instructions, which crash the process if OpenGL
+is not loaded.  So these tests run the suite in a child process.
+"""
+import json
+import os
+import pytest
+import subprocess
+import sys
+from conftest import ROOT
+
+# The code run by the child process: a tiny game2d suite, written as JSON
+COLLECT = """
+import baseline, json, sys
+stats = baseline.collect(['game2d'], {'number': 3}, 2)
+json.dump(stats, sys.stdout)
+"""
+
+
+def child(args, **keywords):
+    """
+    Returns the finished child process running python with the given arguments.
+
+    Parameter args: The arguments of python
+    Precondition: args is a list of str
+    """
+    env = dict(os.environ)
+    # The child must cope with Kivy reading its command line, like a real run
+    env.pop('KIVY_NO_ARGS', None)
+    env.setdefault('KIVY_NO_CONSOLELOG', '1')
+    return subprocess.run([sys.executable]+args, cwd=ROOT, env=env, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          universal_newlines=True, timeout=600, **keywords)
+
+
+def test_collect_game2d():
+    """
+    Tests that the game2d suite runs to the end and summarizes every benchmark.
+    """
+    stats = json.loads(child(['-c', COLLECT]).stdout)
+    assert 'game2d GObject.contains (rotated)' in stats
+    assert 'game2d GRectangle.angle' in stats
+    for (metric, values) in stats.items():
+        assert metric.startswith('game2d ')
+        assert len(values['samples']) == 2
+        assert values['low'] <= values['mean'] <= values['high']
+
+
+def test_save_game2d():
+    """
+    Tests that a game2d baseline can be saved from the command line.
+    """
+    path = os.path.join(ROOT, 'tests', 'baselines-test.json')
+    try:
+        child(['baseline.py', '--suite', 'game2d', 'save', 'test', '--repeat', '2',
+               '--number', '3', '--file', path])
+        with open(path) as file:
+            baselines = json.load(file)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    assert baselines['test']['suites'] == ['game2d']
+    assert len(baselines['test']['metrics']) > 0
+
+
+def test_repeat():
+    """
+    Tests that the command line asks for at least two runs of each suite.
+
+    A single run has no confidence interval.
+    """
+    import baseline
+    assert baseline.parse(['check', '--repeat', '2']).repeat == 2
+    assert baseline.parse(['check']).repeat is None
+    for text in ('1', '0', 'x'):
+        with pytest.raises(SystemExit):
+            baseline.parse(['check', '--repeat', text])
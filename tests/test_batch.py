@@ -0,0 +1,81 @@
+"""
+Tests for batch.py
+"""
+import json
+import os
+import subprocess
+import sys
+from conftest import ROOT
+import consts
+
+
+def test_flags_leave_formation():
+    """
+    Tests that the flags of batch.py do not change the constants of consts.py.
+
+    consts.py once read sys.argv by position when imported, so --games 4 played a
+    formation of 4 aliens per row.
+    """
+    for args in (['--games', '4', '--frames', '3'], ['--frames', '3', '--games', '2']):
+        path = os.path.join(ROOT, 'tests', 'batch-results.json')
+        try:
+            subprocess.run([sys.executable, 'batch.py', '--workers', '1',
+                            '--json', path]+args, cwd=ROOT, check=True,
+                           stdout=subprocess.DEVNULL)
+            with open(path) as file:
+                results = json.load(file)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+        assert len(results) == int(args[args.index('--games')+1])
+        for result in results:
+            assert result['rows'] == consts.ALIEN_ROWS
+            assert result['cols'] == consts.ALIENS_IN_ROW
+            assert result['speed'] == consts.ALIEN_SPEED
+
+
+def test_read_arguments():
+    """
+    Tests that readArguments changes the constants only when it is called.
+    """
+    saved = (consts.ALIEN_ROWS, consts.ALIENS_IN_ROW, consts.ALIEN_SPEED,
+             consts.RANDOM_SEED)
+    try:
+        consts.readArguments(['invaders', '3', '4', '0.25', '99'])
+        assert (consts.ALIEN_ROWS, consts.ALIENS_IN_ROW, consts.ALIEN_SPEED,
+                consts.RANDOM_SEED) == (3, 4, 0.25, 99)
+        consts.readArguments(['invaders', '30', 'x'])
+        assert (consts.ALIEN_ROWS, consts.ALIENS_IN_ROW) == (3, 4)
+    finally:
+        (consts.ALIEN_ROWS, consts.ALIENS_IN_ROW, consts.ALIEN_SPEED,
+         consts.RANDOM_SEED) = saved
+
+
+def test_replay_bolt_rate(tmp_path):
+    """
+    Tests that runGame plays a recording with the bolt rate it was recorded with.
+    """
+    import random
+    from batch import runGame
+    from replay import InputRecorder, GameSim
+
+    class Keys(object):
+        # Holds each key down a third of the time, at random
+        def __init__(self):
+            self.rng = random.Random(5)
+        def is_key_down(self, key):
+            return self.rng.random() < 0.3
+
+    game = GameSim(2, consts.ALIEN_SPEED, 3, 4, 3)
+    recorder = InputRecorder(Keys(), 2, 3, 4, consts.ALIEN_SPEED, 3)
+    for frame in range(3000):
+        game.tick(recorder)
+        recorder.nextFrame()
+    path = str(tmp_path / 'game.replay')
+    recorder.getReplay().save(path)
+
+    job = {'seed': None, 'replay': path, 'rows': None, 'cols': None, 'speed': None,
+           'boltRate': None, 'frames': 3000}
+    result = runGame(job)
+    assert result['boltRate'] == 3
+    assert (result['frames'], result['kills']) == (game.getFrame(), game.getKills())
@@ -0,0 +1,48 @@
+"""
+Tests for env.py
+"""
+import random
+import numpy as np
+import pytest
+from consts import *
+from sim import WaveSim
+from env import *
+
+
+def test_ship_cell():
+    """
+    Tests that the ship channel marks the cell holding the center of the ship.
+
+    The center of the ship is at (getShipX(), SHIP_BOTTOM), like the Ship sprite.
+    A bolt at the same point must land in the same cell.
+    """
+    encoder = WaveEncoder()
+    for moves in (0, 7, 50, 500):
+        wave = WaveSim(ALIEN_SPEED, ALIEN_ROWS, ALIENS_IN_ROW, random.Random(0))
+        for move in range(moves):
+            wave.handleShip(True, False, False)
+        x = wave.getShipX()
+        wave.addBolt(x, SHIP_BOTTOM, True)
+        tensor = encoder.encode(wave)
+        row = int((GAME_HEIGHT-SHIP_BOTTOM)//ENV_CELL)
+        col = int(x//ENV_CELL)
+        assert list(zip(*np.nonzero(tensor[CHANNEL_SHIP]))) == [(row, col)]
+        assert list(zip(*np.nonzero(tensor[CHANNEL_PLAYER]))) == [(row, col)]
+
+
+def test_encode_out():
+    """
+    Tests that encode writes into the given tensor, and rejects one it cannot.
+
+    The bolts are added through a flat view of the tensor, which is only a view
+    when the tensor is C-contiguous.
+    """
+    encoder = WaveEncoder()
+    wave = WaveSim(ALIEN_SPEED, ALIEN_ROWS, ALIENS_IN_ROW, random.Random(0))
+    wave.addBolt(100, 200, True)
+    out = np.zeros(encoder.getShape(), dtype=np.uint8)
+    assert encoder.encode(wave, out) is out
+    assert out[CHANNEL_PLAYER].sum() == 1
+
+    with pytest.raises(AssertionError):
+        encoder.encode(wave, np.asfortranarray(out))
@@ -0,0 +1,91 @@
+"""
+Tests for replay.py
+"""
+import pytest
+from consts import *
+from replay import *
+from conftest import Keys
+
+
+def record(frames, hashes=True):
+    """
+    Returns the tuple (game, replay) of a game played with random keys, and its
+    recording.
+
+    Parameter frames: The number of ticks to play
+    Precondition: frames is an int >= 0
+
+    Parameter hashes: Whether to record the hash of every tick
+    Precondition: hashes is a bool
+    """
+    game = GameSim(6, ALIEN_SPEED, 1, 3, 4)
+    recorder = InputRecorder(Keys(6), 6, 1, 3, ALIEN_SPEED, 4)
+    for frame in range(frames):
+        game.tick(recorder)
+        recorder.nextFrame(game.getHash() if hashes else None)
+    return (game, recorder.getReplay())
+
+
+def test_encode_decode():
+    """
+    Tests that decoding an encoded recording gives back every field.
+    """
+    for (frames, hashes) in ((0, False), (1, True), (5000, True), (5000, False)):
+        (game, replay) = record(frames, hashes)
+        copy = decode(replay.encode())
+        settings = (copy.seed, copy.rows, copy.cols, copy.speed, copy.boltRate)
+        assert settings == (6, 1, 3, ALIEN_SPEED, 4)
+        assert copy.keys == replay.keys
+        assert copy.runs == replay.runs
+        assert copy.frames == replay.frames == frames
+        assert list(copy.hashes) == list(replay.hashes)
+        assert len(copy.hashes) == (frames if hashes else 0)
+        assert copy.encode() == replay.encode()
+
+    # Long runs and high key bits need varints of several bytes
+    replay = Replay(2**64-1, keys=['k%d' % k for k in range(64)],
+                    runs=[(300000, 2**63), (1, 0), (2**31, 2**64-1)])
+    copy = decode(replay.encode())
+    assert (copy.seed, copy.keys, copy.runs) == (replay.seed, replay.keys, replay.runs)
+    assert copy.frames == 300001+2**31
+
+
+def test_decode_errors():
+    """
+    Tests that decode rejects data that is not a recording of this version.
+    """
+    data = record(10)[1].encode()
+    with pytest.raises(ValueError):
+        decode(b'XXXX'+data[4:])
+    with pytest.raises(ValueError):
+        decode(data[:4]+bytes([REPLAY_VERSION+1])+data[5:])
+
+
+def test_play_verify():
+    """
+    Tests that a recording plays back as the original game, and that verify finds
+    the first tick with a wrong hash.
+    """
+    (game, replay) = record(5000)
+    replay = decode(replay.encode())
+    assert play(replay).getSnapshot() == game.getSnapshot()
+    assert verify(replay) is None
+
+    replay.hashes[3210] ^= 1
+    assert verify(replay) == 3210
+    replay.hashes[3210] ^= 1
+    replay.runs[100] = (replay.runs[100][0], replay.runs[100][1] ^ 0b111)
+    start = sum(count for (count, bits) in replay.runs[:100])
+    assert start <= verify(replay) < 5000
+
+
+def test_truncate():
+    """
+    Tests that a truncated recording matches a shorter recording of the same game.
+    """
+    (game, whole) = record(3000)
+    for frames in (2999, 1234, 1, 0):
+        (part, replay) = record(frames)
+        whole.truncate(frames)
+        assert whole.frames == frames
+        assert whole.encode() == replay.encode()
@@ -0,0 +1,175 @@
+"""
+Tests for sim.py
+"""
+import random
+import numpy as np
+from consts import *
+from sim import *
+from sim import _sweep
+from conftest import Keys
+
+
+def test_wave_determinism():
+    """
+    Tests that two waves with the same seed and the same controls stay in step.
+    """
+    for (rows, cols) in ((ALIEN_ROWS, ALIENS_IN_ROW), (1, 1), (10, 15)):
+        first = WaveSim(0.05, rows, cols, random.Random(3))
+        second = WaveSim(0.05, rows, cols, random.Random(3))
+        controls = random.Random(4)
+        for tick in range(3000):
+            keys = [controls.random() < 0.3 for key in range(3)]
+            first.tick(*keys)
+            second.tick(*keys)
+            assert first.getHash() == second.getHash()
+            assert first.getEvents() == second.getEvents()
+
+
+def test_game_determinism():
+    """
+    Tests that two games with the same seed and the same input play the same game.
+
+    The first game is lost to fast aliens.  The second one has a tiny formation, so
+    that the random input clears waves and the game starts new ones.
+    """
+    for (seed, speed, rows, cols) in ((21, 0.1, ALIEN_ROWS, ALIENS_IN_ROW),
+                                      (6, ALIEN_SPEED, 1, 3)):
+        first = GameSim(seed, speed, rows, cols)
+        second = GameSim(seed, speed, rows, cols)
+        other = GameSim(seed+1, speed, rows, cols)
+        (keys1, keys2, keys3) = (Keys(seed), Keys(seed), Keys(seed))
+        for tick in range(8000):
+            first.tick(keys1)
+            second.tick(keys2)
+            other.tick(keys3)
+            assert first.getHash() == second.getHash()
+        assert first.getHash() != other.getHash()
+        assert first.isOver() or first.getWavesCleared() > 0
+
+
+def test_hit_alien_lattice():
+    """
+    Tests hitAlien, which only checks the lattice cells near the bolt, against a sweep
+    of every living alien.
+
+    The bolts are placed at random near the formation, some of them exactly on the
+    edge of an alien, and move up or down by up to three times BOLT_SPEED.  The alien
+    hit must be the first one on the path of the bolt (the nearest row, then the
+    leftmost column), or none if the sweep finds none.
+    """
+    rng = random.Random(12)
+    for case in range(5000):
+        if case % 100 == 0:
+            wave = WaveSim(ALIEN_SPEED, rng.randint(1, 10), rng.randint(1, 15),
+                           random.Random(case))
+            for kill in range(rng.randrange(wave.getAlienCount())):
+                (xs, ys, alive) = wave.getAlienArrays()
+                (row, col) = rng.choice(list(zip(*np.nonzero(alive))))
+                wave.killAlien(int(row), int(col))
+            wave.alienWalk(rng.randint(1, 200))
+        (xs, ys, alive) = wave.getAlienArrays()
+
+        x = rng.uniform(xs.min()-ALIEN_WIDTH, xs.max()+ALIEN_WIDTH)
+        if rng.random() < 0.2:
+            center = float(rng.choice(xs[0]))
+            x = rng.choice((center-ALIEN_WIDTH/2-BOLT_WIDTH, center+ALIEN_WIDTH/2))
+        y0 = rng.uniform(ys.min()-2*ALIEN_HEIGHT, ys.max()+2*ALIEN_HEIGHT)
+        y1 = y0+rng.choice((1, -1))*rng.uniform(0, 3*BOLT_SPEED)
+
+        rows, cols = np.nonzero(alive)
+        hits = _sweep(x, y0, y1, xs[rows,cols], ys[rows,cols], ALIEN_WIDTH, ALIEN_HEIGHT)
+        order = sorted((-row if y1 > y0 else row, col)
+                       for (row, col, hit) in zip(rows.tolist(), cols.tolist(), hits)
+                       if hit)
+        if order:
+            expected = (abs(order[0][0]), order[0][1])
+        else:
+            expected = None
+
+        copy = wave.copy(random.Random(0))
+        hit = copy.hitAlien(x, y0, y1)
+        killed = list(zip(*np.nonzero(alive & ~copy.getAlienArrays()[2])))
+        assert hit == (expected is not None)
+        assert [tuple(map(int, cell)) for cell in killed] == ([] if expected is None
+                                                               else [expected])
+
+
+def test_alien_walk_steps():
+    """
+    Tests that alienWalk(n) leaves the wave as n calls of alienWalk(1) would.
+
+    The formations have random sizes and random dead aliens, so that the outermost
+    living column (which decides when the aliens step down) is not always the outer
+    column of the lattice.
+    """
+    rng = random.Random(7)
+    for case in range(300):
+        wave = WaveSim(ALIEN_SPEED, rng.randint(1, 10), rng.randint(1, 15),
+                       random.Random(case))
+        for kill in range(rng.randrange(wave.getAlienCount()+1)):
+            (xs, ys, alive) = wave.getAlienArrays()
+            (row, col) = rng.choice(list(zip(*np.nonzero(alive))))
+            wave.killAlien(int(row), int(col))
+        wave.alienWalk(rng.randint(1, 100))
+
+        steps = rng.randint(1, 400)
+        single = wave.copy(random.Random(0))
+        for step in range(steps):
+            single.alienWalk(1)
+        wave.alienWalk(steps)
+        assert wave.getSnapshot() == single.getSnapshot()
+
+
+def test_snapshot_round_trip():
+    """
+    Tests that a restored snapshot plays on exactly as the original game.
+
+    Snapshots are taken before the first wave and at several points of a game, and
+    restored both into a new game and in place, into the game they came from.
+    """
+    game = GameSim(6, ALIEN_SPEED, 1, 3)
+    keys = Keys(6)
+    for frame in (0, 1, 700, 2500, 4000, 6000):
+        while game.getFrame() < frame:
+            game.tick(keys)
+        snapshot = game.getSnapshot()
+        saved = keys.copy()
+
+        other = GameSim()
+        other.setSnapshot(snapshot)
+        assert other.getSnapshot() == snapshot
+        assert other.getHash() == game.getHash()
+
+        otherKeys = keys.copy()
+        for tick in range(300):
+            game.tick(keys)
+            other.tick(otherKeys)
+            assert other.getHash() == game.getHash()
+
+        game.setSnapshot(snapshot)
+        keys = saved
+        assert game.getSnapshot() == snapshot
+
+
+def test_copy():
+    """
+    Tests that a copy plays on exactly as the original, and shares no state with it.
+    """
+    game = GameSim(6, ALIEN_SPEED, 1, 3)
+    keys = Keys(6)
+    for tick in range(1000):
+        game.tick(keys)
+    # The copy is made in the middle of a wave, with bolts on screen
+    assert game.getState() == STATE_ACTIVE and game.getWave().getBoltCount() > 0
+    snapshot = game.getSnapshot()
+    clone = game.copy()
+    assert clone.getSnapshot() == snapshot
+
+    cloneKeys = keys.copy()
+    for tick in range(2000):
+        clone.tick(cloneKeys)
+    assert game.getSnapshot() == snapshot
+
+    for tick in range(2000):
+        game.tick(keys)
+    assert game.getSnapshot() == clone.getSnapshot()
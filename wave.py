@@ -6,7 +6,9 @@ Invaders game.  Instances of Wave represent a single wave.  Whenever you move to
 new level, you are expected to make a new instance of the class.
 
 The subcontroller Wave manages the ship, the aliens and any laser bolts on screen.
-These are model objects.  Their classes are defined in models.py.
+These are model objects.  Their classes are defined in models.py.  The rules that
+move them are simulated headlessly by WaveSim in sim.py.  The profile WaveTrace adds
+the ticks of a wave to the timeline of a traced game.
 
 Most of your work on this assignment will be in either this module or models.py.
 Whether a helper method belongs in this module or models.py is often a complicated
@@ -18,8 +20,8 @@ December 4, 2018
 from game2d import *
 from consts import *
 from models import *
-import random
-import copy
+from sim import *
+import time
 
 # PRIMARY RULE: Wave can only access attributes in models.py via getters/setters
 # Wave is NOT allowed to access anything in app.py (Subcontrollers are not permitted
@@ -31,24 +33,25 @@ class Wave(object):
     This class controls a single level or wave of Alien Invaders.
 
     This subcontroller has a reference to the ship, aliens, and any laser bolts on screen.
-    It animates the laser bolts, removing any aliens as necessary. It also marches the
-    aliens back and forth across the screen until they are all destroyed or they reach
-    the defense line (at which point the player loses). When the wave is complete, you
-    should create a NEW instance of Wave (in Invaders) if you want to make a new wave of
-    aliens.
+    The rules of the wave (the alien march, firing, bolt movement and collisions) live
+    in a WaveSim from sim.py, which stores no graphics at all, and a GameSim advances
+    it.  This class is a thin adapter over that simulation: it plays the sounds for
+    whatever happened, and copies the simulation state into the sprites when it draws
+    them.  When the wave is complete, you should create
+    a NEW instance of Wave (in Invaders) if you want to make a new wave of aliens.
 
     If you want to pause the game, tell this controller to draw, but do not update.  See
     subcontrollers.py from Lecture 24 for an example.  This class will be similar to
     than one in how it interacts with the main class Invaders.
 
-    #UPDATE ME LATER
     INSTANCE ATTRIBUTES:
-        _ship:   the player ship to control [Ship]
-        _alien: the 2d list of aliens in the wave [rectangular 2d list of Alien or None]
-        _bolts:  the laser bolts currently on screen [list of Bolt, possibly empty]
+        _sim:    the simulation of this wave [WaveSim]
+        _ship:   the player ship sprite [Ship]
+        _alien:  the alien sprites, in the same lattice as _sim [rectangular 2d list of Alien,
+                 or None if they have not been created yet]
+        _bolts:  the sprites for the bolts of _sim [BoltPool]
         _dline:  the defensive line being protected [GPath]
-        _lives:  the number of lives left  [int >= 0]
-        _time:   The amount of time since the last Alien "step" [number >= 0]
+        input:   the user input, used to mute the game [GInput]
 
     As you can see, all of these attributes are hidden.  You may find that you want to
     access an attribute in class Invaders. It is okay if you do, but you MAY NOT ACCESS
@@ -56,26 +59,8 @@ class Wave(object):
     you need to access in Invaders.  Only add the getters and setters that you need for
     Invaders. You can keep everything else hidden.
 
-    You may change any of the attributes above as you see fit. For example, may want to
-    keep track of the score.  You also might want some label objects to display the score
-    and number of lives. If you make changes, please list the changes with the invariants.
-
     LIST MORE ATTRIBUTES (AND THEIR INVARIANTS) HERE IF NECESSARY
 
-        _fireRate: a randomly generated number between 1 and BOLT_RATE
-        determining when alien bolts will be fired [int or float >= 1 and
-        <= BOLT_RATE]
-
-        _alienSteps: an integer between 0 and self._fireRate counting the number
-        of steps aliens have taken since firing the last bolt
-        [int >=0 and <= self._fireRate]
-
-        _lives: the number of lives the player has remaining. Starts at
-        SHIP_LIVES and is incremented down to 0 when the ship is destroyed
-        [int <= SHIP_LIVES and >=0]
-
-        _alienSpeed = the speed of the aliens, as set by the app.py
-
         _pewSound = sound made when ship fires bolt [Sound() object]
 
         _alienPew = sound made when alien fires bolt [Sound() object]
@@ -89,158 +74,85 @@ class Wave(object):
     """
 
     # GETTERS AND SETTERS (ONLY ADD IF YOU NEED THEM)
+    def getLives(self):
+        """
+        Returns the number of lives the player has remaining.
+        """
+        return self._sim.getLives()
 
     # INITIALIZER (standard form) TO CREATE SHIP AND ALIENS
-    def __init__(self, view, input, speed):
+    def __init__(self, view, input, sim):
         """
         Initializes a wave of alien objects.
 
         This method should make sure that all of the attributes satisfy the given
-        invariants. It sets the x, y, height, width, and source of each alien object.
+        invariants. The alien sprites are not created until the wave is first drawn,
+        so a Wave costs almost nothing until it is on screen.  The simulation is
+        advanced by a GameSim, not by this class.
+
+        Parameter sim: The simulation of this wave
+        Precondition: sim is a WaveSim
         """
-        self._time = 0
-        self._bolts = []
-        self._alien = self.fill()
+        self._sim = sim
+        self._alien = None
         self._ship = Ship()
-        self._adirection = 'right'
+        self._bolts = BoltPool()
         self._dline = GPath(linewidth=1,points=[0,DEFENSE_LINE, GAME_WIDTH,
         DEFENSE_LINE], linecolor='black')
         self.input = input
-        self._fireRate = random.randrange(1,BOLT_RATE)
-        self._alienSteps = 0
-        self._lives = SHIP_LIVES
-        self._alienSpeed = speed
         self._pewSound = Sound('pew1.wav')
         self._alienPew = Sound('pew2.wav')
         self._shipExplode = Sound('blast1.wav')
         self._alienDie = Sound('blast1.wav')
         self._muted = False
-        self.draw(view)
 
     def fill(self):
         """
-        Filling _alien attribute with alien objects.
+        Returns a 2d list with an Alien sprite for every alien in the simulation.
 
-        This method should make sure that _alien satisfies the given invariants.
-        It repeatedly calls the Alien class and passes on the parameters row and col.
+        The sprites start at the simulation positions. Dead aliens keep their sprite,
+        but it is never drawn.
         """
         alienList = []
-        rowList=[]
-        row = 0
-        col = 0
-        while row < ALIEN_ROWS:
-            while col < ALIENS_IN_ROW:
-                x = ALIEN_H_SEP+((1+col)*ALIEN_H_SEP)+(col*ALIEN_WIDTH)
-                y = GAME_HEIGHT-ALIEN_CEILING-(((row)*ALIEN_V_SEP)+
-                (row*ALIEN_HEIGHT))
-                if row == 0:
-                    source = 'alien3.png'
-                elif row == 1 or row == 2:
-                    source = 'alien2.png'
-                elif row > 2 and row <=5:
-                    source = 'alien1.png'
-                elif row > 5:
-                    row = row-5
-
-                if row <=5:
-                    rowList.append(Alien(x,y,source))
-                col+=1
+        xs, ys, alive = self._sim.getAlienArrays()
+        for row in range(self._sim.getRows()):
+            rowList = []
+            for col in range(self._sim.getCols()):
+                source = ALIEN_IMAGES[self._sim.getAlienType(row, col)]
+                rowList.append(Alien(float(xs[row,col]),float(ys[row,col]),source))
             alienList.append(rowList)
-            rowList=[]
-            col=0
-            row +=1
-
         return alienList
 
-    # UPDATE METHOD TO MOVE THE SHIP, ALIENS, AND LASER BOLTS
-    def update(self, dt):
+    # HELPER METHODS FOR THE SOUNDS
+    def playSounds(self, events):
         """
-        Draws the game objects to the view.
-
-        Every object being drawn is a GObject.
+        Plays the sound for each of the given simulation events.
 
+        Parameter events: The events to play
+        Precondition: events is a list of EVENT_* constants
         """
-        if self._time <= self._alienSpeed:
-            self._time += dt
-        elif self._time > self._alienSpeed:
-            self.alienWalk()
-        self.handleShip()
-        self.alienFire()
-        self.boltActions()
-        self.defenseLine()
-        self.mute()
-
-    # HELPER METHODS FOR update()
-    def handleShip(self):
-        """
-        Moves ship left and right, shoots bolts when proper commands are entered.
-        """
-        players=False
-        for bolt in self._bolts:
-            if bolt.isPlayers()==True:
-                players = True
-                break
-
-        if self._ship != None:
-            if self.input.is_key_down('left') or self.input.is_key_down('a'):
-                x = self._ship.x - SHIP_MOVEMENT
-                self._ship.x = max(x,SHIP_WIDTH/2)
-            if self.input.is_key_down('right') or self.input.is_key_down('d'):
-                x = self._ship.x + SHIP_MOVEMENT
-                self._ship.x = min(x, (GAME_WIDTH-SHIP_WIDTH/2))
-
-            if ((self.input.is_key_down('up') or
-            self.input.is_key_down('spacebar') or self.input.is_key_down('w'))
-            and players == False):
-                self._bolts.append(Bolt(self._ship.x,self._ship.y, True))
-                if self._muted == False:
-                    self._pewSound.play()
-
-    def alienWalk(self):
-        """
-        Moves ship left and right, shoots bolts when proper commands are entered.
-        """
-        maxRight = 0
-        maxLeft = GAME_WIDTH
-        self._alienSteps += 1
-        for row in self._alien:
-            for alien in row:
-                if alien.x > maxRight:
-                    maxRight= alien.x
-                if alien.x < maxLeft:
-                    maxLeft = alien.x
-                if self._adirection=='right':
-                    if maxRight <= (GAME_WIDTH-ALIEN_H_SEP-(.5*ALIEN_WIDTH)):
-                        alien.x += ALIEN_H_WALK
-                    elif maxRight > (GAME_WIDTH-ALIEN_H_SEP-(.5*ALIEN_WIDTH)):
-                        alien.x += ALIEN_H_WALK
-                        for alienfar in row:
-                            alienfar.x -= (ALIEN_H_WALK)
-                        self.alienDown()
-                        self._adirection = 'left'
-                elif self._adirection=='left':
-                    if maxLeft >= ALIEN_H_SEP+(.5*ALIEN_WIDTH):
-                        alien.x -= ALIEN_H_WALK
-                    elif maxLeft < ALIEN_H_SEP+(.5*ALIEN_WIDTH):
-                        for alienfar1 in row:
-                            alienfar1.x += (.5*ALIEN_H_WALK)
-                        alien.x += ALIEN_H_WALK
-                        self.alienDown()
-                        self._adirection = 'right'
-        self._time = 0
-
-    def alienDown(self):
-        """
-        Mutes or unmutes game using user input.
-        """
-        for row in self._alien:
-            for alien1 in row:
-                alien1.y -= ALIEN_V_WALK
+        if self._muted:
+            return
+        for event in events:
+            if event == EVENT_SHIP_FIRE:
+                self._pewSound.play()
+            elif event == EVENT_ALIEN_FIRE:
+                self._alienPew.play()
+            elif event == EVENT_ALIEN_DIE:
+                self._alienDie.play()
+            elif event == EVENT_SHIP_DIE:
+                self._shipExplode.play()
 
     def mute(self):
         """
         Mutes or unmutes game using user input.
+
+        If the wave is being profiled, the time of this method is recorded in the
+        profile of the simulation.
         """
+        profile = self._sim.getProfile()
+        if profile is not None:
+            start = time.perf_counter_ns()
         if self.input.is_key_down('m'):
             if self._muted == False:
                 self._pewSound = None
@@ -254,123 +166,81 @@ class Wave(object):
                 self._shipExplode = Sound('blast1.wav')
                 self._alienDie = Sound('blast1.wav')
                 self._muted = False
+        if profile is not None:
+            profile.mute(time.perf_counter_ns()-start)
 
-    def boltActions(self):
-        """
-        Assigns bolt objects their speed, deletes bolts that are off screen,
-        detects collisions between a bolt and a ship or alien
-
-        """
-        for bolt in self._bolts:
-            bolt.y += bolt.getVelocity()
-            if bolt.y > GAME_HEIGHT or bolt.y < -BOLT_HEIGHT:
-                self._bolts.remove(bolt)
-            else:
-                for alienRow in self._alien:
-                    for alienObj in alienRow:
-                        if alienObj.collides(bolt):
-                            alienRow.remove(alienObj)
-                            if self._bolts != []:
-                                self._bolts.remove(bolt)
-                            if self._muted == False:
-                                self._alienDie.play()
-            if self._ship != None and self._ship.collides(bolt):
-                self._ship = None
-                self._bolts=[]
-                if self._muted == False:
-                    self._shipExplode.play()
-
-    def defenseLine(self):
+    # DRAW METHOD TO DRAW THE SHIP, ALIENS, DEFENSIVE LINE AND BOLTS
+    def draw(self, view):
         """
-        Makes the player automatically lose if alien object reaches below
-        defense line
+        Draws the game objects to the view.
 
-        """
-        for row in self._alien:
-            for alien in row:
-                if (alien.y-(.5*ALIEN_HEIGHT)) < DEFENSE_LINE:
-                    self._lives = 0
+        Every object being drawn is a GObject.  The sprites are moved to the current
+        simulation state just before they are drawn, so the formation arrays are only
+        read once per frame, and only for living aliens.  The alien sprites are created
+        here the first time, and again if a restored snapshot changed the formation.
+        """
+        if (self._alien is None or len(self._alien) != self._sim.getRows() or
+            len(self._alien[0]) != self._sim.getCols()):
+            self._alien = self.fill()
+        for (row, col, x, y) in self._sim.aliens():
+            alien = self._alien[row][col]
+            alien.x = x
+            alien.y = y
+            alien.draw(view)
+
+        if self._sim.isShipAlive():
+            self._ship.x = self._sim.getShipX()
+            self._ship.draw(view)
+        self._dline.draw(view)
+        self.drawBolts(view)
 
-    def alienFire(self):
+    def drawBolts(self, view):
         """
-        Makes alien objects fire bolts downward towards the ship. Bolts are
-        fired once per anywhere between 1 and BOLT_RATE alien steps. The alien
-        that is firing is selected randomly from the bottommost aliens
+        Draws a sprite for every bolt in the simulation.
 
+        The sprites come from a BoltPool.  The pool is resized to the number of bolts
+        in the simulation, and each active sprite is moved onto one of them, so no Kivy
+        instructions are built once the pool is large enough.
         """
-        if self._alienSteps == self._fireRate and self._alien != []:
-            selectedAlien = self.alienSelect()
-            self._bolts.append(Bolt(selectedAlien.x,selectedAlien.y, False))
-            if self._muted == False:
-                self._alienPew.play()
-            self._alienSteps = 0
-            self._fireRate = random.randrange(1,BOLT_RATE)
+        xs, ys, player = self._sim.getBoltArrays()
+        xs = xs.tolist()
+        ys = ys.tolist()
+        player = player.tolist()
+        self._bolts.resize(len(xs))
+        for pos in range(len(xs)):
+            bolt = self._bolts.getBolt(pos)
+            bolt.reset(xs[pos],ys[pos],player[pos])
+            bolt.draw(view)
 
-    def colSelect(self):
-        """
-        Organizes aliens into columns and selects one column from which to
-        select an alien.
 
-        """
-        if self._alien==None or self._alien==[]:
-            return None
-        alienList = []
-        alienList = copy.copy(self._alien)
-        colList = []
-        newAlienList = []
-
-        rows = len(alienList)
-        for row in range(0, rows):
-            cols = len(alienList[row])
-            for col in range(0, cols):
-                colList.append(alienList[row][col])
-            newAlienList.append(colList)
-            colList = []
-        return random.choice(newAlienList)
-
-    def alienSelect(self):
-        """
-        Selects the bottom most alien of the selected column.
-        """
-        selectedColumn = self.colSelect()
-        bottom = GAME_HEIGHT
-
-
-        if selectedColumn is None or selectedColumn is [] or selectedColumn is [[]]:
-            return None
-
-        elif len(selectedColumn)==0:
-            print("The code went here")
-            print(self._alien)
-            return random.choice(self._alien[0])
-        else:
-            try:
-                bottomAlien = selectedColumn[-1]
-                return bottomAlien
-            except:
-                selectedColumn = self.colSelect()
-                return selectedColumn[-1]
-            
+class WaveTrace(WaveProfile):
+    """
+    A profile that also adds the ticks of a wave to the timeline of the game.
 
-    # DRAW METHOD TO DRAW THE SHIP, ALIENS, DEFENSIVE LINE AND BOLTS
-    def draw(self, view):
-        """
-        Draws the game objects to the view.
+    Each tick is a span WaveSim.step, with a span for each helper nested inside it,
+    and a counter of the aliens and bolts left after it.  The helper spans are placed
+    back to back from the start of the tick, as WaveSim.profiledStep only keeps their
+    times; the clock calls between them are left out, so each helper may show up a
+    fraction of a microsecond early.  The ticks are also recorded as in any profile.
 
-        Every object being drawn is a GObject.
+    A GameSim made with profile=WaveTrace gives one of these to every wave.  The ticks
+    are only added to the timeline while the game is traced (see GTracer).
+    """
 
+    def tick(self, elapsed, helpers, aliens, bolts, kills, start):
         """
-        for row in self._alien:
-            for alien in row:
-                if alien != None:
-                    alien.draw(view)
-                elif alien == None:
-                    alien.draw(view)
-
-        if self._ship != None:
-            self._ship.draw(view)
-        self._dline.draw(view)
-        for bolt in self._bolts:
-            bolt.draw(view)
+        Records a single tick of the wave, and adds it to the timeline.
 
-    # HELPER METHODS FOR COLLISION DETECTION
+        See WaveProfile.tick for the parameters.
+        """
+        WaveProfile.tick(self, elapsed, helpers, aliens, bolts, kills, start)
+        tracer = GTracer.ACTIVE
+        if tracer is None:
+            return
+        tracer.complete('WaveSim.step', start, elapsed, 'sim', {'kills': kills})
+        mark = start
+        for (name, duration) in zip(PROFILE_HELPERS, helpers):
+            if duration > 0:
+                tracer.complete(name, mark, duration, 'sim')
+                mark += duration
+        tracer.counter('wave', {'aliens': aliens, 'bolts': bolts}, start+elapsed)